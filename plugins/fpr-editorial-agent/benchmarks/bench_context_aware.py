@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark for context_aware (first-reference) resolution in the deterministic pass.
+
+Builds synthetic documents in which the short forms of context_aware
+entries occur often and some of their expansions are already present,
+then compares:
+
+- baseline: the original algorithm, which checks
+  replacement.lower() in full_doc_text.lower() for every context_aware
+  match (re-lowercasing the whole document each time)
+- indexed: the engine's scan, which records present expansions in an
+  ExpansionIndex while paragraphs are read and resolves with set lookups
+
+Both use the same compiled matcher, so the difference is the
+context_aware handling alone. Results are checked to be identical.
+
+Usage:
+    python benchmarks/bench_context_aware.py [--sizes 1000,5000,10000] [--projects ERSV,WCRP]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add plugin root to sys.path so imports work
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.knowledge_base import KnowledgeBase
+from src.rule_engine import _DeterministicScan
+
+FILLER = (
+    "the program supports municipal planning efforts across the island and "
+    "la comunidad participa en el proceso de planificación"
+).split()
+
+
+def build_paragraphs(kb: KnowledgeBase, count: int, seed: int = 0) -> list[str]:
+    """Synthetic paragraph texts rich in context_aware short forms and expansions."""
+    rng = random.Random(seed)
+    rules = [r for r in kb.get_term_matcher().entries if r.context_aware]
+    # Expansions of about half the rules appear somewhere in the document
+    expanded = {r.id for r in rules if rng.random() < 0.5}
+
+    paragraphs = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(10, 40)):
+            roll = rng.random()
+            if roll < 0.08:
+                words.append(rng.choice(rules).original)
+            elif roll < 0.09:
+                rule = rng.choice(rules)
+                if rule.id in expanded:
+                    words.append(rule.replacement)
+            else:
+                words.append(rng.choice(FILLER))
+        paragraphs.append(" ".join(words))
+    return paragraphs
+
+
+def baseline_pass(kb: KnowledgeBase, paragraphs: list[str]) -> list[tuple]:
+    """The original _deterministic_pass context_aware logic, over the same matcher."""
+    matcher = kb.get_term_matcher()
+    full_doc_text = "\n".join(paragraphs)
+    applied: set[str] = set()
+    found = []
+    for p_idx, text in enumerate(paragraphs):
+        for rule, match in matcher.iter_matches(text, "prose"):
+            if rule.context_aware:
+                if rule.id in applied:
+                    continue
+                if rule.replacement.lower() in full_doc_text.lower():
+                    continue
+            found.append((p_idx, rule.id, match.start()))
+            if rule.context_aware:
+                applied.add(rule.id)
+    return found
+
+
+def indexed_pass(kb: KnowledgeBase, paragraphs: list[str]) -> list[tuple]:
+    scan = _DeterministicScan(kb)
+    for p_idx, text in enumerate(paragraphs):
+        scan.feed(p_idx, "prose", text)
+    return [(s.paragraph_index, s.rule_id, s.start) for s in scan.finish()]
+
+
+def timed(fn, *args) -> tuple[float, list]:
+    started = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - started, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="1000,5000,10000", help="Comma-separated paragraph counts")
+    parser.add_argument("--projects", default="ERSV,WCRP", help="Comma-separated project IDs")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"{'project':<8} {'paragraphs':>10} {'baseline':>10} {'indexed':>10} {'speedup':>8}")
+    for project in args.projects.split(","):
+        kb = KnowledgeBase(project)
+        kb.get_term_matcher().prepare(["prose"])
+        for size in sizes:
+            paragraphs = build_paragraphs(kb, size)
+            indexed_time, indexed = timed(indexed_pass, kb, paragraphs)
+            baseline_time, baseline = timed(baseline_pass, kb, paragraphs)
+            if indexed != baseline:
+                sys.exit(f"ERROR: results differ for {project} at {size} paragraphs")
+            print(
+                f"{project:<8} {size:>10} {baseline_time:>9.2f}s {indexed_time:>9.2f}s "
+                f"{baseline_time / indexed_time:>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
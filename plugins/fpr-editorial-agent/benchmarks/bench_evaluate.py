@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the concurrent heuristic evaluator (--evaluate) against a local stand-in server.
+
+Extracts the heuristic tasks of a synthetic document (see docgen.py),
+then starts a local HTTP server that answers like the built-in stub
+evaluator after a fixed latency. To exercise the retry path, the first
+request that includes an --fail-every-th paragraph gets HTTP 503 or
+HTTP 429 with Retry-After: 0.
+
+The tasks are evaluated at each concurrency level, one paragraph per
+request and then batched (--batch-chars). Every run must return the same
+suggestions per paragraph as the stub evaluator called directly, with no
+failures.
+
+Usage:
+    python benchmarks/bench_evaluate.py [--paragraphs 300] [--latency 0.05]
+        [--concurrency 1,8,32] [--batch-chars 0,4000] [--fail-every 10] [--project ERSV]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add plugin root to sys.path so imports work
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from docgen import DocSpec, build_docx
+from src.docx_package import DocxPackage
+from src.evaluator import EvaluationSettings, HttpBackend, StubBackend, evaluate_tasks, parse_response
+from src.knowledge_base import KnowledgeBase
+from src.rule_engine import RuleEngine
+
+
+def make_handler(tasks_by_index: dict, latency: float, fail_every: int):
+    stub = StubBackend()
+    seen: set[tuple] = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            indices = tuple(request["paragraph_indices"])
+            with lock:
+                first = indices not in seen
+                seen.add(indices)
+            time.sleep(latency)
+            failing = [p for p in indices if fail_every and p % fail_every == 0]
+            if first and failing:
+                self.send_response(503 if (failing[0] // fail_every) % 2 else 429)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+            batch = [tasks_by_index[p] for p in indices]
+            body = asyncio.run(stub.evaluate(request["prompt"], batch, 0)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def expected_results(tasks: list[dict]) -> dict:
+    stub = StubBackend()
+    return {t["paragraph_index"]: parse_response(asyncio.run(stub.evaluate("", [t], 0))) for t in tasks}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--paragraphs", type=int, default=300, help="Paragraphs in the synthetic document")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the server takes per request")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--batch-chars", default="0,4000", help="Comma-separated batch budgets (0: one paragraph per request)")
+    parser.add_argument("--fail-every", type=int, default=10, help="Fail the first request of every Nth paragraph (0: never)")
+    parser.add_argument("--project", default="ERSV", help="Project whose knowledge base is used")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase(args.project)
+    with tempfile.TemporaryDirectory() as tmp:
+        docx = Path(tmp) / "bench_evaluate.docx"
+        build_docx(docx, DocSpec(paragraphs=args.paragraphs, project=args.project), kb)
+        engine = RuleEngine(kb=kb, mode="deep")
+        with DocxPackage(docx) as package:
+            tasks = engine.extract_heuristic_tasks(package)
+            header = engine.heuristic_header()
+    expected = expected_results(tasks)
+
+    print(f"{len(tasks)} tasks, {args.latency * 1000:.0f} ms per request, "
+          f"first request of every {args.fail_every}th paragraph fails")
+    print(f"{'batch chars':>11} {'concurrency':>11} {'seconds':>8} {'requests':>8} {'evaluated':>9} {'retries':>7} {'failed':>6}")
+    runs = [(int(b), int(c)) for b in args.batch_chars.split(",") for c in args.concurrency.split(",")]
+    for batch_chars, concurrency in runs:
+        handler = make_handler({t["paragraph_index"]: t for t in tasks}, args.latency, args.fail_every)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            backend = HttpBackend(f"http://127.0.0.1:{server.server_address[1]}/evaluate")
+            settings = EvaluationSettings(concurrency=concurrency, backoff=0.01, batch_chars=batch_chars)
+            results = {}
+            started = time.perf_counter()
+            stats = evaluate_tasks(
+                backend, header, tasks,
+                lambda record: results.__setitem__(record["paragraph_index"], record["suggestions"]),
+                settings,
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(
+            f"{batch_chars:>11} {concurrency:>11} {elapsed:>7.2f}s {stats['requests']:>8} "
+            f"{stats['evaluated']:>9} {stats['retries']:>7} {stats['failed']:>6}"
+        )
+        # The driver tags each suggestion with its paragraph; the stub output does not
+        got = {p: [{k: v for k, v in s.items() if k != "paragraph_index"} for s in ss] for p, ss in results.items()}
+        if stats["failed"] or got != expected:
+            sys.exit(
+                f"ERROR: results with batch chars {batch_chars}, concurrency {concurrency} "
+                f"differ from the stub evaluator"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark with a stored baseline.
+
+For each document size, generates a synthetic .docx (see docgen.py) and
+runs the pipeline in a fresh Python process, timing each stage:
+
+- kb_load_cold: KnowledgeBase load, rebuilding the compiled snapshot
+- kb_load: KnowledgeBase load from the snapshot
+- open: DocxPackage
+- engine_run: RuleEngine.run (deterministic pass)
+- heuristic_extract: RuleEngine.extract_heuristic_tasks
+- writer_apply: DocxWriter.apply
+- save: DocxWriter.save
+
+Each stage also records the process peak RSS when it ended. A fresh
+process per size makes that high-water mark belong to that size alone.
+Output counts (suggestions, tasks, applied and failed changes) are
+recorded too. A changed count means behaviour changed, not just speed.
+
+Results are compared with a stored baseline (benchmarks/baseline.json by
+default). Any stage slower or more memory-hungry than the tolerance
+allows, or any changed count, is reported as a REGRESSION, and the exit
+code is 1. Timings only compare meaningfully on the machine that
+recorded the baseline, so re-record it with --save-baseline after
+intended changes or on a new machine.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 100,1000,10000,50000] [--project ERSV]
+        [--repeat 3] [--baseline benchmarks/baseline.json] [--save-baseline]
+        [--time-tolerance 0.25] [--memory-tolerance 0.15]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add plugin root to sys.path so imports work
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from docgen import DocSpec, build_docx
+
+STAGES = (
+    "kb_load_cold", "kb_load", "open", "engine_run", "heuristic_extract", "writer_apply", "save",
+)
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_RSS_BYTES = 16 * 1024 * 1024
+
+
+# ----------------------------------------------------------------------
+# One run (child process)
+# ----------------------------------------------------------------------
+
+def run_pipeline(docx: Path, project: str, out_json: Path) -> None:
+    """Run every stage on docx and write stage metrics and output counts to out_json."""
+    from src.docx_package import DocxPackage
+    from src.docx_writer import DocxWriter
+    from src.knowledge_base import KnowledgeBase
+    from src.metrics import Metrics
+    from src.rule_engine import RuleEngine
+
+    metrics = Metrics()
+    with metrics.stage("kb_load_cold"):
+        KnowledgeBase(project, rebuild_cache=True)
+    with metrics.stage("kb_load"):
+        kb = KnowledgeBase(project)
+
+    with metrics.stage("open"):
+        package = DocxPackage(docx)
+    with package:
+        engine = RuleEngine(kb=kb, mode="deep")
+        with metrics.stage("engine_run"):
+            result = engine.run(package)
+        with metrics.stage("heuristic_extract"):
+            tasks = engine.extract_heuristic_tasks(package)
+
+        writer = DocxWriter(package=package, original_docx=docx)
+        # apply() prints a warning per failed suggestion; the count is enough here
+        with metrics.stage("writer_apply"), contextlib.redirect_stdout(io.StringIO()):
+            stats = writer.apply(result)
+        with metrics.stage("save"):
+            writer.save(docx.with_name(docx.stem + "_out.docx"))
+
+    data = metrics.to_dict()
+    out_json.write_text(json.dumps({
+        "stages": {
+            name: {"seconds": s["seconds"], "peak_rss_bytes": s["peak_rss_bytes"]}
+            for name, s in data["stages"].items()
+        },
+        "peak_rss_bytes": data["peak_rss_bytes"],
+        "counts": {
+            "high_confidence": len(result.high_confidence),
+            "low_confidence": len(result.low_confidence),
+            "skipped": len(result.skipped),
+            "heuristic_tasks": len(tasks),
+            **stats,
+        },
+    }), encoding="utf-8")
+
+
+def measure(size: int, project: str, repeat: int, workdir: Path) -> dict:
+    """Generate a document of size paragraphs and run the pipeline repeat times.
+
+    Keeps the fastest time and the lowest peak RSS seen for each stage.
+    """
+    docx = workdir / f"bench_{project}_{size}.docx"
+    spec = DocSpec(paragraphs=size, project=project)
+    build_docx(docx, spec)
+
+    env = dict(os.environ, FPR_CACHE_DIR=str(workdir / "cache"))
+    best = None
+    for _ in range(repeat):
+        out_json = workdir / "run.json"
+        subprocess.run(
+            [sys.executable, __file__, "--child", str(docx), "--project", project,
+             "--child-output", str(out_json)],
+            check=True, env=env,
+        )
+        run = json.loads(out_json.read_text(encoding="utf-8"))
+        if best is None:
+            best = run
+            continue
+        for name, stage in run["stages"].items():
+            kept = best["stages"][name]
+            kept["seconds"] = min(kept["seconds"], stage["seconds"])
+            if stage["peak_rss_bytes"] is not None:
+                kept["peak_rss_bytes"] = min(kept["peak_rss_bytes"], stage["peak_rss_bytes"])
+        if run["peak_rss_bytes"] is not None:
+            best["peak_rss_bytes"] = min(best["peak_rss_bytes"], run["peak_rss_bytes"])
+    return best
+
+
+# ----------------------------------------------------------------------
+# Baseline
+# ----------------------------------------------------------------------
+
+def machine() -> dict:
+    return {
+        "platform": sys.platform,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(results: dict, baseline: dict, time_tol: float, memory_tol: float) -> list[str]:
+    """Return a description of every regression of results against baseline."""
+    problems = []
+    for size, run in results.items():
+        base = baseline["results"].get(size)
+        if base is None:
+            print(f"  note: no baseline for {size} paragraphs")
+            continue
+        for name, count in run["counts"].items():
+            if base["counts"].get(name) != count:
+                problems.append(f"{size:>6} paragraphs: {name} changed {base['counts'].get(name)} -> {count}")
+        for name in STAGES:
+            now, then = run["stages"].get(name), base["stages"].get(name)
+            if now is None or then is None:
+                continue
+            if now["seconds"] > then["seconds"] * (1 + time_tol) and now["seconds"] - then["seconds"] > MIN_SECONDS:
+                problems.append(
+                    f"{size:>6} paragraphs: {name} took {now['seconds']:.3f}s "
+                    f"(baseline {then['seconds']:.3f}s, +{now['seconds'] / then['seconds'] - 1:.0%})"
+                )
+        now_rss, then_rss = run["peak_rss_bytes"], base["peak_rss_bytes"]
+        if now_rss and then_rss and now_rss > then_rss * (1 + memory_tol) and now_rss - then_rss > MIN_RSS_BYTES:
+            problems.append(
+                f"{size:>6} paragraphs: peak RSS {now_rss / 2**20:.0f} MB "
+                f"(baseline {then_rss / 2**20:.0f} MB, +{now_rss / then_rss - 1:.0%})"
+            )
+    return problems
+
+
+def print_table(results: dict) -> None:
+    header = f"{'paragraphs':>10} " + " ".join(f"{name:>17}" for name in STAGES) + f" {'peak RSS':>9}"
+    print(header)
+    for size, run in results.items():
+        cells = " ".join(f"{run['stages'][name]['seconds']:>16.3f}s" for name in STAGES)
+        rss = run["peak_rss_bytes"]
+        print(f"{size:>10} {cells} {f'{rss / 2**20:.0f} MB' if rss else '-':>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="100,1000,10000,50000", help="Comma-separated paragraph counts")
+    parser.add_argument("--project", default="ERSV", help="Project whose knowledge base is used")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (fastest kept)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed slowdown per stage (0.25 = 25%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.15, help="Allowed peak RSS growth")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_pipeline(args.child, args.project, args.child_output)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            # JSON object keys are strings; keep them so for baseline comparison
+            results[str(size)] = measure(size, args.project, args.repeat, Path(tmp))
+    print_table(results)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({
+            "project": args.project,
+            "machine": machine(),
+            "results": results,
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline.")
+        return
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("project") != args.project:
+        sys.exit(f"ERROR: baseline is for project {baseline.get('project')}, not {args.project}")
+    if baseline.get("machine") != machine():
+        print("\nWARNING: the baseline was recorded on a different machine or Python; timings may not compare.")
+
+    problems = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if problems:
+        print(f"\nREGRESSION against {args.baseline}:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for server mode (--serve) against one CLI process per document.
+
+Builds a synthetic document (see docgen.py), then writes its edited copy
+--runs times in two ways:
+- a fresh `python src/fpr_edit.py` process per run
+- a `write` request to a server started once, with its knowledge base warm
+
+Both produce the same document.xml, apart from revision timestamps. The
+difference is the per-process cost the server saves: interpreter start-up,
+imports, knowledge base load and engine set-up.
+
+Usage:
+    python benchmarks/bench_server.py [--paragraphs 100] [--runs 5] [--mode light] [--project ERSV]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+# Add plugin root to sys.path so imports work
+PLUGIN_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+
+from docgen import DocSpec, build_docx
+from src.knowledge_base import KnowledgeBase
+from src.server import EditorialServer, _make_handler
+
+TOKEN = "bench"
+HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+
+
+def document_xml(path: Path) -> bytes:
+    with zipfile.ZipFile(path) as z:
+        return re.sub(rb'w:date="[^"]*"', b"", z.read("word/document.xml"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--paragraphs", type=int, default=100, help="Paragraphs in the synthetic document")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per variant")
+    parser.add_argument("--mode", default="light", choices=["light", "deep", "audit"], help="Editing mode")
+    parser.add_argument("--project", default="ERSV", help="Project whose knowledge base is used")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        docx = tmp / "bench_server.docx"
+        build_docx(docx, DocSpec(paragraphs=args.paragraphs, project=args.project), KnowledgeBase(args.project))
+        common = {"document": str(docx), "mode": args.mode, "paragraph_cache": False}
+
+        cli_times = []
+        for i in range(args.runs):
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, str(PLUGIN_ROOT / "src" / "fpr_edit.py"), str(docx),
+                 "--project", args.project, "--mode", args.mode, "--no-paragraph-cache",
+                 "--run-state", str(tmp / f"cli_{i}.json"), "--output", str(tmp / f"cli_{i}.docx")],
+                check=True, capture_output=True,
+            )
+            cli_times.append(time.perf_counter() - started)
+
+        app = EditorialServer(args.project, workers=1)
+        app.kbs.get(args.project)
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(app, TOKEN))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/write"
+        server_times = []
+        try:
+            for i in range(args.runs):
+                # A fresh run state each time, so no request resumes an earlier one
+                body = json.dumps({
+                    **common,
+                    "run_state": str(tmp / f"server_{i}.json"),
+                    "output": str(tmp / f"server_{i}.docx"),
+                }).encode("utf-8")
+                started = time.perf_counter()
+                with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=HEADERS)) as response:
+                    json.load(response)
+                server_times.append(time.perf_counter() - started)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            app.pool.shutdown()
+
+        if document_xml(tmp / "cli_0.docx") != document_xml(tmp / "server_0.docx"):
+            sys.exit("ERROR: server output differs from the CLI output")
+
+    print(f"{args.paragraphs} paragraphs, mode {args.mode}, {args.runs} runs each (median)")
+    print(f"  CLI process per run : {statistics.median(cli_times) * 1000:8.0f} ms")
+    print(f"  server write request: {statistics.median(server_times) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
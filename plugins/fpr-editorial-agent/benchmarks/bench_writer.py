@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark for DocxWriter.apply().
+
+Builds synthetic documents with one suggestion per paragraph and
+times apply() plus save(). With the in-memory part
+session and the paragraph index, the time per suggestion should stay
+roughly flat as the number of suggestions grows (linear total) instead of
+growing with document size (quadratic total).
+
+Usage:
+    python benchmarks/bench_writer.py [--sizes 100,200,400,800]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+# Add plugin root to sys.path so imports work
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.docx_package import DocxPackage
+from src.docx_writer import DocxWriter
+from src.rule_engine import EngineResult, Suggestion
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+PARAGRAPH = (
+    '<w:p><w:r><w:t xml:space="preserve">El municipio de </w:t></w:r>'
+    '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Bayamon</w:t></w:r>'
+    '<w:r><w:t xml:space="preserve"> (ref. {i}) presentó su plan de recuperación.</w:t></w:r></w:p>'
+)
+
+
+def build_docx(target: Path, paragraphs: int) -> None:
+    """Write a minimal DOCX with the given number of paragraphs."""
+    body = "".join(PARAGRAPH.format(i=i) for i in range(paragraphs))
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "word/document.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:document xmlns:w="{WORD_NS}"><w:body>{body}</w:body></w:document>',
+        )
+
+
+def build_result(paragraphs: int) -> EngineResult:
+    """One suggestion per paragraph, alternating track changes and comments."""
+    result = EngineResult()
+    for i in reversed(range(paragraphs)):
+        s = Suggestion(
+            original=f"Bayamon (ref. {i})",
+            replacement=f"Bayamón (ref. {i})",
+            rule_id="BENCH-001",
+            confidence=1.0 if i % 2 == 0 else 0.7,
+            rationale="Benchmark substitution",
+            paragraph_index=i,
+            source="deterministic",
+            start=len("El municipio de "),
+        )
+        (result.high_confidence if i % 2 == 0 else result.low_confidence).append(s)
+    return result
+
+
+def run(size: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        docx = Path(tmp) / "bench.docx"
+        build_docx(docx, size)
+        result = build_result(size)
+
+        with DocxPackage(docx) as package:
+            writer = DocxWriter(package=package, original_docx=docx)
+            start = time.perf_counter()
+            stats = writer.apply(result)
+            writer.save(Path(tmp) / "bench_out.docx")
+            elapsed = time.perf_counter() - start
+
+        if stats["failed"]:
+            raise RuntimeError(f"{stats['failed']} suggestions failed to apply")
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DocxWriter.apply()")
+    parser.add_argument("--sizes", default="100,200,400,800",
+                        help="Comma-separated suggestion counts (one paragraph each)")
+    args = parser.parse_args()
+
+    print(f"{'suggestions':>12} {'apply (s)':>10} {'us/suggestion':>14} {'growth':>8}")
+    previous = None
+    for size in (int(x) for x in args.sizes.split(",")):
+        elapsed = run(size)
+        per = elapsed / size * 1e6
+        growth = f"{elapsed / previous:.2f}x" if previous else "-"
+        print(f"{size:>12} {elapsed:>10.3f} {per:>14.1f} {growth:>8}")
+        previous = elapsed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Synthetic WordprocessingML documents for benchmarks.
+
+Paragraph text mixes Spanish and English filler with terms drawn from a
+project's term bank (originals in several casings, and their
+replacements), so the engine finds realistic numbers of matches. The
+generator can also add:
+
+- run fragmentation: text split across many <w:r> elements, some with
+  their own formatting, as Word produces after editing
+- hyperlinks (<w:hyperlink> with an external relationship)
+- tables, headings and FootnoteText-styled body paragraphs
+- real footnotes (footnotes.xml) referenced from body paragraphs
+
+Output is deterministic for a given DocSpec (including seed).
+
+Usage:
+    python benchmarks/docgen.py out.docx [--paragraphs 5000] [--project ERSV] [--spanish 0.5]
+"""
+
+import argparse
+import random
+import sys
+import zipfile
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import escape
+
+# Add plugin root to sys.path so imports work
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.knowledge_base import KnowledgeBase
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+HYPERLINK_REL = f"{REL_NS}/hyperlink"
+FOOTNOTES_REL = f"{REL_NS}/footnotes"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+
+FILLER = {
+    "es": (
+        "el programa apoya los esfuerzos de planificación municipal en toda la isla "
+        "y la comunidad participa en el proceso de recuperación con datos del censo "
+        "sobre vivienda infraestructura y resiliencia"
+    ).split(),
+    "en": (
+        "the program supports municipal planning efforts across the island and the "
+        "community takes part in the recovery process with census data on housing "
+        "infrastructure and resilience"
+    ).split(),
+}
+
+RUN_FORMATS = ("<w:b/>", "<w:i/>", '<w:lang w:val="es-PR"/>', '<w:sz w:val="22"/>')
+
+
+@dataclass
+class DocSpec:
+    """What to generate. Shares are per paragraph, between 0 and 1."""
+
+    paragraphs: int = 1000
+    project: str = "ERSV"
+    spanish: float = 0.5          # share of Spanish paragraphs (the rest English)
+    term_density: float = 0.15    # share of words drawn from the term bank
+    max_run_chars: int = 12       # split text into runs of 1..N chars (0: one run per paragraph)
+    formatted_runs: float = 0.2   # share of runs with their own rPr
+    hyperlinks: float = 0.05
+    tables: float = 0.1
+    headings: float = 0.05
+    footnote_styled: float = 0.05
+    footnotes: float = 0.1        # paragraphs carrying a footnote reference
+    seed: int = 0
+
+
+def term_phrases(kb: KnowledgeBase) -> list[str]:
+    """Literal originals (in several casings) and replacements of a project's entries."""
+    phrases = []
+    for entry in kb.get_term_bank_entries() + kb.get_ai_humanizer_entries():
+        if entry.get("pattern_type") == "regex":
+            continue
+        original = entry.get("original", "")
+        phrases += [original, original.lower(), original.title(), entry.get("replacement", "")]
+    return [p for p in phrases if p]
+
+
+class _Builder:
+    def __init__(self, spec: DocSpec, kb: KnowledgeBase):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.phrases = term_phrases(kb)
+        self.rels: list[str] = []
+        self.footnotes: list[str] = []
+        self.counts = {"paragraphs": 0, "runs": 0, "hyperlinks": 0, "tables": 0, "footnotes": 0}
+
+    def text(self, lang: str) -> str:
+        rng, spec = self.rng, self.spec
+        words = [
+            rng.choice(self.phrases) if rng.random() < spec.term_density else rng.choice(FILLER[lang])
+            for _ in range(rng.randint(8, 40))
+        ]
+        return " ".join(words) + "."
+
+    def runs(self, text: str) -> str:
+        rng, spec = self.rng, self.spec
+        pieces = []
+        i = 0
+        while i < len(text):
+            n = rng.randint(1, spec.max_run_chars) if spec.max_run_chars else len(text)
+            rpr = ""
+            if rng.random() < spec.formatted_runs:
+                rpr = f"<w:rPr>{rng.choice(RUN_FORMATS)}</w:rPr>"
+            pieces.append(f'<w:r>{rpr}<w:t xml:space="preserve">{escape(text[i:i + n])}</w:t></w:r>')
+            i += n
+        self.counts["runs"] += len(pieces)
+        return "".join(pieces)
+
+    def hyperlink(self, lang: str) -> str:
+        rel_id = f"rIdLink{len(self.rels) + 1}"
+        self.rels.append(
+            f'<Relationship Id="{rel_id}" Type="{HYPERLINK_REL}" '
+            f'Target="https://example.org/{len(self.rels) + 1}" TargetMode="External"/>'
+        )
+        self.counts["hyperlinks"] += 1
+        words = " ".join(self.rng.choice(FILLER[lang]) for _ in range(3))
+        if self.rng.random() < 0.5:
+            words += " " + self.rng.choice(self.phrases)
+        return (
+            f'<w:r><w:t xml:space="preserve"> </w:t></w:r><w:hyperlink r:id="{rel_id}">'
+            f'<w:r><w:rPr><w:rStyle w:val="Hyperlink"/></w:rPr>'
+            f'<w:t xml:space="preserve">{escape(words)}</w:t></w:r></w:hyperlink>'
+        )
+
+    def footnote(self, lang: str) -> str:
+        note_id = len(self.footnotes) + 1
+        self.footnotes.append(
+            f'<w:footnote w:id="{note_id}">{self.paragraph(lang, "FootnoteText", extras=False, body=False)}</w:footnote>'
+        )
+        self.counts["footnotes"] += 1
+        return (
+            '<w:r><w:rPr><w:rStyle w:val="FootnoteReference"/></w:rPr>'
+            f'<w:footnoteReference w:id="{note_id}"/></w:r>'
+        )
+
+    def paragraph(
+        self, lang: str, style: Optional[str] = None, extras: bool = True, body: bool = True
+    ) -> str:
+        """One paragraph; extras allows a hyperlink and a footnote reference."""
+        rng, spec = self.rng, self.spec
+        ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        content = self.runs(self.text(lang))
+        if extras and rng.random() < spec.hyperlinks:
+            content += self.hyperlink(lang)
+        if extras and rng.random() < spec.footnotes:
+            content += self.footnote(lang)
+        if body:
+            self.counts["paragraphs"] += 1
+        return f"<w:p>{ppr}{content}</w:p>"
+
+    def body(self) -> str:
+        rng, spec = self.rng, self.spec
+        out = []
+        remaining = spec.paragraphs
+        while remaining > 0:
+            lang = "es" if rng.random() < spec.spanish else "en"
+            roll = rng.random()
+            if roll < spec.tables and remaining >= 4:
+                # 2x2 table: four paragraphs
+                cells = [f"<w:tc>{self.paragraph(lang)}</w:tc>" for _ in range(4)]
+                out.append(f"<w:tbl><w:tr>{''.join(cells[:2])}</w:tr><w:tr>{''.join(cells[2:])}</w:tr></w:tbl>")
+                self.counts["tables"] += 1
+                remaining -= 4
+                continue
+            roll -= spec.tables
+            if roll < spec.headings:
+                out.append(self.paragraph(lang, f"Heading{rng.randint(1, 3)}", extras=False))
+            elif roll < spec.headings + spec.footnote_styled:
+                out.append(self.paragraph(lang, "FootnoteText", extras=False))
+            else:
+                out.append(self.paragraph(lang))
+            remaining -= 1
+        return "".join(out)
+
+
+def build_docx(target: Path, spec: DocSpec, kb: Optional[KnowledgeBase] = None) -> dict:
+    """Write a synthetic .docx for spec and return counts of what it contains."""
+    kb = kb or KnowledgeBase(spec.project)
+    builder = _Builder(spec, kb)
+    body = builder.body()
+
+    document = (
+        f'{XML_DECLARATION}<w:document xmlns:w="{WORD_NS}" xmlns:r="{REL_NS}">'
+        f"<w:body>{body}<w:sectPr/></w:body></w:document>"
+    )
+    separators = (
+        '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+        '<w:footnote w:type="continuationSeparator" w:id="0"><w:p><w:r><w:continuationSeparator/></w:r></w:p></w:footnote>'
+    )
+    footnotes = (
+        f'{XML_DECLARATION}<w:footnotes xmlns:w="{WORD_NS}" xmlns:r="{REL_NS}">'
+        f'{separators}{"".join(builder.footnotes)}</w:footnotes>'
+    )
+    document_rels = (
+        f'{XML_DECLARATION}<Relationships xmlns="{PKG_REL_NS}">'
+        f'<Relationship Id="rIdFootnotes" Type="{FOOTNOTES_REL}" Target="footnotes.xml"/>'
+        f'{"".join(builder.rels)}</Relationships>'
+    )
+    content_types = (
+        f'{XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/footnotes.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"/>'
+        "</Types>"
+    )
+    package_rels = (
+        f'{XML_DECLARATION}<Relationships xmlns="{PKG_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="word/document.xml"/>'
+        "</Relationships>"
+    )
+
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", content_types)
+        zf.writestr("_rels/.rels", package_rels)
+        zf.writestr("word/_rels/document.xml.rels", document_rels)
+        zf.writestr("word/document.xml", document)
+        zf.writestr("word/footnotes.xml", footnotes)
+    return builder.counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("output", type=Path, help="Path of the .docx to write")
+    defaults = DocSpec()
+    for f in fields(DocSpec):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}", type=type(getattr(defaults, f.name)),
+            default=getattr(defaults, f.name),
+        )
+    args = vars(parser.parse_args())
+    output = args.pop("output")
+    spec = DocSpec(**args)
+    counts = build_docx(output, spec)
+    print(f"Wrote {output}: {counts} ({asdict(spec)})")
+
+
+if __name__ == "__main__":
+    main()
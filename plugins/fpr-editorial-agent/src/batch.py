@@ -0,0 +1,264 @@
+"""
+Batch mode for the FPR Editorial Agent.
+
+Processes a folder (or glob) of .docx files with one knowledge base load:
+the parent builds the KnowledgeBase and its compiled matcher once and hands
+it to each pool worker through the initializer, so workers only pay for
+their documents. A failure in one document is recorded and the batch keeps
+going; an aggregate summary is written at the end.
+"""
+
+import glob
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from src.docx_package import DocxPackage
+from src.knowledge_base import KnowledgeBase
+from src.paragraph_cache import KINDS, ParagraphCache
+from src.pipeline import export_heuristic_tasks, heuristic_header
+from src.reports import write_changelog, write_flags
+from src.rule_engine import RuleEngine
+
+# Per-process engine, set by _init_worker()
+_ENGINE: Optional[RuleEngine] = None
+_OPTIONS: dict = {}
+
+
+def collect_documents(target: str) -> list[Path]:
+    """Resolve a directory or glob pattern to the .docx files to process.
+
+    Skips Word lock files (~$*.docx) and previous agent outputs.
+    """
+    path = Path(target)
+    if path.is_dir():
+        candidates = path.glob("*.docx")
+    else:
+        candidates = (Path(p) for p in glob.glob(target, recursive=True))
+
+    documents = []
+    for doc in candidates:
+        if doc.suffix.lower() != ".docx" or not doc.is_file():
+            continue
+        if doc.name.startswith("~$") or "_FPRStyleAI_" in doc.stem:
+            continue
+        documents.append(doc)
+    return sorted(documents)
+
+
+def output_paths(doc_path: Path, output_dir: Optional[Path]) -> dict:
+    """Return output, changelog, flags and heuristic task paths for one document."""
+    folder = output_dir or doc_path.parent
+    base = f"{doc_path.stem}_FPRStyleAI_{date.today().isoformat()}"
+    return {
+        "output": folder / f"{base}.docx",
+        "changelog": folder / f"{base}_changelog.md",
+        "flags": folder / f"{base}_flags.md",
+        "heuristic": folder / f"{doc_path.stem}_heuristic_tasks.json",
+    }
+
+
+def _init_worker(kb: KnowledgeBase, options: dict) -> None:
+    global _ENGINE, _OPTIONS
+    _ENGINE = RuleEngine(
+        kb=kb,
+        mode=options["mode"],
+        audience_id=options["audience"],
+        language=options["lang"],
+        streaming=options.get("stream", False),
+        all_occurrences=options.get("all_occurrences", False),
+        parallel_parts=False,  # the batch pool already keeps every core busy
+    )
+    _OPTIONS = options
+
+
+def _process_document(doc: str) -> dict:
+    """Run the full pipeline on one document inside a worker. Never raises."""
+    doc_path = Path(doc)
+    started = time.perf_counter()
+    record = {"document": str(doc_path), "status": "ok", "error": None}
+    try:
+        record.update(process_document(_ENGINE, doc_path, _OPTIONS))
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def process_document(engine: RuleEngine, doc_path: Path, options: dict) -> dict:
+    """Analyze one document and write its outputs, changelog, flags and tasks."""
+    if not options.get("paragraph_cache"):
+        engine.cache = None
+        return _process_document_outputs(engine, doc_path, options)
+
+    # One connection per document keeps hit rates per document and lets
+    # concurrent workers share the store.
+    with ParagraphCache.for_run(
+        engine.kb, options["mode"], options["audience"], options["lang"]
+    ) as cache:
+        engine.cache = cache
+        try:
+            record = _process_document_outputs(engine, doc_path, options)
+        finally:
+            engine.cache = None
+        record["paragraph_cache"] = cache.stats()
+    return record
+
+
+def _process_document_outputs(engine: RuleEngine, doc_path: Path, options: dict) -> dict:
+    mode = options["mode"]
+    paths = output_paths(doc_path, options.get("output_dir"))
+    paths["output"].parent.mkdir(parents=True, exist_ok=True)
+
+    with DocxPackage(doc_path) as package:
+        wants_heuristic = mode in ("deep", "audit")
+        if engine.streaming:
+            result, tasks = engine.run_streaming(package, extract_heuristic=wants_heuristic)
+        else:
+            result = engine.run(package)
+            tasks = engine.extract_heuristic_tasks(package) if wants_heuristic else []
+
+        heuristic_tasks = 0
+        if wants_heuristic:
+            if engine.cached_heuristic:
+                engine.add_heuristic_suggestions(result, engine.cached_heuristic, package)
+            tasks, _ = engine.select_heuristic_tasks(
+                tasks, options.get("heuristic_budget"), options.get("heuristic_min_score")
+            )
+            heuristic_tasks = len(tasks)
+            if tasks:
+                export_heuristic_tasks(
+                    tasks, paths["heuristic"], heuristic_header(engine, doc_path),
+                    options.get("heuristic_format", 2),
+                )
+
+        written, stats = write_outputs(package, doc_path, result, paths, options)
+
+    if heuristic_tasks:
+        written["heuristic_tasks"] = str(paths["heuristic"])
+
+    rules = Counter(s.rule_id for s in result.high_confidence + result.low_confidence)
+    return {
+        "outputs": written,
+        "high_confidence": len(result.high_confidence),
+        "low_confidence": len(result.low_confidence),
+        "skipped": len(result.skipped),
+        "heuristic_tasks": heuristic_tasks,
+        "track_changes_applied": stats["track_changes_applied"],
+        "comments_applied": stats["comments_applied"],
+        "failed_suggestions": stats["failed"],
+        "overlapping_suggestions": stats["overlapping"],
+        "rules": dict(rules),
+    }
+
+
+def write_outputs(package: DocxPackage, doc_path: Path, result, paths: dict, options: dict) -> tuple[dict, dict]:
+    """Write the edited document (not in audit mode), changelog and flags.
+
+    Returns (paths written by kind, writer stats).
+    """
+    from src.docx_writer import DocxWriter
+
+    mode = options["mode"]
+    for kind in ("output", "changelog", "flags"):
+        paths[kind].parent.mkdir(parents=True, exist_ok=True)
+    stats = {"track_changes_applied": 0, "comments_applied": 0, "failed": 0, "overlapping": 0}
+    written = {}
+    if mode != "audit":
+        if result.high_confidence or result.low_confidence:
+            writer = DocxWriter(package=package, original_docx=doc_path, author=options["author"])
+            stats = writer.apply(result)
+            writer.save(destination=paths["output"])
+        else:
+            import shutil
+            shutil.copy2(doc_path, paths["output"])
+        written["output"] = str(paths["output"])
+
+    if not options.get("no_changelog"):
+        write_changelog(paths["changelog"], result, doc_path.name, options["project"], mode)
+        written["changelog"] = str(paths["changelog"])
+    if result.low_confidence or mode == "audit":
+        write_flags(paths["flags"], result)
+        written["flags"] = str(paths["flags"])
+    return written, stats
+
+
+def run_batch(
+    kb: KnowledgeBase,
+    documents: list[Path],
+    options: dict,
+    workers: Optional[int] = None,
+    on_result=None,
+) -> dict:
+    """Process documents across a process pool and return the aggregate summary.
+
+    on_result, if given, is called with each per-document record as it
+    completes (used by the CLI for progress output).
+    """
+    kb.get_term_matcher()  # compile once in the parent; workers receive it pickled
+
+    started = time.perf_counter()
+    records = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(kb, options),
+    ) as pool:
+        futures = {pool.submit(_process_document, str(doc)): doc for doc in documents}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # Worker process died (e.g. BrokenProcessPool); record and continue
+                record = {
+                    "document": str(futures[future]),
+                    "status": "failed",
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": None,
+                }
+            records.append(record)
+            if on_result is not None:
+                on_result(record)
+
+    records.sort(key=lambda r: r["document"])
+    rules = Counter()
+    cache_hits, cache_misses = Counter(), Counter()
+    for record in records:
+        rules.update(record.get("rules", {}))
+        for kind, stats in record.get("paragraph_cache", {}).items():
+            cache_hits[kind] += stats["hits"]
+            cache_misses[kind] += stats["misses"]
+    paragraph_cache = {
+        kind: {
+            "hits": cache_hits[kind],
+            "misses": cache_misses[kind],
+            "hit_rate": round(cache_hits[kind] / (cache_hits[kind] + cache_misses[kind]), 3),
+        }
+        for kind in KINDS
+        if cache_hits[kind] or cache_misses[kind]
+    }
+
+    return {
+        "project": options["project"],
+        "mode": options["mode"],
+        "date": date.today().isoformat(),
+        "workers": workers,
+        "documents": len(records),
+        "succeeded": sum(1 for r in records if r["status"] == "ok"),
+        "failed": sum(1 for r in records if r["status"] != "ok"),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "suggestions_per_rule": dict(rules.most_common()),
+        "paragraph_cache": paragraph_cache,
+        "results": records,
+    }
+
+
+def write_summary(summary: dict, path: Path) -> None:
+    """Write the aggregate batch summary as JSON."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
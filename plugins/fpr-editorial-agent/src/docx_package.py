@@ -0,0 +1,236 @@
+"""
+In-process DOCX package access for the FPR Editorial Agent.
+
+Reads parts straight from the .docx zip and parses XML parts into lxml on
+first access. Saving writes a new zip in which untouched parts (media,
+fonts, styles, ...) are copied byte-for-byte in their original compressed
+form, and only the parts that were modified are re-serialized.
+"""
+
+import io
+import os
+import re
+import struct
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+import lxml.etree
+
+from src.part_index import PartIndex
+
+DOCUMENT_PART = "word/document.xml"
+COMMENTS_PART = "word/comments.xml"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+FOOTNOTES_PART = "word/footnotes.xml"
+ENDNOTES_PART = "word/endnotes.xml"
+
+_HEADER_PART = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"^word/footer\d*\.xml$")
+
+# Local file header field indices (see zipfile.structFileHeader)
+_FH_SIGNATURE = 0
+_FH_FILENAME_LENGTH = 10
+_FH_EXTRA_FIELD_LENGTH = 11
+
+
+class DocxPackage:
+    """A .docx opened in memory: lazy lxml parts, raw pass-through for the rest."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path, "r")
+        self._infos = {info.filename: info for info in self._zip.infolist()}
+        self._trees: dict[str, lxml.etree._ElementTree] = {}
+        self._data: dict[str, bytes] = {}
+        self._modified: set[str] = set()
+        self._indexes: dict[str, PartIndex] = {}
+        # xml_parsed / xml_streamed / xml_serialized / parts_indexed / parts_rewritten / parts_copied_raw
+        self.counters: Counter = Counter()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> "DocxPackage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Part access
+    # ------------------------------------------------------------------
+
+    def names(self) -> list[str]:
+        """Return part names in archive order, followed by newly added parts."""
+        added = [n for n in list(self._trees) + list(self._data) if n not in self._infos]
+        return list(self._infos) + list(dict.fromkeys(added))
+
+    def text_parts(self) -> list[str]:
+        """Return the text-bearing parts in processing order.
+
+        Body first, then footnotes, endnotes, headers and footers.
+        """
+        names = self.names()
+        parts = [p for p in (DOCUMENT_PART, FOOTNOTES_PART, ENDNOTES_PART) if p in names]
+        parts += sorted(n for n in names if _HEADER_PART.match(n))
+        parts += sorted(n for n in names if _FOOTER_PART.match(n))
+        return parts
+
+    def part_size(self, name: str) -> int:
+        """Return the uncompressed size of a stored part (0 for in-memory parts)."""
+        info = self._infos.get(name)
+        return info.file_size if info is not None else 0
+
+    def is_modified(self, name: str) -> bool:
+        """Return True if a part was changed or added since the package was opened."""
+        return name in self._modified or name not in self._infos
+
+    def has_part(self, name: str) -> bool:
+        return name in self._infos or name in self._trees or name in self._data
+
+    def read(self, name: str) -> bytes:
+        """Return the current (uncompressed) bytes of a part."""
+        if name in self._trees:
+            return self._serialize(name)
+        if name in self._data:
+            return self._data[name]
+        if name not in self._infos:
+            raise KeyError(f"Part not found in package: {name}")
+        return self._zip.read(name)
+
+    def open_stream(self, name: str):
+        """Return a binary file object over a part, decompressed on the fly.
+
+        Parts that were already parsed or replaced are served from memory.
+        """
+        if name in self._trees or name in self._data:
+            return io.BytesIO(self.read(name))
+        if name not in self._infos:
+            raise KeyError(f"Part not found in package: {name}")
+        self.counters["xml_streamed"] += 1
+        return self._zip.open(name)
+
+    def xml(self, name: str) -> lxml.etree._ElementTree:
+        """Return the parsed tree for an XML part, parsing it on first access."""
+        tree = self._trees.get(name)
+        if tree is None:
+            root = lxml.etree.fromstring(self.read(name))
+            self.counters["xml_parsed"] += 1
+            tree = self._trees[name] = root.getroottree()
+            self._data.pop(name, None)
+        return tree
+
+    def part_index(self, name: str) -> PartIndex:
+        """Return the paragraph / tracked-run index of an XML part, built on first access.
+
+        Callers that add tracked-change wrappers to the tree register them
+        with PartIndex.mark_tracked(); paragraphs are never added or removed.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = PartIndex(self.xml(name).getroot())
+            self.counters["parts_indexed"] += 1
+        return index
+
+    def add_xml(self, name: str, root: lxml.etree._Element) -> lxml.etree._ElementTree:
+        """Create (or replace) an XML part from a root element."""
+        tree = self._trees[name] = root.getroottree()
+        self._indexes.pop(name, None)
+        self._data.pop(name, None)
+        self._modified.add(name)
+        return tree
+
+    def write_bytes(self, name: str, data: bytes) -> None:
+        """Create (or replace) a part with raw bytes."""
+        self._trees.pop(name, None)
+        self._indexes.pop(name, None)
+        self._data[name] = data
+        self._modified.add(name)
+
+    def mark_modified(self, name: str) -> None:
+        """Flag a parsed part as changed so save() re-serializes it."""
+        self._modified.add(name)
+
+    # ------------------------------------------------------------------
+    # Save
+    # ------------------------------------------------------------------
+
+    def save(self, destination: Path) -> None:
+        """Write the package to destination (which may be the source file)."""
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        partial = destination.with_name(destination.name + ".partial")
+
+        with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as out:
+            for name in self.names():
+                if name in self._modified or name not in self._infos:
+                    original = self._infos.get(name)
+                    info = zipfile.ZipInfo(name, original.date_time if original else _now())
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    if original is not None:
+                        info.external_attr = original.external_attr
+                    out.writestr(info, self.read(name))
+                    self.counters["parts_rewritten"] += 1
+                else:
+                    self._copy_raw(self._infos[name], out)
+
+        os.replace(partial, destination)
+
+    def _serialize(self, name: str) -> bytes:
+        self.counters["xml_serialized"] += 1
+        return lxml.etree.tostring(
+            self._trees[name], xml_declaration=True, encoding="UTF-8", standalone=True
+        )
+
+    def _copy_raw(self, info: zipfile.ZipInfo, out: zipfile.ZipFile) -> None:
+        """Copy a member's compressed payload into out without recompressing it.
+
+        CRC and sizes come from the central directory, so a source entry
+        followed by a data descriptor, or whose local header holds ZIP64
+        sizes, is copied with a plain local header carrying the real
+        values; zipfile adds the ZIP64 fields itself where sizes or
+        offsets need them. This writes through zipfile's own bookkeeping
+        (fp, filelist, NameToInfo, start_dir), as ZipFile.writestr does.
+        """
+        fp = self._zip.fp
+        fp.seek(info.header_offset)
+        fields = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+        if fields[_FH_SIGNATURE] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Bad local file header for {info.filename}")
+        fp.seek(
+            info.header_offset + zipfile.sizeFileHeader
+            + fields[_FH_FILENAME_LENGTH] + fields[_FH_EXTRA_FIELD_LENGTH]
+        )
+        payload = fp.read(info.compress_size)
+        if len(payload) != info.compress_size:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+
+        copied = zipfile.ZipInfo(info.filename, info.date_time)
+        copied.compress_type = info.compress_type
+        copied.CRC = info.CRC
+        copied.compress_size = info.compress_size
+        copied.file_size = info.file_size
+        copied.external_attr = info.external_attr
+        copied.create_system = info.create_system
+        # Sizes are known up front, so no trailing data descriptor is written
+        copied.flag_bits = info.flag_bits & ~0x08
+
+        copied.header_offset = out.fp.tell()
+        out.fp.write(copied.FileHeader())
+        out.fp.write(payload)
+        out.filelist.append(copied)
+        out.NameToInfo[copied.filename] = copied
+        out.start_dir = out.fp.tell()
+        self.counters["parts_copied_raw"] += 1
+
+
+def is_header_or_footer(name: str) -> bool:
+    """Return True for word/headerN.xml and word/footerN.xml parts."""
+    return bool(_HEADER_PART.match(name) or _FOOTER_PART.match(name))
+
+
+def _now() -> tuple:
+    from datetime import datetime
+    return datetime.now().timetuple()[:6]
@@ -4,18 +4,29 @@ DOCX writer for the FPR Editorial Agent.
 Applies suggestions from the rule engine as native Word track changes
 (high confidence) or Word comments (low confidence).
 
-Track changes use lxml for cross-run text matching (handles Word's
-arbitrary run fragmentation) and unique w:id assignment.
+Track changes are applied at the engine's character offsets, mapped onto
+the paragraph's runs with lxml (handles Word's arbitrary run
+fragmentation), with unique w:id assignment. Suggestions may
+target any text part (body, footnotes, endnotes, headers, footers).
 """
 
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Optional
+from collections import Counter
 import copy
 import unicodedata
 
 import lxml.etree
 
+from src.docx_package import (
+    COMMENTS_PART,
+    CONTENT_TYPES_PART,
+    DOCUMENT_PART,
+    DOCUMENT_RELS_PART,
+    DocxPackage,
+    is_header_or_footer,
+)
 from src.rule_engine import EngineResult, Suggestion
 
 WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
@@ -24,23 +35,139 @@ W = f"{{{WORD_NS}}}"
 # Namespace map for lxml element creation
 NSMAP = {"w": WORD_NS}
 
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+COMMENTS_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+COMMENTS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+class _CommentsBuilder:
+    """Comments gathered during DocxWriter.apply(), written to comments.xml in one go.
+
+    Each comment body is a list of paragraphs. write() creates the comments
+    part (and its relationship and content type) if needed and appends
+    every comment in ID order.
+    """
+
+    def __init__(self, author: str, initials: str):
+        self.author = author
+        self.initials = initials
+        self._comments: list[tuple[int, str, list[str]]] = []  # (id, date, paragraphs)
+
+    def __len__(self) -> int:
+        return len(self._comments)
+
+    def add(self, comment_id: int, timestamp: str, paragraphs: list[str]) -> None:
+        self._comments.append((comment_id, timestamp, paragraphs))
+
+    def write(self, package: DocxPackage) -> None:
+        """Append the gathered comments to package's comments.xml and clear the builder."""
+        if not self._comments:
+            return
+        if not package.has_part(COMMENTS_PART):
+            package.add_xml(COMMENTS_PART, lxml.etree.fromstring(
+                '<w:comments'
+                ' xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+                ' xmlns:w14="http://schemas.microsoft.com/office/word/2010/wordml"'
+                '></w:comments>'
+            ))
+            self._ensure_relationship(package)
+            self._ensure_content_type(package)
+
+        root = package.xml(COMMENTS_PART).getroot()
+        for comment_id, timestamp, paragraphs in sorted(self._comments, key=lambda c: c[0]):
+            root.append(self._comment_elem(comment_id, timestamp, paragraphs))
+        package.mark_modified(COMMENTS_PART)
+        self._comments.clear()
+
+    def _comment_elem(self, comment_id: int, timestamp: str, paragraphs: list[str]):
+        """Build a <w:comment> with one <w:p> per paragraph, as Word writes them."""
+        comment = lxml.etree.Element(f"{W}comment")
+        comment.set(f"{W}id", str(comment_id))
+        comment.set(f"{W}author", self.author)
+        comment.set(f"{W}date", timestamp)
+        comment.set(f"{W}initials", self.initials)
+
+        for i, text in enumerate(paragraphs):
+            p = lxml.etree.SubElement(comment, f"{W}p")
+            ppr = lxml.etree.SubElement(p, f"{W}pPr")
+            lxml.etree.SubElement(ppr, f"{W}pStyle").set(f"{W}val", "CommentText")
+            if i == 0:
+                # The mark Word shows at the start of the comment
+                ref = lxml.etree.SubElement(p, f"{W}r")
+                rpr = lxml.etree.SubElement(ref, f"{W}rPr")
+                lxml.etree.SubElement(rpr, f"{W}rStyle").set(f"{W}val", "CommentReference")
+                lxml.etree.SubElement(ref, f"{W}annotationRef")
+            if text:
+                r = lxml.etree.SubElement(p, f"{W}r")
+                t = lxml.etree.SubElement(r, f"{W}t")
+                t.text = text
+                t.set(XML_SPACE, "preserve")
+        return comment
+
+    @staticmethod
+    def _ensure_relationship(package: DocxPackage) -> None:
+        """Add the comments relationship to word/_rels/document.xml.rels if missing."""
+        if not package.has_part(DOCUMENT_RELS_PART):
+            return
+        root = package.xml(DOCUMENT_RELS_PART).getroot()
+        rels = root.findall(f"{{{PKG_REL_NS}}}Relationship")
+        if any(rel.get("Type") == COMMENTS_REL_TYPE for rel in rels):
+            return
+        ids = {rel.get("Id") for rel in rels}
+        rel_id = "rIdComments"
+        n = 1
+        while rel_id in ids:
+            n += 1
+            rel_id = f"rIdComments{n}"
+        rel = lxml.etree.SubElement(root, f"{{{PKG_REL_NS}}}Relationship")
+        rel.set("Id", rel_id)
+        rel.set("Type", COMMENTS_REL_TYPE)
+        rel.set("Target", "comments.xml")
+        package.mark_modified(DOCUMENT_RELS_PART)
+
+    @staticmethod
+    def _ensure_content_type(package: DocxPackage) -> None:
+        """Add the comments part override to [Content_Types].xml if missing."""
+        if not package.has_part(CONTENT_TYPES_PART):
+            return
+        root = package.xml(CONTENT_TYPES_PART).getroot()
+        part_name = f"/{COMMENTS_PART}"
+        overrides = root.findall(f"{{{CONTENT_TYPES_NS}}}Override")
+        if any(o.get("PartName") == part_name for o in overrides):
+            return
+        override = lxml.etree.SubElement(root, f"{{{CONTENT_TYPES_NS}}}Override")
+        override.set("PartName", part_name)
+        override.set("ContentType", COMMENTS_CONTENT_TYPE)
+        package.mark_modified(CONTENT_TYPES_PART)
+
 
 class DocxWriter:
-    """Applies editorial suggestions to an unpacked DOCX as track changes."""
+    """Applies editorial suggestions to an open DocxPackage as track changes.
+
+    XML parts are parsed once on first access and kept in memory for the
+    whole session; every suggestion mutates the same trees, and modified
+    parts are serialized once by save().
+    """
 
     def __init__(
         self,
-        unpacked_dir: Path,
+        package: DocxPackage,
         original_docx: Path,
         author: str = "FPR Editorial Agent",
         initials: str = "FPR",
     ):
-        self.unpacked_dir = Path(unpacked_dir)
+        self.package = package
         self.original_docx = Path(original_docx)
         self.author = author
         self.initials = initials
         self._next_id_counter = None
         self._next_comment_id = None
+        self._offset_maps: dict[tuple[str, int], tuple] = {}
+        self._comments = _CommentsBuilder(author, initials)
+        # Work counters for metrics (offset_maps_built, offset_maps_invalidated, ...)
+        self.counters: Counter = Counter()
 
     def apply(self, result: EngineResult) -> dict:
         """Apply all suggestions from the engine result.
@@ -48,60 +175,170 @@ class DocxWriter:
         High-confidence suggestions -> track changes (<w:ins>/<w:del>)
         Low-confidence suggestions -> Word comments
 
-        Returns a dict with counts of applied/failed changes.
+        Every suggestion is applied at its engine offsets, never by searching
+        for its text, and is rejected (failed) if the paragraph text at those
+        offsets is not its original text. Suggestions are applied paragraph
+        by paragraph in one sweep from the end of each paragraph to its start
+        (see _sweep_order), so the offsets of the ones still to come stay
+        valid. A suggestion overlapping a change already made in its
+        paragraph is skipped.
+
+        Returns a dict with counts of applied/failed/overlapping changes.
         """
-        stats = {"track_changes_applied": 0, "comments_applied": 0, "failed": 0}
+        stats = {"track_changes_applied": 0, "comments_applied": 0, "failed": 0, "overlapping": 0}
 
         # Initialize the ID counter by scanning the document for existing IDs
         self._init_id_counter()
 
-        # Apply high-confidence suggestions as track changes
-        # Already sorted end->start by the engine
-        for suggestion in result.high_confidence:
+        # (part, paragraph_index) -> start of the leftmost track change made there
+        changed_from: dict[tuple[str, int], int] = {}
+
+        for suggestion, track_change in self._sweep_order(result):
+            key = suggestion.paragraph_key
+            if suggestion.start is not None and key in changed_from and suggestion.end > changed_from[key]:
+                stats["overlapping"] += 1
+                print(f"  WARNING: Skipped '{suggestion.original}': overlaps another change in its paragraph")
+                continue
+
+            if not track_change:
+                # Low-confidence suggestions -> Word comments (pure lxml)
+                try:
+                    self._apply_comment(suggestion)
+                    stats["comments_applied"] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"  WARNING: Failed to apply comment for '{suggestion.original}': {e}")
+                continue
+
             try:
-                # Comment first — anchor needs original text before track change replaces it
-                self._apply_comment(suggestion)
+                # Comment first — anchor needs original text before track change replaces it.
+                # Word has no comments in headers/footers; those get the track change only.
+                commented = self._supports_comments(suggestion.part)
+                if commented:
+                    self._apply_comment(suggestion)
                 self._apply_track_change(suggestion)
                 stats["track_changes_applied"] += 1
-                stats["comments_applied"] += 1
+                if commented:
+                    stats["comments_applied"] += 1
+                if suggestion.start is not None:
+                    changed_from[key] = min(changed_from.get(key, suggestion.start), suggestion.start)
             except Exception as e:
                 stats["failed"] += 1
                 print(f"  WARNING: Failed to apply track change for '{suggestion.original}': {e}")
 
-        # Apply low-confidence suggestions as Word comments (pure lxml)
-        for suggestion in result.low_confidence:
-            try:
-                self._apply_comment(suggestion)
-                stats["comments_applied"] += 1
-            except Exception as e:
-                stats["failed"] += 1
-                print(f"  WARNING: Failed to apply comment for '{suggestion.original}': {e}")
-
+        self._comments.write(self.package)
         return stats
 
+    @staticmethod
+    def _sweep_order(result: EngineResult) -> list[tuple[Suggestion, bool]]:
+        """Return (suggestion, as_track_change) pairs in application order.
+
+        Paragraphs go from last to first and, within a paragraph, suggestions
+        from the highest offset down (the longer one first at equal offsets).
+        A track change only changes the paragraph text from its own offset
+        on, so applying from the end keeps every earlier offset pointing at
+        the same characters.
+        """
+        pairs = [(s, True) for s in result.high_confidence] + [(s, False) for s in result.low_confidence]
+        return sorted(
+            pairs,
+            key=lambda pair: (
+                pair[0].paragraph_key,
+                -1 if pair[0].start is None else pair[0].start,
+                len(pair[0].original),
+                pair[1],
+            ),
+            reverse=True,
+        )
+
+    # ------------------------------------------------------------------
+    # Paragraph index
+    # ------------------------------------------------------------------
+
+    def _paragraphs(self, part: str = DOCUMENT_PART) -> list:
+        """Return all <w:p> elements of a part in document order.
+
+        Indices match RuleEngine's paragraph_index for that part (both come
+        from the package's PartIndex). Suggestions never add or remove
+        paragraphs, so the list stays valid for the whole session.
+        """
+        return self.package.part_index(part).paragraphs
+
+    def _paragraph_offset_map(self, part: str, p_idx: int):
+        """Return (concat_text, offset_map) for a paragraph, built lazily and cached."""
+        cached = self._offset_maps.get((part, p_idx))
+        if cached is None:
+            runs = self._get_text_runs(self._paragraphs(part)[p_idx], part)
+            cached = self._build_offset_map(runs)
+            self._offset_maps[(part, p_idx)] = cached
+            self.counters["offset_maps_built"] += 1
+        return cached
+
+    def _invalidate_paragraph(self, part: str, p_idx: int) -> None:
+        """Drop the cached offset map of a paragraph whose runs were rewritten."""
+        if self._offset_maps.pop((part, p_idx), None) is not None:
+            self.counters["offset_maps_invalidated"] += 1
+
+    @staticmethod
+    def _supports_comments(part: str) -> bool:
+        """Word only anchors comments in the body and in foot/endnotes."""
+        return not is_header_or_footer(part)
+
+    def _locate(
+        self,
+        original: str,
+        part: str,
+        paragraph_index: int,
+        start: Optional[int],
+        end: Optional[int],
+    ) -> tuple[int, int, list]:
+        """Return (start, end, affected_runs) for the span the engine matched.
+
+        No text search: the span is taken from the suggestion's offsets, and
+        rejected (ValueError) if the paragraph text there is not original or
+        if it touches text inside an existing tracked change.
+        """
+        if start is None or end is None:
+            raise ValueError("suggestion has no character offsets")
+        if not self.package.has_part(part):
+            raise ValueError(f"{part} not found")
+        if not 0 <= paragraph_index < len(self._paragraphs(part)):
+            raise ValueError(f"paragraph {paragraph_index} not found in {part}")
+
+        concat_text, offset_map = self._paragraph_offset_map(part, paragraph_index)
+        if concat_text[start:end] != original:
+            self.counters["offset_mismatches"] += 1
+            raise ValueError(
+                f"offsets {start}:{end} of paragraph {paragraph_index} no longer hold this text "
+                f"(found '{concat_text[start:end]}')"
+            )
+        affected = self._get_affected_runs(offset_map, start, end)
+        if any(a["tracked"] for a in affected):
+            raise ValueError("text is inside an existing tracked change")
+        return start, end, affected
+
     # ------------------------------------------------------------------
     # Unique w:id management
     # ------------------------------------------------------------------
 
     def _init_id_counter(self) -> None:
-        """Scan document.xml AND comments.xml for the highest existing w:id."""
+        """Scan every text part AND comments.xml for the highest existing w:id."""
         max_id = 0
 
-        # Scan document.xml
-        doc_xml = self.unpacked_dir / "word" / "document.xml"
-        tree = lxml.etree.parse(str(doc_xml))
-        for elem in tree.getroot().iter():
-            wid = elem.get(f"{W}id")
-            if wid is not None:
-                try:
-                    max_id = max(max_id, int(wid))
-                except ValueError:
-                    pass
+        # Scan document.xml, notes, headers and footers
+        for part in self.package.text_parts():
+            tree = self.package.xml(part)
+            for elem in tree.getroot().iter():
+                wid = elem.get(f"{W}id")
+                if wid is not None:
+                    try:
+                        max_id = max(max_id, int(wid))
+                    except ValueError:
+                        pass
 
         # Scan comments.xml if it exists (existing human comments)
-        comments_xml = self.unpacked_dir / "word" / "comments.xml"
-        if comments_xml.exists():
-            ctree = lxml.etree.parse(str(comments_xml))
+        if self.package.has_part(COMMENTS_PART):
+            ctree = self.package.xml(COMMENTS_PART)
             for elem in ctree.getroot().iter():
                 wid = elem.get(f"{W}id")
                 if wid is not None:
@@ -124,154 +361,128 @@ class DocxWriter:
     # ------------------------------------------------------------------
 
     def _apply_track_change(self, suggestion: Suggestion) -> None:
-        """Replace occurrence of original text with tracked ins/del pair.
+        """Replace the suggestion's span with a tracked ins/del pair.
 
         Handles text that spans multiple <w:r> elements (run fragmentation)
-        by concatenating run texts per paragraph, finding the match, and
+        by mapping the span's offsets onto the paragraph's runs and
         splitting/replacing the affected runs.
         """
-        doc_xml = self.unpacked_dir / "word" / "document.xml"
-        tree = lxml.etree.parse(str(doc_xml))
-        root = tree.getroot()
-
         original = unicodedata.normalize("NFC", suggestion.original)
         replacement = unicodedata.normalize("NFC", suggestion.replacement)
 
-        # Search all paragraphs for the match
-        for para in root.iter(f"{W}p"):
-            runs = self._get_text_runs(para)
-            if not runs:
-                continue
-
-            # Build concatenated text with offset map
-            concat_text, offset_map = self._build_offset_map(runs)
-
-            # Find the match in concatenated text
-            idx = concat_text.find(original)
-            if idx == -1:
-                continue
-
-            # Found match — identify affected runs
-            match_start = idx
-            match_end = idx + len(original)
-
-            affected = self._get_affected_runs(offset_map, match_start, match_end)
-            if not affected:
-                continue
-
-            # Extract rPr from the first affected run
-            rpr_xml = self._extract_rpr_lxml(affected[0]["run"])
-
-            # Build the replacement nodes
-            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-            del_id = self._next_id()
-            ins_id = self._next_id()
-
-            # Calculate prefix (text before match in first run) and
-            # suffix (text after match in last run)
-            first = affected[0]
-            last = affected[-1]
-            prefix_text = first["text"][:match_start - first["offset"]]
-            suffix_text = last["text"][match_end - last["offset"]:]
-
-            # Build new XML elements to insert
-            new_elements = []
-
-            # Prefix run (text before the match in the first affected run)
-            if prefix_text:
-                new_elements.append(self._make_run_elem(prefix_text, rpr_xml))
-
-            # <w:del> with the original text
-            new_elements.append(self._make_del_elem(original, rpr_xml, del_id, timestamp))
-
-            # <w:ins> with the replacement text (skip for pure deletions)
-            if replacement:
-                new_elements.append(self._make_ins_elem(replacement, rpr_xml, ins_id, timestamp))
-
-            # Suffix run (text after the match in the last affected run)
-            if suffix_text:
-                new_elements.append(self._make_run_elem(suffix_text, rpr_xml))
-
-            # Replace the affected runs in the paragraph.
-            # Runs may have different parents (e.g., one inside <w:hyperlink>,
-            # another directly in <w:p>). Insert new elements at the position
-            # of the first run's parent container within the paragraph.
-            first_run = affected[0]["run"]
-            first_parent = first_run.getparent()
-
-            # If first run's parent is the paragraph itself, insert directly.
-            # Otherwise, insert at the parent container's position in the paragraph.
-            if first_parent.tag == f"{W}p":
-                insert_parent = first_parent
-                insert_pos = list(insert_parent).index(first_run)
-            else:
-                # Run is inside a wrapper (hyperlink, smartTag, etc.)
-                # Insert new elements at the wrapper's position in the paragraph
-                insert_parent = para
-                insert_pos = list(para).index(first_parent)
-
-            # Remove all affected runs from their respective parents
-            for a in affected:
-                run_parent = a["run"].getparent()
-                run_parent.remove(a["run"])
-                # Clean up empty wrapper elements
-                if run_parent.tag != f"{W}p" and len(run_parent) == 0:
-                    wrapper_parent = run_parent.getparent()
-                    if wrapper_parent is not None:
-                        wrapper_parent.remove(run_parent)
-
-            # Insert new elements at the resolved position
-            for i, elem in enumerate(new_elements):
-                insert_parent.insert(insert_pos + i, elem)
-
-            # Write back
-            tree.write(str(doc_xml), xml_declaration=True, encoding="UTF-8", standalone=True)
-            return
+        part, p_idx = suggestion.paragraph_key
+        match_start, match_end, affected = self._locate(
+            original, part, p_idx, suggestion.start, suggestion.end
+        )
+        para = self._paragraphs(part)[p_idx]
 
-        raise ValueError(f"Text not found in any paragraph: '{original}'")
+        # Extract rPr from the first affected run
+        rpr_xml = self._extract_rpr_lxml(affected[0]["run"])
 
-    def _get_text_runs(self, para):
+        # Build the replacement nodes
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        del_id = self._next_id()
+        ins_id = self._next_id()
+
+        # Calculate prefix (text before match in first run) and
+        # suffix (text after match in last run)
+        first = affected[0]
+        last = affected[-1]
+        prefix_text = first["text"][:match_start - first["offset"]]
+        suffix_text = last["text"][match_end - last["offset"]:]
+
+        # Build new XML elements to insert
+        new_elements = []
+
+        # Prefix run (text before the match in the first affected run)
+        if prefix_text:
+            new_elements.append(self._make_run_elem(prefix_text, rpr_xml))
+
+        # <w:del> with the original text
+        new_elements.append(self._make_del_elem(original, rpr_xml, del_id, timestamp))
+
+        # <w:ins> with the replacement text (skip for pure deletions)
+        if replacement:
+            ins_elem = self._make_ins_elem(replacement, rpr_xml, ins_id, timestamp)
+            self.package.part_index(part).mark_tracked(ins_elem)
+            new_elements.append(ins_elem)
+
+        # Suffix run (text after the match in the last affected run)
+        if suffix_text:
+            new_elements.append(self._make_run_elem(suffix_text, rpr_xml))
+
+        # Replace the affected runs in the paragraph.
+        # Runs may have different parents (e.g., one inside <w:hyperlink>,
+        # another directly in <w:p>). Insert new elements at the position
+        # of the first run's parent container within the paragraph.
+        first_run = affected[0]["run"]
+        first_parent = first_run.getparent()
+
+        # If first run's parent is the paragraph itself, insert directly.
+        # Otherwise, insert at the parent container's position in the paragraph.
+        if first_parent.tag == f"{W}p":
+            insert_parent = first_parent
+            insert_pos = list(insert_parent).index(first_run)
+        else:
+            # Run is inside a wrapper (hyperlink, smartTag, etc.)
+            # Insert new elements at the wrapper's position in the paragraph
+            insert_parent = para
+            insert_pos = list(para).index(first_parent)
+
+        # Remove all affected runs from their respective parents
+        for a in affected:
+            run_parent = a["run"].getparent()
+            run_parent.remove(a["run"])
+            # Clean up empty wrapper elements
+            if run_parent.tag != f"{W}p" and len(run_parent) == 0:
+                wrapper_parent = run_parent.getparent()
+                if wrapper_parent is not None:
+                    wrapper_parent.remove(run_parent)
+
+        # Insert new elements at the resolved position
+        for i, elem in enumerate(new_elements):
+            insert_parent.insert(insert_pos + i, elem)
+
+        self._invalidate_paragraph(part, p_idx)
+        self.package.mark_modified(part)
+
+    def _get_text_runs(self, para, part: str = DOCUMENT_PART):
         """Get all <w:r> elements in a paragraph that contain <w:t> text.
 
         Finds runs that are direct children of the paragraph AND runs
-        nested inside non-tracked-change wrappers (e.g., <w:hyperlink>,
-        <w:smartTag>). Skips runs inside <w:del> or <w:ins> elements
-        to avoid re-processing already-tracked changes.
-
-        Returns list of {"run": element, "text": str} dicts.
+        nested inside wrappers (e.g., <w:hyperlink>, <w:smartTag>). Runs
+        inside tracked changes (<w:ins>, <w:moveTo>, ...) are included so
+        that the concatenated text, and so every offset, is the text the
+        engine matched (every <w:t>), but are marked tracked so they are
+        never edited again. Deleted text is <w:delText> and is not included.
+        Tracked status comes from the part's PartIndex.
+
+        Returns list of {"run": element, "text": str, "tracked": bool} dicts.
         """
+        index = self.package.part_index(part)
+        normalize = unicodedata.normalize
+        t_tag = f"{W}t"
         results = []
-        # Use findall to get ALL <w:r> descendants, then filter
-        for run in para.findall(f".//{W}r"):
-            # Skip runs inside tracked changes (w:del or w:ins)
-            ancestor = run.getparent()
-            inside_tracked = False
-            while ancestor is not None and ancestor is not para:
-                if ancestor.tag in (f"{W}del", f"{W}ins"):
-                    inside_tracked = True
-                    break
-                ancestor = ancestor.getparent()
-            if inside_tracked:
-                continue
-
-            text_parts = []
-            for t_elem in run.findall(f"{W}t"):
-                if t_elem.text:
-                    text_parts.append(unicodedata.normalize("NFC", t_elem.text))
-            if text_parts:
-                results.append({"run": run, "text": "".join(text_parts)})
+        for run in para.iter(f"{W}r"):
+            # ASCII text is already NFC
+            text = "".join([
+                t.text if t.text.isascii() else normalize("NFC", t.text)
+                for t in run.iterchildren(t_tag) if t.text
+            ])
+            if text:
+                results.append({"run": run, "text": text, "tracked": index.is_tracked(run)})
         return results
 
     def _build_offset_map(self, runs):
         """Build concatenated text and offset map from runs.
 
-        Returns (full_text, list of {run, text, offset}).
+        Returns (full_text, list of {run, text, tracked, offset}).
         """
         offset = 0
         mapped = []
         parts = []
         for r in runs:
-            mapped.append({"run": r["run"], "text": r["text"], "offset": offset})
+            mapped.append({**r, "offset": offset})
             parts.append(r["text"])
             offset += len(r["text"])
         return "".join(parts), mapped
@@ -345,183 +556,87 @@ class DocxWriter:
 
     def _apply_comment(self, suggestion: Suggestion) -> None:
         """Add a Word comment using pure lxml — no minidom/Document mixing."""
+        if not self._supports_comments(suggestion.part):
+            raise ValueError(f"Word does not support comments in {suggestion.part}")
+
         comment_id = self._next_comment_id
         self._next_comment_id += 1
 
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        comment_text = (
-            f"{suggestion.rationale}\n"
-            f"Suggested: {suggestion.replacement!r}\n"
-            f"Confidence: {suggestion.confidence:.0%}"
-        )
+        paragraphs = suggestion.rationale.splitlines() + [
+            f"Suggested: {suggestion.replacement!r}",
+            f"Confidence: {suggestion.confidence:.0%}",
+        ]
 
-        # 1. Inject comment range markers into document.xml
+        # 1. Inject comment range markers into the suggestion's part
         self._inject_comment_anchors(
-            suggestion.original, comment_id, timestamp, suggestion.paragraph_index
+            suggestion.original, comment_id, timestamp, suggestion.paragraph_index,
+            suggestion.start, suggestion.end, suggestion.part,
         )
 
-        # 2. Append comment entry to comments.xml
-        self._append_to_comments_xml(comment_id, comment_text, timestamp)
+        # 2. Queue the comment body; apply() writes all of them to comments.xml at the end
+        self._comments.add(comment_id, timestamp, paragraphs)
 
     def _inject_comment_anchors(
-        self, original: str, comment_id: int, timestamp: str, paragraph_index: int = -1
+        self,
+        original: str,
+        comment_id: int,
+        timestamp: str,
+        paragraph_index: int,
+        start: Optional[int],
+        end: Optional[int],
+        part: str = DOCUMENT_PART,
     ) -> None:
         """Insert commentRangeStart/End and commentReference around the target text.
 
-        Uses paragraph_index to anchor the comment in the correct paragraph,
-        avoiding false matches when the same text appears in multiple places.
+        The anchor wraps the runs holding the engine's match (paragraph_index,
+        start, end), the same span the track change will replace.
         """
-        doc_xml = self.unpacked_dir / "word" / "document.xml"
-        tree = lxml.etree.parse(str(doc_xml))
-        root = tree.getroot()
-
         original = unicodedata.normalize("NFC", original)
 
-        # Collect all paragraphs, then search only the target paragraph first
-        all_paras = list(root.iter(f"{W}p"))
-
-        # Build search order: target paragraph first, then neighbors, then all
-        if 0 <= paragraph_index < len(all_paras):
-            search_order = [all_paras[paragraph_index]]
-            # Add nearby paragraphs as fallback (±3)
-            for offset in range(1, 4):
-                if paragraph_index - offset >= 0:
-                    search_order.append(all_paras[paragraph_index - offset])
-                if paragraph_index + offset < len(all_paras):
-                    search_order.append(all_paras[paragraph_index + offset])
-        else:
-            search_order = all_paras
-
-        for para in search_order:
-            runs = self._get_text_runs(para)
-            if not runs:
-                continue
-            concat_text, offset_map = self._build_offset_map(runs)
-            idx = concat_text.find(original)
-            if idx == -1:
-                continue
-
-            # Use the first affected run as the anchor
-            affected = self._get_affected_runs(offset_map, idx, idx + len(original))
-            if not affected:
-                continue
-
-            # Place commentRangeStart before first affected run
-            first_run = affected[0]["run"]
-            last_run = affected[-1]["run"]
-            first_parent = first_run.getparent()
-            last_parent = last_run.getparent()
-
-            # commentRangeStart — before first affected run
-            pos = list(first_parent).index(first_run)
-            cs = lxml.etree.Element(f"{W}commentRangeStart")
-            cs.set(f"{W}id", str(comment_id))
-            first_parent.insert(pos, cs)
-
-            # commentRangeEnd — after last affected run
-            end_pos = list(last_parent).index(last_run) + 1
-            ce = lxml.etree.Element(f"{W}commentRangeEnd")
-            ce.set(f"{W}id", str(comment_id))
-            last_parent.insert(end_pos, ce)
-
-            # commentReference run — after commentRangeEnd
-            ref_run = lxml.etree.Element(f"{W}r")
-            rpr = lxml.etree.SubElement(ref_run, f"{W}rPr")
-            rs = lxml.etree.SubElement(rpr, f"{W}rStyle")
-            rs.set(f"{W}val", "CommentReference")
-            cref = lxml.etree.SubElement(ref_run, f"{W}commentReference")
-            cref.set(f"{W}id", str(comment_id))
-            ref_pos = list(last_parent).index(ce) + 1
-            last_parent.insert(ref_pos, ref_run)
-
-            tree.write(str(doc_xml), xml_declaration=True, encoding="UTF-8", standalone=True)
-            return
-
-        raise ValueError(f"Text not found for comment anchor: '{original}'")
-
-    def _append_to_comments_xml(self, comment_id: int, text: str, timestamp: str) -> None:
-        """Append a <w:comment> entry to word/comments.xml (create if needed)."""
-        import xml.sax.saxutils as saxutils
-        comments_xml = self.unpacked_dir / "word" / "comments.xml"
-
-        # Ensure comments.xml exists with proper namespaces
-        if not comments_xml.exists():
-            comments_xml.write_text(
-                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
-                '<w:comments'
-                ' xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
-                ' xmlns:w14="http://schemas.microsoft.com/office/word/2010/wordml"'
-                '></w:comments>',
-                encoding="utf-8",
-            )
-            self._ensure_comments_relationship()
-            self._ensure_comments_content_type()
-
-        tree = lxml.etree.parse(str(comments_xml))
-        root = tree.getroot()
-
-        # Build <w:comment> element
-        comment_elem = lxml.etree.SubElement(root, f"{W}comment")
-        comment_elem.set(f"{W}id", str(comment_id))
-        comment_elem.set(f"{W}author", self.author)
-        comment_elem.set(f"{W}date", timestamp)
-        comment_elem.set(f"{W}initials", self.initials)
-
-        p = lxml.etree.SubElement(comment_elem, f"{W}p")
-        r = lxml.etree.SubElement(p, f"{W}r")
-        t = lxml.etree.SubElement(r, f"{W}t")
-        t.text = text
-        t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
-
-        tree.write(str(comments_xml), xml_declaration=True, encoding="UTF-8", standalone=True)
-
-    def _ensure_comments_relationship(self) -> None:
-        """Add comments.xml relationship to word/_rels/document.xml.rels if missing."""
-        rels_path = self.unpacked_dir / "word" / "_rels" / "document.xml.rels"
-        if not rels_path.exists():
-            return
-        content = rels_path.read_text(encoding="utf-8")
-        if "comments" in content.lower():
-            return
-        # Insert before closing tag
-        rel = (
-            '<Relationship Id="rIdComments"'
-            ' Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"'
-            ' Target="comments.xml"/>'
-        )
-        content = content.replace("</Relationships>", f"  {rel}\n</Relationships>")
-        rels_path.write_text(content, encoding="utf-8")
-
-    def _ensure_comments_content_type(self) -> None:
-        """Add comments content type to [Content_Types].xml if missing."""
-        ct_path = self.unpacked_dir / "[Content_Types].xml"
-        if not ct_path.exists():
-            return
-        content = ct_path.read_text(encoding="utf-8")
-        if "comments" in content.lower():
-            return
-        override = (
-            '<Override PartName="/word/comments.xml"'
-            ' ContentType="application/vnd.openxmlformats-officedocument'
-            '.wordprocessingml.comments+xml"/>'
-        )
-        content = content.replace("</Types>", f"  {override}\n</Types>")
-        ct_path.write_text(content, encoding="utf-8")
+        _, _, affected = self._locate(original, part, paragraph_index, start, end)
+
+        # Anchors are siblings of the affected runs; the runs themselves and
+        # their text are untouched, so the paragraph's offset map stays valid.
+        # Place commentRangeStart before first affected run
+        first_run = affected[0]["run"]
+        last_run = affected[-1]["run"]
+        first_parent = first_run.getparent()
+        last_parent = last_run.getparent()
+
+        # commentRangeStart — before first affected run
+        pos = list(first_parent).index(first_run)
+        cs = lxml.etree.Element(f"{W}commentRangeStart")
+        cs.set(f"{W}id", str(comment_id))
+        first_parent.insert(pos, cs)
+
+        # commentRangeEnd — after last affected run
+        end_pos = list(last_parent).index(last_run) + 1
+        ce = lxml.etree.Element(f"{W}commentRangeEnd")
+        ce.set(f"{W}id", str(comment_id))
+        last_parent.insert(end_pos, ce)
+
+        # commentReference run — after commentRangeEnd
+        ref_run = lxml.etree.Element(f"{W}r")
+        rpr = lxml.etree.SubElement(ref_run, f"{W}rPr")
+        rs = lxml.etree.SubElement(rpr, f"{W}rStyle")
+        rs.set(f"{W}val", "CommentReference")
+        cref = lxml.etree.SubElement(ref_run, f"{W}commentReference")
+        cref.set(f"{W}id", str(comment_id))
+        ref_pos = list(last_parent).index(ce) + 1
+        last_parent.insert(ref_pos, ref_run)
+
+        self.package.mark_modified(part)
 
     # ------------------------------------------------------------------
     # Save
     # ------------------------------------------------------------------
 
     def save(self, destination: Optional[Path] = None, validate: bool = True) -> None:
-        """Pack the unpacked directory into a DOCX zip."""
-        import subprocess, sys
+        """Write the package to a DOCX zip, re-serializing only modified parts."""
         if destination:
             target = Path(destination)
         else:
             from datetime import date
             target = self.original_docx.parent / f"{self.original_docx.stem}_FPRStyleAI_{date.today().isoformat()}.docx"
-        pack_script = Path(__file__).parent.parent / "scripts" / "office" / "pack.py"
-        cmd = [sys.executable, str(pack_script), str(self.unpacked_dir), str(target), "--force"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"pack.py failed: {result.stderr.strip()}")
+        self.package.save(target)
@@ -0,0 +1,430 @@
+"""
+Concurrent heuristic evaluation for the FPR Editorial Agent (--evaluate).
+
+Instead of exporting heuristic tasks and waiting for them to be
+evaluated by hand, the driver sends each task's prompt to an evaluator
+backend and merges every response as soon as it arrives. Backends:
+
+- "stub": built in and deterministic, for tests; flags a word repeated
+  twice in a row ("de de")
+- "http://..." / "https://...": POSTs {"prompt", "paragraph_indices",
+  "languages", "hashes"} as JSON; FPR_EVALUATOR_TOKEN, if set, is sent as
+  a bearer token
+- "cmd:<command line>": runs the command once per request with the
+  prompt on stdin
+
+With a batch budget (batch_chars), consecutive paragraphs are packed
+into one request up to that many characters of paragraph text. The
+rules context is then sent once per batch instead of once per
+paragraph, and each paragraph is tagged [P<index>] in the prompt. A
+single-paragraph request uses the per-paragraph prompt.
+
+A response is the JSON the prompt asks for: {"suggestions": [...]} for
+one paragraph, or {"paragraphs": [{"paragraph_index", "suggestions"}]}
+for a batch, which is split back into per-paragraph results. Text around
+the JSON (prose, code fences) is ignored. The driver keeps at most
+`concurrency` requests in flight, starts at most `rate` per second, and
+retries timeouts, connection errors, HTTP 408/429/5xx, failed commands
+and unparseable or invalid responses (a suggestion field of the wrong
+type, a body that is not UTF-8) with exponential backoff. A batch whose
+response is still unusable is sent again one paragraph per request, so
+only the paragraphs with bad answers fail. Failed paragraphs stay
+pending in the run state and can be evaluated later.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import random
+import re
+import shlex
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from string import Template
+from typing import Callable, Optional
+
+from src.heuristic_io import check_suggestion, render_prompt
+from src.rule_engine import HEURISTIC_BATCH_PROMPT_TEMPLATE
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+class EvaluationError(Exception):
+    """A task could not be evaluated; retryable errors are tried again."""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ResponseError(EvaluationError):
+    """The evaluator answered, but not with usable suggestions."""
+
+
+def _load_json(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Model output: take the outermost JSON object in the text
+        first, last = text.find("{"), text.rfind("}")
+        if first == -1 or last < first:
+            raise ResponseError("response contains no JSON object")
+        try:
+            return json.loads(text[first:last + 1])
+        except ValueError as e:
+            raise ResponseError(f"response is not valid JSON: {e}")
+
+
+def _check_suggestion(s) -> dict:
+    try:
+        return check_suggestion(s)
+    except ValueError as e:
+        raise ResponseError(f"response {e}")
+
+
+def parse_response(text: str) -> list[dict]:
+    """Return the suggestions in a single-paragraph evaluator response, with their fields validated."""
+    data = _load_json(text)
+    if isinstance(data, list):
+        suggestions = data
+    elif isinstance(data, dict) and isinstance(data.get("suggestions"), list):
+        suggestions = data["suggestions"]
+    else:
+        raise ResponseError('response has no "suggestions" list')
+    return [_check_suggestion(s) for s in suggestions]
+
+
+def split_batch_response(text: str, batch: list[dict]) -> dict[int, list[dict]]:
+    """Split a batch response into suggestions per paragraph of the batch.
+
+    Accepts {"paragraphs": [{"paragraph_index", "suggestions"}]} or a flat
+    {"suggestions": [...]} whose items carry paragraph_index. An index may
+    be written as its tag ("P12"). Suggestions whose index is missing or
+    not in the batch go to the first batch paragraph containing their
+    original, and are dropped if there is none. Every batch paragraph gets
+    an entry; one the response leaves out had no problems.
+    """
+    data = _load_json(text)
+    if isinstance(data, dict) and isinstance(data.get("paragraphs"), list):
+        items = []
+        for entry in data["paragraphs"]:
+            if not isinstance(entry, dict) or not isinstance(entry.get("suggestions", []), list):
+                raise ResponseError("batch response paragraphs must be objects with a suggestions list")
+            items += [(entry.get("paragraph_index"), s) for s in entry.get("suggestions", [])]
+    else:
+        items = [(s.get("paragraph_index") if isinstance(s, dict) else None, s) for s in parse_response(text)]
+
+    split: dict[int, list[dict]] = {task["paragraph_index"]: [] for task in batch}
+    for p_idx, s in items:
+        s = _check_suggestion(s)
+        p_idx = _tag_index(p_idx)
+        if p_idx not in split:
+            original = s["original"].strip()
+            p_idx = next((t["paragraph_index"] for t in batch if original and original in t["text"]), None)
+            if p_idx is None:
+                continue
+        split[p_idx].append(s)
+    return split
+
+
+def _tag_index(value) -> Optional[int]:
+    """Paragraph index from 12, "12" or "P12"."""
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r"\[?P?(\d+)\]?", str(value or "").strip(), re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def pack_tasks(tasks: list[dict], batch_chars: int) -> list[list[dict]]:
+    """Group consecutive tasks into batches of at most batch_chars of text.
+
+    A paragraph longer than the budget gets a batch of its own; with
+    batch_chars <= 0 every task is its own batch.
+    """
+    batches: list[list[dict]] = []
+    size = 0
+    for task in tasks:
+        current = batches[-1] if batches else None
+        if (
+            current is None
+            or batch_chars <= 0
+            or size + len(task["text"]) > batch_chars
+        ):
+            batches.append([task])
+            size = len(task["text"])
+        else:
+            current.append(task)
+            size += len(task["text"])
+    return batches
+
+
+def render_batch_prompt(header: dict, batch: list[dict]) -> str:
+    """Build one prompt for a batch of tasks (see pack_tasks).
+
+    A batch mixing languages gets the instruction of each of them.
+    """
+    if len(batch) == 1:
+        return batch[0].get("prompt") or render_prompt(header, batch[0])
+    paragraphs = "\n\n".join(f"[P{task['paragraph_index']}] {task['text']}" for task in batch)
+    return Template(HEURISTIC_BATCH_PROMPT_TEMPLATE).substitute(
+        lang_instruction="\n".join(header["lang_instructions"][lang] for lang in _languages(batch)),
+        context=header["context"],
+        paragraphs=paragraphs,
+    )
+
+
+def _languages(batch: list[dict]) -> list[str]:
+    return list(dict.fromkeys(task["language"] for task in batch))
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+class StubBackend:
+    """Deterministic stand-in evaluator: suggests dropping a repeated word."""
+
+    name = "stub"
+    _REPEAT = re.compile(r"\b(\w+)\s+(\1)\b", re.IGNORECASE)
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def evaluate(self, prompt: str, batch: list[dict], timeout: float) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if len(batch) == 1:
+            return json.dumps({"suggestions": self.suggest(batch[0]["text"])}, ensure_ascii=False)
+        paragraphs = [
+            {"paragraph_index": task["paragraph_index"], "suggestions": self.suggest(task["text"])}
+            for task in batch
+        ]
+        return json.dumps({"paragraphs": paragraphs}, ensure_ascii=False)
+
+    @classmethod
+    def suggest(cls, text: str) -> list[dict]:
+        return [
+            {
+                "original": m.group(0),
+                "replacement": m.group(1),
+                "rule_id": "STUB-REPEAT",
+                "confidence": 0.9,
+                "rationale": "Repeated word.",
+            }
+            for m in cls._REPEAT.finditer(text)
+        ]
+
+
+class HttpBackend:
+    """POST each task to an HTTP endpoint (run in a thread; urllib is blocking)."""
+
+    name = "http"
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    async def evaluate(self, prompt: str, batch: list[dict], timeout: float) -> str:
+        body = json.dumps({
+            "prompt": prompt,
+            "paragraph_indices": [task["paragraph_index"] for task in batch],
+            "languages": _languages(batch),
+            "hashes": [task.get("hash") for task in batch],
+        }, ensure_ascii=False).encode("utf-8")
+        return await asyncio.to_thread(self._post, body, timeout)
+
+    def _post(self, body: bytes, timeout: float) -> str:
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            raise EvaluationError(
+                f"HTTP {e.code} from {self.url}",
+                retryable=e.code in RETRYABLE_STATUS,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+            # Includes timeouts, dropped connections and truncated bodies (IncompleteRead)
+            raise EvaluationError(f"{self.url}: {getattr(e, 'reason', None) or e or type(e).__name__}")
+        return _decode(body, self.url)
+
+
+class CommandBackend:
+    """Run a local command per request: prompt on stdin, response on stdout."""
+
+    name = "command"
+
+    def __init__(self, argv: list[str]):
+        self.argv = argv
+
+    async def evaluate(self, prompt: str, batch: list[dict], timeout: float) -> str:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *self.argv,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            raise EvaluationError(f"cannot run {self.argv[0]}: {e}", retryable=False)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(prompt.encode("utf-8")), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise EvaluationError(f"{self.argv[0]} timed out after {timeout:.0f}s")
+        if proc.returncode != 0:
+            detail = stderr.decode("utf-8", "replace").strip().splitlines()
+            raise EvaluationError(
+                f"{self.argv[0]} exited with {proc.returncode}" + (f": {detail[-1]}" if detail else "")
+            )
+        return _decode(stdout, self.argv[0])
+
+
+def _decode(body: bytes, source: str) -> str:
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise ResponseError(f"{source}: response is not valid UTF-8 ({e.reason} at byte {e.start})")
+
+
+def make_backend(spec: str):
+    """Build the backend named by an --evaluate value."""
+    if spec == "stub":
+        return StubBackend()
+    if spec.startswith(("http://", "https://")):
+        return HttpBackend(spec, token=os.environ.get("FPR_EVALUATOR_TOKEN"))
+    if spec.startswith("cmd:"):
+        argv = shlex.split(spec[len("cmd:"):])
+        if not argv:
+            raise ValueError("--evaluate cmd: needs a command")
+        return CommandBackend(argv)
+    raise ValueError(f"Unknown evaluator {spec!r} (use stub, an http(s):// URL or cmd:<command>)")
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+class _RateLimiter:
+    """Space request starts at least 1/rate seconds apart (rate <= 0: no limit)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+@dataclass
+class EvaluationSettings:
+    """How hard the driver may push the backend."""
+
+    concurrency: int = DEFAULT_CONCURRENCY
+    rate: float = 0.0  # request starts per second; 0 = unlimited
+    retries: int = DEFAULT_RETRIES
+    timeout: float = DEFAULT_TIMEOUT
+    backoff: float = DEFAULT_BACKOFF  # first retry delay; doubles per attempt
+    batch_chars: int = 0  # paragraph text per request; 0 = one paragraph per request
+
+
+def evaluate_tasks(
+    backend,
+    header: dict,
+    tasks: list[dict],
+    on_result: Callable[[dict], None],
+    settings: Optional[EvaluationSettings] = None,
+    on_error: Optional[Callable[[dict, Exception], None]] = None,
+) -> dict:
+    """Evaluate every task and return counts (requests, evaluated, failed, retries, suggestions).
+
+    on_result receives a read_results()-style record ({paragraph_index,
+    hash, suggestions}) for each task as soon as its response is parsed;
+    on_error receives each task whose request failed after all retries.
+    """
+    return asyncio.run(_evaluate_all(backend, header, tasks, on_result, settings or EvaluationSettings(), on_error))
+
+
+async def _evaluate_all(backend, header, tasks, on_result, settings, on_error) -> dict:
+    stats = {"requests": 0, "evaluated": 0, "failed": 0, "retries": 0, "suggestions": 0}
+    # Blocking backends (HttpBackend) run in threads; one per request slot
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max(1, settings.concurrency))
+    )
+    semaphore = asyncio.Semaphore(max(1, settings.concurrency))
+    limiter = _RateLimiter(settings.rate)
+
+    async def run(batch: list[dict]):
+        prompt = render_batch_prompt(header, batch)
+        attempt = 0
+        while True:
+            async with semaphore:
+                await limiter.wait()
+                stats["requests"] += 1
+                try:
+                    response = await backend.evaluate(prompt, batch, settings.timeout)
+                    if len(batch) == 1:
+                        return batch, {batch[0]["paragraph_index"]: parse_response(response)}
+                    return batch, split_batch_response(response, batch)
+                except EvaluationError as e:
+                    error = e
+                except Exception as e:
+                    # A backend bug fails this batch only, not the whole evaluation
+                    error = EvaluationError(f"{type(e).__name__}: {e}", retryable=False)
+            if not error.retryable or attempt >= settings.retries:
+                return batch, error
+            attempt += 1
+            stats["retries"] += 1
+            delay = min(MAX_BACKOFF, settings.backoff * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+            await asyncio.sleep(max(delay, error.retry_after or 0.0))
+
+    async def run_batch(batch: list[dict]):
+        batch, outcome = await run(batch)
+        if len(batch) > 1 and isinstance(outcome, ResponseError):
+            # One bad answer spoils the whole batch response; ask per paragraph
+            return await asyncio.gather(*(run([task]) for task in batch))
+        return [(batch, outcome)]
+
+    # Merge each response as it arrives; a batch waiting on retries holds no slot
+    batches = pack_tasks(tasks, settings.batch_chars)
+    for done in asyncio.as_completed([run_batch(batch) for batch in batches]):
+        for batch, outcome in await done:
+            if isinstance(outcome, Exception):
+                stats["failed"] += len(batch)
+                if on_error is not None:
+                    for task in batch:
+                        on_error(task, outcome)
+                continue
+            for task in batch:
+                suggestions = outcome[task["paragraph_index"]]
+                for s in suggestions:
+                    s["paragraph_index"] = task["paragraph_index"]
+                stats["evaluated"] += 1
+                stats["suggestions"] += len(suggestions)
+                on_result({"paragraph_index": task["paragraph_index"], "hash": task.get("hash"),
+                           "suggestions": suggestions})
+    return stats
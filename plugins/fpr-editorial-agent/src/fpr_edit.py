@@ -4,21 +4,54 @@ FPR Editorial Agent — CLI entry point.
 
 Usage:
     python src/fpr_edit.py <documento.docx> --project ERSV [options]
+    python src/fpr_edit.py --batch <carpeta|glob> --project WCRP [--workers N]
     python src/fpr_edit.py --refresh-kb --project WCRP
+    python src/fpr_edit.py --serve --project ERSV [--port 8765 | --socket <path>]
+    python src/fpr_edit.py <documento.docx|carpeta> --project ERSV --watch
 """
 
+import os
+import shlex
 import sys
 import tempfile
+import time
 from datetime import date
 from pathlib import Path
+from typing import Optional
 
 import click
 
 # Add repo root to sys.path so imports work
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.docx_package import DocxPackage
 from src.knowledge_base import KnowledgeBase
+from src.matcher import InvalidRuleError
+from src.metrics import Metrics, stage
+from src.paragraph_cache import ParagraphCache
+from src.pipeline import (
+    create_state,
+    export_heuristic_tasks,
+    heuristic_header,
+    load_state,
+    merge_heuristic,
+    resume_state,
+    split_stale,
+)
+from src.reports import write_changelog, write_flags
 from src.rule_engine import RuleEngine
+from src.run_state import default_state_path
+
+# Evaluator failures reported one by one before the rest are only counted
+MAX_EVALUATOR_WARNINGS = 5
+
+# Options repeated in the suggested --apply-heuristic command when they were
+# given: the ones that decide which run state is resumed and how the run executes
+RESUME_OPTIONS = (
+    "audience", "lang", "author", "output", "no_changelog", "validate", "stream", "jobs",
+    "all_occurrences", "heuristic_format", "heuristic_budget", "heuristic_min_score",
+    "no_paragraph_cache", "run_state",
+)
 
 
 @click.command()
@@ -28,12 +61,37 @@ from src.rule_engine import RuleEngine
 @click.option("--audience", default=None, help="Audience profile ID")
 @click.option("--lang", default="auto", type=click.Choice(["es", "en", "auto"]), help="Language")
 @click.option("--author", default="FPR Editorial Agent", help="Author name for track changes")
-@click.option("--output", default=None, help="Output path for edited document")
+@click.option("--output", default=None, help="Output path for edited document (output folder with --batch)")
 @click.option("--no-changelog", is_flag=True, help="Skip generating changelog")
 @click.option("--refresh-kb", is_flag=True, help="Refresh knowledge base from sources (requires credentials)")
+@click.option("--rebuild-kb-cache", is_flag=True, help="Ignore the compiled knowledge base cache and rebuild it from the YAML files")
 @click.option("--validate/--no-validate", default=True, help="Run XML validation on output")
 @click.option("--export-heuristic", default=None, type=click.Path(), help="Export heuristic tasks to JSON file (for Claude Code evaluation)")
 @click.option("--apply-heuristic", default=None, type=click.Path(exists=True), help="Apply heuristic results from JSON file")
+@click.option("--evaluate", default=None, help="Evaluate heuristic tasks concurrently with an evaluator: stub, an http(s):// URL, or cmd:<command>")
+@click.option("--eval-concurrency", default=8, type=click.IntRange(min=1), help="Evaluator requests in flight at once (with --evaluate)")
+@click.option("--eval-rate", default=0.0, type=click.FloatRange(min=0), help="Maximum evaluator requests started per second (0: no limit)")
+@click.option("--eval-retries", default=3, type=click.IntRange(min=0), help="Retries per paragraph after a failed evaluator request")
+@click.option("--eval-timeout", default=120.0, type=click.FloatRange(min=1), help="Seconds to wait for one evaluator response")
+@click.option("--eval-batch-chars", default=0, type=click.IntRange(min=0), help="Pack consecutive paragraphs into one evaluator request up to this many characters of text (about 4 per token; 0: one paragraph per request)")
+@click.option("--heuristic-budget", default=None, type=click.IntRange(min=1), help="Export or evaluate at most this many heuristic paragraphs per round, the highest scoring first")
+@click.option("--heuristic-min-score", default=None, type=click.FloatRange(min=0), help="Skip heuristic paragraphs whose pre-filter score is below this (light mode default: 1)")
+@click.option("--batch", default=None, help="Process every .docx in a folder or matching a glob pattern")
+@click.option("--stream", is_flag=True, help="Stream document.xml with iterparse (bounded memory for very large documents)")
+@click.option("--workers", default=None, type=click.IntRange(min=1), help="Worker processes for --batch (default: CPU count), or worker threads for --serve")
+@click.option("--serve", is_flag=True, help="Run as a server keeping knowledge bases in memory (--project is loaded first and is the default)")
+@click.option("--port", default=8765, type=click.IntRange(min=0, max=65535), help="Local HTTP port for --serve (127.0.0.1 only)")
+@click.option("--socket", "socket_path", default=None, type=click.Path(), help="Serve on this Unix socket instead of HTTP (with --serve)")
+@click.option("--output-root", default=None, type=click.Path(file_okay=False), help="Folder where --serve requests may also write outputs and run states (default: only next to the document)")
+@click.option("--watch", is_flag=True, help="Watch the document (or a folder / --batch glob) and refresh flags and changelog on every save")
+@click.option("--interval", default=0.5, type=click.FloatRange(min=0.1), help="Seconds between checks for saved documents (with --watch)")
+@click.option("--jobs", default=1, type=click.IntRange(min=1), help="Processes for term bank matching within one document (default: 1, serial)")
+@click.option("--all-occurrences", is_flag=True, help="Suggest every match of a term bank entry in a paragraph, not only the first")
+@click.option("--heuristic-format", default="2", type=click.Choice(["2", "1"]), help="Heuristic task file format (2: shared header, .jsonl for JSON Lines; 1: legacy, full prompt per task)")
+@click.option("--no-paragraph-cache", is_flag=True, help="Do not reuse or store per-paragraph results from previous runs")
+@click.option("--run-state", default=None, type=click.Path(), help="Run state file for resumable heuristic rounds (default: one per document in the system temp folder)")
+@click.option("--metrics", "metrics_path", default=None, type=click.Path(), help="Write stage timings, counters, peak memory and per-rule regex counts to a JSON file")
+@click.option("--profile", default=None, type=click.Path(), help="Run under cProfile and dump the stats to this file (view with python -m pstats)")
 def main(
     document,
     project,
@@ -44,9 +102,34 @@ def main(
     output,
     no_changelog,
     refresh_kb,
+    rebuild_kb_cache,
     validate,
     export_heuristic,
     apply_heuristic,
+    evaluate,
+    eval_concurrency,
+    eval_rate,
+    eval_retries,
+    eval_timeout,
+    eval_batch_chars,
+    heuristic_budget,
+    heuristic_min_score,
+    batch,
+    stream,
+    workers,
+    serve,
+    port,
+    socket_path,
+    output_root,
+    watch,
+    interval,
+    jobs,
+    all_occurrences,
+    heuristic_format,
+    no_paragraph_cache,
+    run_state,
+    metrics_path,
+    profile,
 ):
     """FPR Editorial Agent — applies Foundation for Puerto Rico style guides as Word track changes."""
 
@@ -55,6 +138,73 @@ def main(
         click.echo("See CLAUDE.md Fase 1 for instructions to rebuild from SharePoint/RAG sources.")
         sys.exit(0)
 
+    if serve:
+        if document is not None or batch:
+            click.echo("ERROR: --serve cannot be combined with a document path or --batch.", err=True)
+            sys.exit(1)
+        _run_server(project, workers, port, Path(socket_path) if socket_path else None,
+                    Path(output_root) if output_root else None)
+        return
+
+    if watch:
+        target = batch or document
+        if target is None or (document is not None and batch):
+            click.echo("ERROR: --watch needs a document, a folder, or --batch <folder|glob>.", err=True)
+            sys.exit(1)
+        if apply_heuristic or export_heuristic or evaluate:
+            click.echo("ERROR: --watch refreshes deterministic flags and changelog; run heuristic rounds separately.", err=True)
+            sys.exit(1)
+        _run_watch(target, project, mode, audience, lang, all_occurrences, not no_paragraph_cache,
+                   Path(output) if output else None, no_changelog, interval)
+        return
+
+    # Metrics and the profile are written when the command exits, including on errors
+    ctx = click.get_current_context()
+    metrics = None
+    if metrics_path:
+        metrics = Metrics(
+            document=document, batch=batch, project=project, mode=mode,
+            stream=stream, jobs=jobs, all_occurrences=all_occurrences,
+            paragraph_cache=not no_paragraph_cache,
+        )
+        ctx.call_on_close(lambda: _write_metrics(metrics, Path(metrics_path)))
+    if profile:
+        _start_profile(ctx, Path(profile))
+
+    evaluator = eval_settings = None
+    if evaluate:
+        from src.evaluator import EvaluationSettings, make_backend
+        if batch or apply_heuristic:
+            click.echo("ERROR: --evaluate applies to a single document, without --apply-heuristic.", err=True)
+            sys.exit(1)
+        try:
+            evaluator = make_backend(evaluate)
+        except ValueError as e:
+            click.echo(f"ERROR: {e}", err=True)
+            sys.exit(1)
+        eval_settings = EvaluationSettings(
+            concurrency=eval_concurrency, rate=eval_rate, retries=eval_retries, timeout=eval_timeout,
+            batch_chars=eval_batch_chars,
+        )
+
+    # Light mode keeps only high-confidence heuristic results, so it skips
+    # paragraphs unlikely to hold any violation unless told otherwise
+    if mode == "light" and heuristic_min_score is None:
+        from src.scorer import LIGHT_MIN_SCORE
+        heuristic_min_score = LIGHT_MIN_SCORE
+
+    if batch:
+        if document is not None or apply_heuristic:
+            click.echo("ERROR: --batch cannot be combined with a document path or --apply-heuristic.", err=True)
+            sys.exit(1)
+        if jobs > 1:
+            click.echo("ERROR: --jobs applies to a single document; use --workers with --batch.", err=True)
+            sys.exit(1)
+        _run_batch(batch, project, mode, audience, lang, author, output, no_changelog, workers,
+                   rebuild_kb_cache, stream, not no_paragraph_cache, int(heuristic_format), metrics,
+                   all_occurrences, heuristic_budget, heuristic_min_score)
+        return
+
     if document is None:
         click.echo("ERROR: A document path is required (unless using --refresh-kb).", err=True)
         sys.exit(1)
@@ -77,111 +227,452 @@ def main(
     temp_base.mkdir(parents=True, exist_ok=True)
     changelog_path = temp_base / "changelog.md"
     flags_path = temp_base / "flags.md"
+    state_path = Path(run_state) if run_state else default_state_path(doc_path)
 
     click.echo(f"\nFPR Editorial Agent")
     click.echo(f"  Document : {doc_path.name}")
     click.echo(f"  Project  : {project}")
     click.echo(f"  Mode     : {mode}")
     click.echo(f"  Author   : {author}")
+    if jobs > 1:
+        click.echo(f"  Jobs     : {jobs}")
+    if all_occurrences:
+        click.echo(f"  Matches  : all occurrences")
     click.echo()
 
     # Load knowledge base
     click.echo("Loading knowledge base...", nl=False)
     try:
-        kb = KnowledgeBase(project)
+        with stage(metrics, "load_kb"):
+            kb = KnowledgeBase(project, rebuild_cache=rebuild_kb_cache)
         entries_count = len(kb.get_term_bank_entries())
         click.echo(f" {entries_count} term bank entries loaded.")
-    except FileNotFoundError as e:
+    except (FileNotFoundError, InvalidRuleError) as e:
         click.echo(f"\nERROR: {e}", err=True)
         sys.exit(1)
 
+    cache = None if no_paragraph_cache else ParagraphCache.for_run(kb, mode, audience, lang)
     engine = RuleEngine(
         kb=kb,
         mode=mode,
         audience_id=audience,
         language=lang,
+        streaming=stream,
+        cache=cache,
+        jobs=jobs,
+        metrics=metrics,
+        all_occurrences=all_occurrences,
     )
 
-    # Unpack document
-    click.echo("Unpacking document...", nl=False)
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        unpacked_dir = Path(tmp_dir) / "unpacked"
-        unpacked_dir.mkdir()
+    # Open document package (parts are read straight from the zip)
+    click.echo("Opening document...", nl=False)
+    try:
+        with stage(metrics, "open"):
+            package = DocxPackage(doc_path)
+        click.echo(" done.")
+    except Exception as e:
+        click.echo(f"\nERROR: Failed to open document: {e}", err=True)
+        sys.exit(1)
 
+    with package:
         try:
-            _unpack(doc_path, unpacked_dir)
-            click.echo(" done.")
-        except Exception as e:
-            click.echo(f"\nERROR: Failed to unpack document: {e}", err=True)
-            sys.exit(1)
-
-        # --apply-heuristic: skip deterministic pass, load previous results + new heuristic
-        if apply_heuristic:
-            click.echo("Applying heuristic results from JSON...")
-            result = _load_and_apply_heuristic(
-                engine, unpacked_dir, Path(apply_heuristic)
+            _analyze_and_finish(
+                engine, package, doc_path, output_path, changelog_path, flags_path, temp_base,
+                project, mode, author, no_changelog, validate, export_heuristic, apply_heuristic,
+                stream, int(heuristic_format), metrics, state_path, evaluator, eval_settings,
+                heuristic_budget, heuristic_min_score,
             )
-            _finish(result, unpacked_dir, doc_path, output_path, changelog_path,
-                    flags_path, project, mode, author, no_changelog, validate)
-            return
+        finally:
+            if cache is not None:
+                cache.close()
+            if metrics is not None:
+                metrics.add_counters("package", package.counters)
+                if cache is not None:
+                    metrics.add_counters("paragraph_cache.hits", cache.hits)
+                    metrics.add_counters("paragraph_cache.misses", cache.misses)
+
+
+def _analyze_and_finish(engine, package, doc_path, output_path, changelog_path, flags_path,
+                        temp_base, project, mode, author, no_changelog, validate,
+                        export_heuristic, apply_heuristic, stream, heuristic_format=2,
+                        metrics=None, state_path=None, evaluator=None, eval_settings=None,
+                        heuristic_budget=None, heuristic_min_score=None):
+    """Run the engine on an open package and write the outputs."""
+    # --apply-heuristic: merge results into the run state; the deterministic
+    # pass only runs again if the document or configuration changed
+    if apply_heuristic:
+        click.echo("Applying heuristic results from JSON...")
+        with stage(metrics, "heuristic_apply"):
+            result, state = _load_and_apply_heuristic(
+                engine, package, doc_path, Path(apply_heuristic), state_path
+            )
+        _echo_cache_stats(engine)
+
+        remaining = state.open_tasks()
+        selected = []
+        if remaining:
+            selected = _select_heuristic(engine, remaining, heuristic_budget, heuristic_min_score, metrics, state)
+            if state_path is not None:
+                state.save(state_path)
+        if selected:
+            export_path = Path(export_heuristic) if export_heuristic else temp_base / "heuristic_tasks.json"
+            with stage(metrics, "heuristic_export"):
+                export_heuristic_tasks(selected, export_path,
+                                        heuristic_header(engine, doc_path), heuristic_format)
+            pending = state.counts()["pending"]
+            click.echo(f"  Heuristic: {pending} paragraphs still pending, {len(selected)} exported to: {export_path}")
+            click.echo(
+                f"\n  To continue the heuristic pass, evaluate them and run:\n"
+                f"    {_apply_heuristic_command()}"
+            )
+        _finish(result, package, doc_path, output_path, changelog_path,
+                flags_path, project, mode, author, no_changelog, validate, metrics)
+        return
 
+    # Deep/audit (or light mode asked to export or evaluate): an earlier round on
+    # the same document and configuration left its deterministic results and
+    # heuristic progress in the run state
+    wants_heuristic = mode in ("deep", "audit") or bool(export_heuristic or evaluator)
+    state = None
+    if wants_heuristic and state_path is not None:
+        state = resume_state(engine, doc_path, state_path)
+
+    heuristic_tasks = None
+    if state is not None:
+        click.echo("Resuming from run state (document unchanged, deterministic pass skipped)...")
+        result = engine.classify_all(state.deterministic_suggestions())
+        heuristic_tasks = state.open_tasks()
+        if metrics is not None:
+            metrics.count("run_state_resumed")
+    else:
         # Run deterministic pass
         click.echo("Running deterministic pass...")
         try:
-            result = engine.run(unpacked_dir)
+            with stage(metrics, "analyze"):
+                if stream:
+                    # One streaming scan covers both passes
+                    result, heuristic_tasks = engine.run_streaming(
+                        package, extract_heuristic=wants_heuristic
+                    )
+                else:
+                    result = engine.run(package)
         except Exception as e:
             click.echo(f"ERROR: Rule engine failed: {e}", err=True)
             sys.exit(1)
 
-        total = len(result.high_confidence) + len(result.low_confidence)
-        click.echo(f"  Found {total} deterministic suggestions:")
-        click.echo(f"    {len(result.high_confidence)} high-confidence (-> track changes)")
-        click.echo(f"    {len(result.low_confidence)} low-confidence (-> comments)")
-        click.echo(f"    {len(result.skipped)} below threshold (ignored)")
-
-        # For deep/audit modes, extract heuristic tasks
-        if mode in ("deep", "audit"):
-            heuristic_tasks = engine.extract_heuristic_tasks(unpacked_dir)
-            click.echo(f"\n  Heuristic: {len(heuristic_tasks)} paragraphs to evaluate")
-
-            if export_heuristic:
-                # Export heuristic tasks to JSON for Claude Code to evaluate
-                _export_heuristic_json(heuristic_tasks, Path(export_heuristic))
-                click.echo(f"  Exported heuristic tasks to: {export_heuristic}")
-                click.echo(
-                    f"\n  Next step: evaluate each paragraph, then run again with:\n"
-                    f"    python src/fpr_edit.py {doc_path} --project {project} "
-                    f"--mode {mode} --apply-heuristic <results.json>"
-                )
-                return
-            elif heuristic_tasks:
-                # Default for deep/audit without export: print tasks for interactive use
-                export_path = temp_base / "heuristic_tasks.json"
-                _export_heuristic_json(heuristic_tasks, export_path)
-                click.echo(f"  Exported heuristic tasks to: {export_path}")
+    total = len(result.high_confidence) + len(result.low_confidence)
+    click.echo(f"  Found {total} deterministic suggestions:")
+    click.echo(f"    {len(result.high_confidence)} high-confidence (-> track changes)")
+    click.echo(f"    {len(result.low_confidence)} low-confidence (-> comments)")
+    click.echo(f"    {len(result.skipped)} below threshold (ignored)")
+
+    # For deep/audit modes, extract heuristic tasks
+    if wants_heuristic:
+        if state is None:
+            if heuristic_tasks is None:
+                heuristic_tasks = engine.extract_heuristic_tasks(package)
+            state = create_state(engine, doc_path, result, heuristic_tasks)
+            reused_note = "cached suggestions reused"
+        else:
+            reused_note = f"suggestions reused from earlier rounds ({state.counts()['done']} paragraphs done)"
+        click.echo(f"\n  Heuristic: {len(heuristic_tasks)} paragraphs to evaluate")
+        if metrics is not None:
+            metrics.count("heuristic_tasks", len(heuristic_tasks))
+            metrics.count("heuristic_cached_suggestions", len(engine.cached_heuristic))
+        selected = _select_heuristic(engine, heuristic_tasks, heuristic_budget, heuristic_min_score, metrics, state)
+        reused = state.done_suggestions()
+        if reused:
+            # Paragraphs evaluated in an earlier round (or found in the paragraph cache)
+            engine.add_heuristic_suggestions(result, reused, package)
+            click.echo(f"  Heuristic: {len(reused)} {reused_note}")
+        _echo_cache_stats(engine)
+        if state_path is not None:
+            state.save(state_path)
+
+        if evaluator is not None and selected:
+            with stage(metrics, "heuristic_evaluate"):
+                _evaluate_heuristic(engine, package, result, state, selected, doc_path,
+                                    evaluator, eval_settings, state_path, metrics)
+            # Selected paragraphs the evaluator could not complete
+            pending = {t["paragraph_index"] for t in state.pending_tasks()}
+            heuristic_tasks = [t for t in selected if t["paragraph_index"] in pending]
+            if heuristic_tasks:
+                export_path = Path(export_heuristic) if export_heuristic else temp_base / "heuristic_tasks.json"
+                with stage(metrics, "heuristic_export"):
+                    export_heuristic_tasks(heuristic_tasks, export_path,
+                                            heuristic_header(engine, doc_path), heuristic_format)
+                click.echo(f"  Heuristic: {len(heuristic_tasks)} paragraphs not evaluated, exported to: {export_path}")
                 click.echo(
-                    f"\n  To complete the heuristic pass, evaluate the tasks and run:\n"
-                    f"    python src/fpr_edit.py {doc_path} --project {project} "
-                    f"--mode {mode} --apply-heuristic <results.json>"
+                    f"\n  Run again with --evaluate to retry them, or evaluate them and run:\n"
+                    f"    {_apply_heuristic_command()}"
                 )
+        elif export_heuristic:
+            # Export heuristic tasks to JSON for Claude Code to evaluate
+            with stage(metrics, "heuristic_export"):
+                export_heuristic_tasks(selected, Path(export_heuristic),
+                                        heuristic_header(engine, doc_path), heuristic_format)
+            click.echo(f"  Exported heuristic tasks to: {export_heuristic}")
+            click.echo(
+                f"\n  Next step: evaluate each paragraph, then run again with:\n"
+                f"    {_apply_heuristic_command()}"
+            )
+            return
+        elif selected:
+            # Default for deep/audit without export: print tasks for interactive use
+            export_path = temp_base / "heuristic_tasks.json"
+            with stage(metrics, "heuristic_export"):
+                export_heuristic_tasks(selected, export_path,
+                                        heuristic_header(engine, doc_path), heuristic_format)
+            click.echo(f"  Exported heuristic tasks to: {export_path}")
+            click.echo(
+                f"\n  To complete the heuristic pass, evaluate the tasks and run:\n"
+                f"    {_apply_heuristic_command()}"
+            )
+    else:
+        _echo_cache_stats(engine)
+
+    # Apply deterministic results
+    _finish(result, package, doc_path, output_path, changelog_path,
+            flags_path, project, mode, author, no_changelog, validate, metrics)
+
+
+def _apply_heuristic_command() -> str:
+    """The command that applies a results file to this run: the same document and RESUME_OPTIONS."""
+    ctx = click.get_current_context()
+    params = {param.name: param for param in ctx.command.params}
+    args = ["python", "src/fpr_edit.py", ctx.params["document"], "--project", ctx.params["project"],
+            "--mode", ctx.params["mode"]]
+    for name in RESUME_OPTIONS:
+        if ctx.get_parameter_source(name) in (None, click.core.ParameterSource.DEFAULT):
+            continue
+        param, value = params[name], ctx.params[name]
+        if param.is_flag:
+            args.append(param.opts[0] if value else param.secondary_opts[0])
+        else:
+            args += [param.opts[0], str(value)]
+    return " ".join(shlex.quote(arg) for arg in args) + " --apply-heuristic <results.json>"
+
+
+def _select_heuristic(engine, tasks: list[dict], budget, min_score, metrics=None, state=None) -> list[dict]:
+    """Apply the heuristic pre-filter.
+
+    Paragraphs below min_score are marked skipped in the run state; the
+    ones left out by the budget stay pending for a later round.
+    """
+    selected, below = engine.select_heuristic_tasks(tasks, budget, min_score)
+    if state is not None:
+        state.skip(below)
+    if len(selected) < len(tasks):
+        limits = [f"budget {budget}"] if budget is not None else []
+        if min_score is not None:
+            limits.append(f"min score {min_score:g}")
+        click.echo(f"  Heuristic: {len(selected)} of {len(tasks)} paragraphs selected by the pre-filter ({', '.join(limits)})")
+        if below:
+            click.echo(f"  Heuristic: {len(below)} paragraphs below the min score skipped")
+    if metrics is not None:
+        metrics.count("heuristic_prefiltered", len(tasks) - len(selected))
+        metrics.count("heuristic_skipped", len(below))
+    return selected
+
+
+def _write_metrics(metrics, path: Path) -> None:
+    metrics.write(path)
+    click.echo(f"  Metrics: {path}")
+
+
+def _start_profile(ctx, path: Path) -> None:
+    """Profile the rest of the command with cProfile; stats are dumped on exit."""
+    import cProfile
+
+    profiler = cProfile.Profile()
+
+    def stop():
+        profiler.disable()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        click.echo(f"  Profile: {path} (view with: python -m pstats {path})")
+
+    ctx.call_on_close(stop)
+    profiler.enable()
+
+
+def _echo_cache_stats(engine) -> None:
+    if engine.cache is not None and engine.cache.enabled:
+        click.echo(f"  Paragraph cache: {engine.cache.describe()}")
+
+
+def _run_server(project: str, workers, port: int, socket_path: Optional[Path], output_root: Optional[Path]) -> None:
+    """Serve editorial operations until interrupted (see src/server.py)."""
+    from src.server import EditorialServer, make_token, serve
+
+    def report(operation, request, status, response, seconds):
+        name = Path(str(request.get("document", "-"))).name
+        detail = f": {response['error']}" if status != 200 else ""
+        click.echo(f"  {status} {operation} {name} ({seconds * 1000:.0f} ms){detail}")
+
+    app = EditorialServer(project, workers=workers, on_request=report, output_root=output_root)
+    click.echo(f"\nFPR Editorial Agent — server")
+    click.echo("Loading knowledge base...", nl=False)
+    try:
+        kb = app.kbs.get(project)
+    except (FileNotFoundError, InvalidRuleError) as e:
+        click.echo(f"\nERROR: {e}", err=True)
+        sys.exit(1)
+    click.echo(f" {len(kb.get_term_bank_entries())} term bank entries loaded.")
+    token = make_token()
+    if os.environ.get("FPR_SERVER_TOKEN"):
+        click.echo("Token: FPR_SERVER_TOKEN")
+    else:
+        click.echo(f"Token: {token} (send as Authorization: Bearer <token>; set FPR_SERVER_TOKEN to choose one)")
+    if output_root is not None:
+        click.echo(f"Outputs next to each document or under {output_root.resolve()}")
+    try:
+        serve(app, token, port=port, socket_path=socket_path,
+              on_ready=lambda address: click.echo(f"Serving on {address} with {app.workers} workers (Ctrl+C to stop)"))
+    except OSError as e:
+        click.echo(f"ERROR: Cannot serve: {e}", err=True)
+        sys.exit(1)
+
 
-        # Apply deterministic results
-        _finish(result, unpacked_dir, doc_path, output_path, changelog_path,
-                flags_path, project, mode, author, no_changelog, validate)
+def _run_watch(target: str, project: str, mode: str, audience, lang: str, all_occurrences: bool,
+               paragraph_cache: bool, output_dir: Optional[Path], no_changelog: bool, interval: float) -> None:
+    """Refresh flags and changelog whenever a watched document is saved (see src/watch.py)."""
+    from src.watch import Watcher
 
+    if Path(target).is_file() and Path(target).suffix.lower() != ".docx":
+        click.echo("ERROR: Input file must be a .docx document.", err=True)
+        sys.exit(1)
 
-def _finish(result, unpacked_dir, doc_path, output_path, changelog_path,
-            flags_path, project, mode, author, no_changelog, validate):
+    def report(record):
+        now = time.strftime("%H:%M:%S")
+        name = Path(record["document"]).name
+        if record["status"] != "ok":
+            click.echo(f"  [{now}] FAILED {name}: {record['error']} (retried on the next save)")
+            return
+        if record["first"]:
+            changed = f"{record['paragraphs']} paragraphs analyzed"
+        else:
+            changed = f"{record['changed']} of {record['paragraphs']} paragraphs changed"
+            if record["removed"]:
+                changed += f", {record['removed']} removed"
+        click.echo(
+            f"  [{now}] {name}: {changed}; {record['high_confidence']} track changes, "
+            f"{record['low_confidence']} flags ({record['seconds']:.2f}s)"
+        )
+        if record["first"]:
+            for kind, path in record["outputs"].items():
+                click.echo(f"      {kind.capitalize()}: {path}")
+
+    click.echo(f"\nFPR Editorial Agent — watch")
+    click.echo(f"  Watching : {target}")
+    click.echo(f"  Project  : {project}")
+    click.echo(f"  Mode     : {mode}")
+    click.echo()
+    click.echo("Loading knowledge base...", nl=False)
+    try:
+        watcher = Watcher(target, project, mode, audience, lang, all_occurrences, paragraph_cache,
+                          output_dir, no_changelog, on_round=report)
+    except (FileNotFoundError, InvalidRuleError) as e:
+        click.echo(f"\nERROR: {e}", err=True)
+        sys.exit(1)
+    click.echo(f" {len(watcher.kb.get_term_bank_entries())} term bank entries loaded.")
+    click.echo(f"Checking for saved documents every {interval:g}s (Ctrl+C to stop)")
+    watcher.run(interval)
+
+
+def _run_batch(target, project, mode, audience, lang, author, output, no_changelog, workers,
+               rebuild_kb_cache=False, stream=False, paragraph_cache=True, heuristic_format=2,
+               metrics=None, all_occurrences=False, heuristic_budget=None, heuristic_min_score=None):
+    """Process a folder/glob of documents with one knowledge base load."""
+    from src.batch import collect_documents, run_batch, write_summary
+
+    documents = collect_documents(target)
+    if not documents:
+        click.echo(f"ERROR: No .docx documents found for --batch {target}", err=True)
+        sys.exit(1)
+
+    output_dir = Path(output) if output else None
+
+    click.echo(f"\nFPR Editorial Agent — batch")
+    click.echo(f"  Documents: {len(documents)}")
+    click.echo(f"  Project  : {project}")
+    click.echo(f"  Mode     : {mode}")
+    click.echo(f"  Workers  : {workers or 'auto'}")
+    click.echo()
+
+    click.echo("Loading knowledge base...", nl=False)
+    try:
+        with stage(metrics, "load_kb"):
+            kb = KnowledgeBase(project, rebuild_cache=rebuild_kb_cache)
+        click.echo(f" {len(kb.get_term_bank_entries())} term bank entries loaded.")
+    except (FileNotFoundError, InvalidRuleError) as e:
+        click.echo(f"\nERROR: {e}", err=True)
+        sys.exit(1)
+
+    def report(record):
+        name = Path(record["document"]).name
+        if record["status"] == "ok":
+            click.echo(
+                f"  OK     {name}: {record['high_confidence']} track changes, "
+                f"{record['low_confidence']} comments ({record['seconds']:.2f}s)"
+            )
+        else:
+            click.echo(f"  FAILED {name}: {record['error']}")
+
+    options = {
+        "project": project,
+        "mode": mode,
+        "audience": audience,
+        "lang": lang,
+        "author": author,
+        "no_changelog": no_changelog,
+        "output_dir": output_dir,
+        "stream": stream,
+        "all_occurrences": all_occurrences,
+        "paragraph_cache": paragraph_cache,
+        "heuristic_format": heuristic_format,
+        "heuristic_budget": heuristic_budget,
+        "heuristic_min_score": heuristic_min_score,
+    }
+    with stage(metrics, "batch"):
+        summary = run_batch(kb, documents, options, workers=workers, on_result=report)
+    if metrics is not None:
+        metrics.count("documents", summary["documents"])
+        metrics.count("documents_failed", summary["failed"])
+
+    summary_path = (output_dir or documents[0].parent) / f"batch_summary_{date.today().isoformat()}.json"
+    write_summary(summary, summary_path)
+
+    click.echo(
+        f"\nProcessed {summary['documents']} documents in {summary['wall_seconds']:.1f}s: "
+        f"{summary['succeeded']} succeeded, {summary['failed']} failed."
+    )
+    for rule_id, count in list(summary["suggestions_per_rule"].items())[:10]:
+        click.echo(f"  {rule_id:<14} {count}")
+    for kind, stats in summary["paragraph_cache"].items():
+        click.echo(f"  Paragraph cache ({kind}): {stats['hits']}/{stats['hits'] + stats['misses']} hits ({stats['hit_rate']:.0%})")
+    click.echo(f"  Summary: {summary_path}")
+    if summary["failed"]:
+        sys.exit(1)
+
+
+def _finish(result, package, doc_path, output_path, changelog_path,
+            flags_path, project, mode, author, no_changelog, validate, metrics=None):
     """Apply changes and write output files."""
     total = len(result.high_confidence) + len(result.low_confidence)
+    if metrics is not None:
+        metrics.count("suggestions_high_confidence", len(result.high_confidence))
+        metrics.count("suggestions_low_confidence", len(result.low_confidence))
+        metrics.count("suggestions_skipped", len(result.skipped))
 
     if mode == "audit":
         click.echo("\nAudit mode: generating flags file only (document not modified).")
-        _write_flags(flags_path, result)
-        click.echo(f"  Flags: {flags_path}")
-        if not no_changelog:
-            _write_changelog(changelog_path, result, doc_path.name, project, mode)
-            click.echo(f"  Changelog: {changelog_path}")
+        with stage(metrics, "reports"):
+            write_flags(flags_path, result)
+            click.echo(f"  Flags: {flags_path}")
+            if not no_changelog:
+                write_changelog(changelog_path, result, doc_path.name, project, mode)
+                click.echo(f"  Changelog: {changelog_path}")
         click.echo("\nDone.")
         return
 
@@ -194,164 +685,120 @@ def _finish(result, unpacked_dir, doc_path, output_path, changelog_path,
         try:
             from src.docx_writer import DocxWriter
             writer = DocxWriter(
-                unpacked_dir=unpacked_dir,
+                package=package,
                 original_docx=doc_path,
                 author=author,
             )
-            stats = writer.apply(result)
+            with stage(metrics, "apply"):
+                stats = writer.apply(result)
+            if metrics is not None:
+                metrics.add_counters("writer", {**writer.counters, **stats})
             click.echo(
                 f" {stats['track_changes_applied']} track changes, "
                 f"{stats['comments_applied']} comments applied."
             )
             if stats["failed"] > 0:
                 click.echo(f"  WARNING: {stats['failed']} suggestions failed to apply.")
+            if stats["overlapping"] > 0:
+                click.echo(f"  WARNING: {stats['overlapping']} suggestions skipped (overlap another change).")
 
             click.echo(f"Saving output to {output_path.name}...", nl=False)
-            writer.save(destination=output_path, validate=validate)
+            with stage(metrics, "save"):
+                writer.save(destination=output_path, validate=validate)
             click.echo(" done.")
 
         except Exception as e:
             click.echo(f"\nERROR: Failed to apply changes: {e}", err=True)
             sys.exit(1)
 
-    if not no_changelog:
-        _write_changelog(changelog_path, result, doc_path.name, project, mode)
-        click.echo(f"  Changelog: {changelog_path}")
+    with stage(metrics, "reports"):
+        if not no_changelog:
+            write_changelog(changelog_path, result, doc_path.name, project, mode)
+            click.echo(f"  Changelog: {changelog_path}")
 
-    if result.low_confidence:
-        _write_flags(flags_path, result)
-        click.echo(f"  Flags: {flags_path}")
+        if result.low_confidence:
+            write_flags(flags_path, result)
+            click.echo(f"  Flags: {flags_path}")
 
     click.echo(f"\nDone. Output: {output_path}")
 
 
-def _export_heuristic_json(tasks: list[dict], path: Path) -> None:
-    """Export heuristic tasks to a JSON file for external evaluation."""
-    import json
-    # Strip the full context from export to keep file manageable
-    export = []
-    for task in tasks:
-        export.append({
-            "paragraph_index": task["paragraph_index"],
-            "text": task["text"],
-            "language": task["language"],
-            "prompt": task["prompt"],
-        })
-    path.write_text(json.dumps(export, indent=2, ensure_ascii=False), encoding="utf-8")
-
-
-def _load_and_apply_heuristic(engine, unpacked_dir, heuristic_json: Path):
-    """Load heuristic results JSON and merge with a fresh deterministic pass."""
-    import json
-    from src.rule_engine import EngineResult
-
-    # Run deterministic pass first
-    result = engine.run(unpacked_dir)
-
-    # Load heuristic suggestions
-    data = json.loads(heuristic_json.read_text(encoding="utf-8"))
-
-    # The JSON can be either a flat list of suggestions or per-paragraph results
-    suggestions = []
-    if isinstance(data, list):
-        for item in data:
-            if "suggestions" in item:
-                # Per-paragraph format: {paragraph_index, suggestions: [...]}
-                p_idx = item.get("paragraph_index", 0)
-                for s in item["suggestions"]:
-                    s.setdefault("paragraph_index", p_idx)
-                    suggestions.append(s)
-            elif "original" in item:
-                # Flat format: direct suggestion objects
-                suggestions.append(item)
-
-    engine.add_heuristic_suggestions(result, suggestions)
+def _evaluate_heuristic(engine, package, result, state, tasks, doc_path, backend, settings,
+                        state_path, metrics=None):
+    """Evaluate heuristic tasks concurrently, merging each response into result and the run state."""
+    from src.evaluator import evaluate_tasks
 
-    heur_high = sum(1 for s in result.high_confidence if s.source == "heuristic")
-    heur_low = sum(1 for s in result.low_confidence if s.source == "heuristic")
-    click.echo(f"  Heuristic: {heur_high} track changes + {heur_low} comments added")
+    batching = f", batches of up to {settings.batch_chars} characters" if settings.batch_chars else ""
+    click.echo(
+        f"  Evaluating {len(tasks)} paragraphs with the {backend.name} evaluator "
+        f"(concurrency {settings.concurrency}{batching})..."
+    )
+    evaluated: dict[int, list[dict]] = {}
+    texts: dict = {}  # paragraph texts, read once for every response
+    progress_step = max(1, len(tasks) // 10)
+
+    def on_result(record: dict) -> None:
+        state.merge([record])
+        evaluated[record["paragraph_index"]] = record["suggestions"]
+        engine.add_heuristic_suggestions(result, record["suggestions"], package, texts)
+        if len(evaluated) % progress_step == 0:
+            click.echo(f"    {len(evaluated)}/{len(tasks)} evaluated")
 
-    return result
+    failures = []
 
+    def on_error(task: dict, error: Exception) -> None:
+        failures.append(task["paragraph_index"])
+        if len(failures) <= MAX_EVALUATOR_WARNINGS:
+            click.echo(f"  WARNING: paragraph {task['paragraph_index']} not evaluated: {error}")
 
-def _unpack(docx_path: Path, target_dir: Path) -> None:
-    """Unpack DOCX zip into target directory."""
-    import zipfile
-    import xml.dom.minidom
+    try:
+        stats = evaluate_tasks(backend, heuristic_header(engine, doc_path), tasks,
+                               on_result, settings, on_error)
+    finally:
+        # Keep what was evaluated, even if the run is interrupted
+        engine.remember_heuristic_results(package, evaluated)
+        if state_path is not None:
+            state.save(state_path)
+
+    if len(failures) > MAX_EVALUATOR_WARNINGS:
+        click.echo(f"  WARNING: {len(failures) - MAX_EVALUATOR_WARNINGS} more paragraphs not evaluated")
+    if metrics is not None:
+        metrics.add_counters("evaluator", stats)
+    click.echo(
+        f"  Heuristic: {stats['evaluated']} paragraphs evaluated in {stats['requests']} requests, "
+        f"{stats['suggestions']} suggestions, {stats['retries']} retries, {stats['failed']} failed"
+    )
 
-    with zipfile.ZipFile(docx_path, "r") as zf:
-        zf.extractall(target_dir)
 
-    # Pretty-print XML files for easier manipulation
-    for xml_file in target_dir.rglob("*.xml"):
-        try:
-            content = xml_file.read_bytes()
-            dom = xml.dom.minidom.parseString(content)
-            pretty = dom.toprettyxml(indent="  ", encoding="utf-8")
-            xml_file.write_bytes(pretty)
-        except Exception:
-            pass  # Leave file as-is if parsing fails
-
-
-def _write_changelog(
-    path: Path,
-    result,
-    doc_name: str,
-    project: str,
-    mode: str,
-) -> None:
-    """Write markdown changelog of applied changes."""
-    from datetime import datetime
-
-    lines = [
-        f"# FPR Editorial Agent — Changelog",
-        f"",
-        f"**Document:** {doc_name}",
-        f"**Project:** {project}",
-        f"**Mode:** {mode}",
-        f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-        f"",
-        f"## Track Changes Applied ({len(result.high_confidence)})",
-        f"",
-    ]
-
-    for s in sorted(result.high_confidence, key=lambda x: x.paragraph_index):
-        lines.append(f"- **[{s.rule_id}]** `{s.original}` → `{s.replacement}`")
-        lines.append(f"  _{s.rationale}_")
-        lines.append(f"")
-
-    if result.low_confidence:
-        lines += [
-            f"## Comments Added ({len(result.low_confidence)})",
-            f"",
-        ]
-        for s in sorted(result.low_confidence, key=lambda x: x.paragraph_index):
-            lines.append(f"- **[{s.rule_id}]** `{s.original}` → `{s.replacement}` (confidence: {s.confidence:.0%})")
-            lines.append(f"  _{s.rationale}_")
-            lines.append(f"")
-
-    path.write_text("\n".join(lines), encoding="utf-8")
-
-
-def _write_flags(path: Path, result) -> None:
-    """Write flags file for human review items."""
-    lines = [
-        "# FPR Editorial Agent — Flags for Human Review",
-        "",
-        "Items below require editorial judgment before accepting.",
-        "",
-    ]
-
-    for s in result.low_confidence:
-        lines.append(f"## [{s.rule_id}] Paragraph {s.paragraph_index}")
-        lines.append(f"")
-        lines.append(f"**Original:** `{s.original}`")
-        lines.append(f"**Suggested:** `{s.replacement}`")
-        lines.append(f"**Confidence:** {s.confidence:.0%}")
-        lines.append(f"**Rationale:** {s.rationale}")
-        lines.append(f"")
-
-    path.write_text("\n".join(lines), encoding="utf-8")
+def _load_and_apply_heuristic(engine, package, doc_path: Path, heuristic_json: Path, state_path: Path):
+    """Merge heuristic results (format v1 or v2) into the run state and return (result, state).
+
+    The deterministic results come from the run state when it matches the
+    document and configuration, and from a fresh pass otherwise. Every
+    paragraph evaluated so far contributes its suggestions, so results can
+    be applied in several partial rounds.
+    """
+    from src.heuristic_io import read_results
+
+    result, state, resumed = load_state(engine, package, doc_path, state_path)
+    if resumed:
+        click.echo("  Run state matches the document; deterministic pass skipped.")
+
+    # Load heuristic suggestions, one record per evaluated paragraph
+    records, stale = split_stale(engine, package, state, read_results(heuristic_json))
+    if stale:
+        click.echo(f"  WARNING: {len(stale)} heuristic results skipped (paragraph text changed since export)")
+
+    merge_heuristic(engine, package, result, state, records, state_path)
+
+    heur_high = sum(1 for s in result.high_confidence if s.source == "heuristic")
+    heur_low = sum(1 for s in result.low_confidence if s.source == "heuristic")
+    counts = state.counts()
+    click.echo(f"  Heuristic: {heur_high} track changes + {heur_low} comments added")
+    skipped = f", {counts['skipped']} skipped by the pre-filter" if counts["skipped"] else ""
+    click.echo(f"  Heuristic: {counts['done']} paragraphs evaluated, {counts['pending']} pending{skipped}")
+
+    return result, state
 
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+"""
+Heuristic task and result files for the FPR Editorial Agent.
+
+Format version 2 (written by default) stores the rules context and the
+prompt template once, in a header, and keeps tasks down to
+paragraph_index, text, language and a text hash:
+
+    {"format": "fpr-heuristic-tasks", "version": 2,
+     "context": "...", "prompt_template": "... $context ... $text ...",
+     "lang_instructions": {"es": "...", "en": "..."},
+     "tasks": [{"paragraph_index": 12, "text": "...", "language": "es", "hash": "..."}]}
+
+With a .jsonl path the same data is written as JSON Lines: the header on
+the first line, then one task per line, so large exports can be streamed.
+
+Version 1 (a JSON array in which every task carries its full prompt) can
+still be written for older evaluators, and both versions are accepted
+when results are applied.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from string import Template
+from typing import Iterable, Optional
+
+FORMAT_VERSION = 2
+TASKS_FORMAT = "fpr-heuristic-tasks"
+RESULTS_FORMAT = "fpr-heuristic-results"
+
+
+def paragraph_hash(text: str) -> str:
+    """Short content hash identifying the paragraph text a task or result refers to."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def render_prompt(header: dict, task: dict) -> str:
+    """Build the full evaluation prompt for one task from a v2 header."""
+    return Template(header["prompt_template"]).substitute(
+        lang_instruction=header["lang_instructions"][task["language"]],
+        context=header["context"],
+        text=task["text"],
+    )
+
+
+def _is_jsonl(path: Path) -> bool:
+    return Path(path).suffix.lower() == ".jsonl"
+
+
+# ----------------------------------------------------------------------
+# Tasks
+# ----------------------------------------------------------------------
+
+def write_tasks(path: Path, header: dict, tasks: list[dict], version: int = FORMAT_VERSION) -> None:
+    """Write heuristic tasks as v2 JSON / JSON Lines, or as a legacy v1 array."""
+    path = Path(path)
+    if version == 1:
+        legacy = [
+            {
+                "paragraph_index": task["paragraph_index"],
+                "text": task["text"],
+                "language": task["language"],
+                "prompt": render_prompt(header, task),
+            }
+            for task in tasks
+        ]
+        path.write_text(json.dumps(legacy, indent=2, ensure_ascii=False), encoding="utf-8")
+        return
+
+    header = {"format": TASKS_FORMAT, "version": FORMAT_VERSION, **header, "task_count": len(tasks)}
+    rows = [json.dumps(_task_row(task), ensure_ascii=False) for task in tasks]
+
+    if _is_jsonl(path):
+        lines = [json.dumps(header, ensure_ascii=False)] + rows
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return
+
+    # Header fields indented for readability, one compact task per line
+    body = json.dumps(header, indent=2, ensure_ascii=False)[:-2]
+    task_lines = ",\n    ".join(rows)
+    path.write_text(f'{body},\n  "tasks": [\n    {task_lines}\n  ]\n}}\n', encoding="utf-8")
+
+
+def tasks_document(header: dict, tasks: list[dict]) -> dict:
+    """Return v2 tasks as one JSON object, as write_tasks() writes them to a .json path."""
+    return {
+        "format": TASKS_FORMAT,
+        "version": FORMAT_VERSION,
+        **header,
+        "task_count": len(tasks),
+        "tasks": [_task_row(task) for task in tasks],
+    }
+
+
+def _task_row(task: dict) -> dict:
+    return {
+        "paragraph_index": task["paragraph_index"],
+        "text": task["text"],
+        "language": task["language"],
+        "hash": task.get("hash") or paragraph_hash(task["text"]),
+    }
+
+
+def read_tasks(path: Path) -> tuple[dict, list[dict]]:
+    """Load a task file of either version as (header, tasks).
+
+    v1 files have no header; their tasks keep the per-task "prompt".
+    """
+    path = Path(path)
+    if _is_jsonl(path):
+        header, rows = {}, []
+        for row in _iter_jsonl(path):
+            if row.get("format") == TASKS_FORMAT:
+                header = row
+            else:
+                rows.append(row)
+        return header, rows
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        return {}, data
+    tasks = data.pop("tasks", [])
+    return data, tasks
+
+
+# ----------------------------------------------------------------------
+# Results
+# ----------------------------------------------------------------------
+
+def write_results(path: Path, results: Iterable[dict], header: Optional[dict] = None) -> None:
+    """Write per-paragraph results ({paragraph_index, hash, suggestions}) in v2 format."""
+    path = Path(path)
+    header = {"format": RESULTS_FORMAT, "version": FORMAT_VERSION, **(header or {})}
+    results = list(results)
+    if _is_jsonl(path):
+        lines = [json.dumps(header, ensure_ascii=False)]
+        lines += [json.dumps(r, ensure_ascii=False) for r in results]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return
+    path.write_text(
+        json.dumps({**header, "results": results}, indent=2, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+
+def read_results(path: Path) -> list[dict]:
+    """Load heuristic results of either version as per-paragraph records.
+
+    Accepts:
+    - v1: a JSON array of flat suggestions, or of {paragraph_index, suggestions}
+    - v2: {"format": "fpr-heuristic-results", "version": 2, "results": [...]}
+    - JSON Lines with an optional header line and one record per line
+
+    Returns [{"paragraph_index", "hash" (or None), "suggestions": [...]}],
+    one record per paragraph, in file order.
+    """
+    path = Path(path)
+    if _is_jsonl(path):
+        items = [row for row in _iter_jsonl(path) if row.get("format") != RESULTS_FORMAT]
+        return parse_results(items, str(path))
+    return parse_results(json.loads(path.read_text(encoding="utf-8")), str(path))
+
+
+def parse_results(data, source: str = "results") -> list[dict]:
+    """Return per-paragraph records from parsed v1 or v2 results (see read_results())."""
+    if isinstance(data, dict):
+        if data.get("version", FORMAT_VERSION) > FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported heuristic results version {data['version']} in {source}"
+            )
+        items = data.get("results", [])
+    else:
+        items = data
+
+    records: dict[int, dict] = {}
+    for item in items:
+        if "suggestions" in item:
+            # Per-paragraph format: {paragraph_index, hash?, suggestions: [...]}
+            p_idx = item.get("paragraph_index", 0)
+            record = records.setdefault(p_idx, _record(p_idx, item.get("hash")))
+            for s in item["suggestions"]:
+                s.setdefault("paragraph_index", p_idx)
+                record["suggestions"].append(s)
+        elif "original" in item:
+            # Flat format: direct suggestion objects
+            p_idx = item.get("paragraph_index", 0)
+            records.setdefault(p_idx, _record(p_idx, item.get("hash")))["suggestions"].append(item)
+    return list(records.values())
+
+
+def check_suggestion(s) -> dict:
+    """Validate the fields of one heuristic suggestion and return it, without its null optional fields.
+
+    Raises ValueError naming the first bad field.
+    """
+    if not isinstance(s, dict):
+        raise ValueError("suggestions must be objects")
+    for key in ("original", "replacement"):
+        if not isinstance(s.get(key), str):
+            raise ValueError(f'suggestion "{key}" must be a string')
+    s = {key: value for key, value in s.items() if value is not None}
+    for key in ("rule_id", "rationale", "part"):
+        if key in s and not isinstance(s[key], str):
+            raise ValueError(f'suggestion "{key}" must be a string')
+    confidence = s.get("confidence", 0.0)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0.0 <= confidence <= 1.0:
+        raise ValueError('suggestion "confidence" must be a number from 0 to 1')
+    start = s.get("start")
+    if start is not None and (isinstance(start, bool) or not isinstance(start, int) or start < 0):
+        raise ValueError('suggestion "start" must be a non-negative integer')
+    return s
+
+
+def _record(p_idx: int, text_hash: Optional[str]) -> dict:
+    return {"paragraph_index": p_idx, "hash": text_hash, "suggestions": []}
+
+
+def _iter_jsonl(path: Path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -3,29 +3,107 @@ Knowledge base loader for the FPR Editorial Agent.
 
 Loads pre-compiled YAML files from core/ and projects/{project_id}/
 and provides query methods for the rule engine.
+
+Parsed YAML, the flattened protected-term list, the compiled matcher and
+the heuristic paragraph scorer are cached as a snapshot keyed by the
+content hashes of the source YAMLs, so repeated runs and batch workers
+skip YAML parsing and rule validation entirely until a source file
+changes.
+
+Pickle stores a compiled re.Pattern as its source and flags, so loading
+a snapshot still compiles every regex again. That is most of the load
+time: about 15 ms of 17 ms for ERSV and 7 ms of 8 ms for WCRP, against
+about 160 ms to parse and validate the YAML.
 """
 
+import hashlib
+import os
+import pickle
+import threading
 from pathlib import Path
 from typing import Optional
 
 import yaml
 
+from src.matcher import PARAGRAPH_TYPES, TermMatcher
+from src.scorer import ParagraphScorer
+
+# Bump when the snapshot layout or anything it caches changes shape
+SNAPSHOT_VERSION = 3
+
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def cache_dir() -> Path:
+    """Per-user cache directory for compiled artifacts.
+
+    Kept out of the shared temp directory on purpose: snapshots are
+    pickles, and a world-writable location would let another local user
+    plant one.
+    """
+    override = os.environ.get("FPR_CACHE_DIR")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    return (Path(base) if base else Path.home() / ".cache") / "fpr-editorial-agent"
+
 
 class KnowledgeBase:
     """Loads and provides access to FPR editorial knowledge base YAMLs."""
 
-    def __init__(self, project_id: str):
+    def __init__(self, project_id: str, use_cache: bool = True, rebuild_cache: bool = False):
         self.project_id = project_id
-        self.repo_root = Path(__file__).parent.parent
-
-        self._voice_playbook = self._load("core/voice-playbook.yaml")
-        self._master_rules = self._load("core/master-editing-rules.yaml")
-        self._economist = self._load("core/economist-principles.yaml")
-        self._ai_humanizer = self._load("core/ai-humanizer.yaml")
-
-        self._term_bank = self._load(f"projects/{project_id}/term-bank.yaml")
-        self._protected_lexicon = self._load(f"projects/{project_id}/protected-lexicon.yaml")
-        self._audience_profiles = self._load(f"projects/{project_id}/audience-profiles.yaml")
+        self.repo_root = REPO_ROOT
+
+        self._sources = self.source_files(project_id)
+        self.snapshot_hash = self._source_digest()
+        self.loaded_from_cache = False
+
+        snapshot = None
+        if use_cache and not rebuild_cache:
+            snapshot = self._read_snapshot()
+        if snapshot is not None:
+            self.__dict__.update(snapshot)
+            self.loaded_from_cache = True
+            return
+
+        for attr, relative_path in self._sources.items():
+            setattr(self, attr, self._load(relative_path))
+        self._protected_terms = self._flatten_protected_terms()
+        self._term_matcher: Optional[TermMatcher] = None
+        self._heuristic_scorer: Optional[ParagraphScorer] = None
+
+        # Compile every deterministic entry and heuristic signal now, so invalid
+        # patterns raise InvalidRuleError at load rather than in the middle of a run
+        matcher = self.get_term_matcher()
+        self.get_heuristic_scorer()
+        if use_cache:
+            matcher.prepare(PARAGRAPH_TYPES)
+            self._write_snapshot()
+
+    @staticmethod
+    def source_files(project_id: str) -> dict[str, str]:
+        """Return the source YAMLs of a project, by attribute, relative to the repo root."""
+        return {
+            "_voice_playbook": "core/voice-playbook.yaml",
+            "_master_rules": "core/master-editing-rules.yaml",
+            "_economist": "core/economist-principles.yaml",
+            "_ai_humanizer": "core/ai-humanizer.yaml",
+            "_term_bank": f"projects/{project_id}/term-bank.yaml",
+            "_protected_lexicon": f"projects/{project_id}/protected-lexicon.yaml",
+            "_audience_profiles": f"projects/{project_id}/audience-profiles.yaml",
+        }
+
+    @classmethod
+    def source_mtimes(cls, project_id: str) -> dict[str, int]:
+        """Return the modification time (ns) of each source YAML; 0 for a missing file."""
+        mtimes = {}
+        for relative_path in cls.source_files(project_id).values():
+            try:
+                mtimes[relative_path] = (REPO_ROOT / relative_path).stat().st_mtime_ns
+            except OSError:
+                mtimes[relative_path] = 0
+        return mtimes
 
     def _load(self, relative_path: str) -> dict:
         path = self.repo_root / relative_path
@@ -34,12 +112,68 @@ class KnowledgeBase:
         with open(path, encoding="utf-8") as f:
             return yaml.safe_load(f) or {}
 
+    # ------------------------------------------------------------------
+    # Compiled snapshot cache
+    # ------------------------------------------------------------------
+
+    def _source_digest(self) -> str:
+        """Hash the snapshot version, project and every source YAML's content."""
+        digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}:{self.project_id}".encode("utf-8"))
+        for relative_path in self._sources.values():
+            path = self.repo_root / relative_path
+            if not path.exists():
+                raise FileNotFoundError(f"Knowledge base file not found: {path}")
+            digest.update(relative_path.encode("utf-8"))
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+        return digest.hexdigest()
+
+    def _snapshot_path(self) -> Path:
+        return cache_dir() / f"kb-{self.project_id}-{self.snapshot_hash[:16]}.pickle"
+
+    def _read_snapshot(self) -> Optional[dict]:
+        path = self._snapshot_path()
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return None  # Corrupt or incompatible snapshot: rebuild from YAML
+        if not isinstance(snapshot, dict) or snapshot.pop("_snapshot_hash", None) != self.snapshot_hash:
+            return None
+        return snapshot
+
+    def _write_snapshot(self) -> None:
+        """Persist the parsed/compiled state; caching is best-effort."""
+        state = {attr: getattr(self, attr) for attr in self._sources}
+        state["_protected_terms"] = self._protected_terms
+        state["_term_matcher"] = self._term_matcher
+        state["_heuristic_scorer"] = self._heuristic_scorer
+        state["_snapshot_hash"] = self.snapshot_hash
+
+        path = self._snapshot_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+            partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+            with open(partial, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, path)
+            # Drop snapshots of older source versions for this project
+            for stale in path.parent.glob(f"kb-{self.project_id}-*.pickle"):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+        except OSError:
+            pass
+
     def get_term_bank_entries(self) -> list[dict]:
         """Return all term bank entries for the active project."""
         return self._term_bank.get("entries", [])
 
     def get_protected_terms(self) -> list[str]:
         """Return flat list of all protected terms from the project lexicon."""
+        return list(self._protected_terms)
+
+    def _flatten_protected_terms(self) -> list[str]:
         terms = []
         lexicon = self._protected_lexicon.get("terms", {})
         for category in lexicon.values():
@@ -62,6 +196,24 @@ class KnowledgeBase:
                         terms.append(entry.get("term", ""))
         return [t for t in terms if t]
 
+    def get_term_matcher(self) -> TermMatcher:
+        """Return the compiled deterministic matcher, built once per knowledge base."""
+        if self._term_matcher is None:
+            self._term_matcher = TermMatcher(
+                self.get_term_bank_entries() + self.get_ai_humanizer_entries(),
+                self.get_protected_terms(),
+            )
+        return self._term_matcher
+
+    def get_heuristic_scorer(self) -> ParagraphScorer:
+        """Return the heuristic pre-filter scorer, built once per knowledge base."""
+        if self._heuristic_scorer is None:
+            self._heuristic_scorer = ParagraphScorer(
+                self.get_ai_humanizer_heuristic_rules(),
+                self._economist.get("clarity_principles", {}).get("preferred_substitutions", []),
+            )
+        return self._heuristic_scorer
+
     def get_audience_profile(self, profile_id: Optional[str] = None) -> dict:
         """Return audience profile by ID, or the first/default profile."""
         profiles = self._audience_profiles.get("profiles", [])
@@ -179,3 +331,33 @@ CONFIDENCE THRESHOLDS:
   - <{thresholds.get('ignore_below', 0.60)}: ignore"""
 
         return context
+
+
+class KnowledgeBases:
+    """Per-project KnowledgeBase instances, reloaded when a source YAML changes."""
+
+    def __init__(self):
+        self._loaded: dict[str, tuple[dict, KnowledgeBase]] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self, project: str) -> KnowledgeBase:
+        # One stat per source file per request; the YAML is only read again
+        # (or the compiled snapshot loaded) when a modification time changed
+        mtimes = KnowledgeBase.source_mtimes(project)
+        with self._lock:
+            loaded = self._loaded.get(project)
+            if loaded is not None and loaded[0] == mtimes:
+                return loaded[1]
+            kb = KnowledgeBase(project)
+            self._loaded[project] = (mtimes, kb)
+            if loaded is not None:
+                self.reloads += 1
+            return kb
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                project: {"kb_snapshot": kb.snapshot_hash, "term_bank_entries": len(kb.get_term_bank_entries())}
+                for project, (_, kb) in self._loaded.items()
+            }
@@ -0,0 +1,292 @@
+"""
+Compiled multi-pattern matcher for the deterministic pass.
+
+Literal term bank and AI-humanizer entries are grouped into one alternation
+regex per (paragraph type, case sensitivity) bucket, so each paragraph is
+scanned once per bucket instead of once per entry. Regex entries stay
+individually precompiled.
+
+The bucket scan only nominates candidate entries; each candidate is then
+confirmed with its own compiled pattern, so the resulting matches are
+identical to running re.search for every entry.
+
+ExpansionIndex answers "does this context-aware expansion already appear
+in the document" for the first-reference rules.
+
+Entries are validated and turned into immutable Rule objects when the
+matcher is built (at knowledge base load), so a bad pattern is reported
+with its rule id up front rather than surfacing mid-run.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+# Paragraph types produced by RuleEngine._get_paragraph_type()
+PARAGRAPH_TYPES = ("prose", "headings", "tables", "footnotes")
+PATTERN_TYPES = ("literal", "regex")
+
+
+class InvalidRuleError(ValueError):
+    """One or more knowledge base entries cannot be compiled into rules."""
+
+    def __init__(self, problems: list[str]):
+        self.problems = problems
+        super().__init__(
+            "Invalid knowledge base entries:\n" + "\n".join(f"  - {p}" for p in problems)
+        )
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A deterministic term bank / AI-humanizer entry, normalized and compiled."""
+
+    index: int
+    id: str
+    original: str
+    replacement: str
+    rule: str
+    case_sensitive: bool
+    context_aware: bool
+    pattern_type: str
+    applies_in: frozenset
+    flags: int
+    compiled: re.Pattern
+    expansion_key: str  # replacement.lower(), for ExpansionIndex lookups
+
+    @property
+    def is_regex(self) -> bool:
+        return self.pattern_type == "regex"
+
+
+class _Bucket:
+    """Alternation scanners for the entries that apply to one paragraph type."""
+
+    def __init__(self, rules: list[Rule], para_type: str):
+        applicable = [r for r in rules if para_type in r.applies_in]
+
+        self.regex_indices = [r.index for r in applicable if r.is_regex]
+        literals = [r for r in applicable if not r.is_regex]
+
+        self.cs_scanner, self.cs_candidates = self._build(
+            [r for r in literals if r.case_sensitive], 0, lambda s: s
+        )
+        self.ci_scanner, self.ci_candidates = self._build(
+            [r for r in literals if not r.case_sensitive], re.IGNORECASE, str.lower
+        )
+        self.ci_fallback = sorted(
+            r.index for r in literals if not r.case_sensitive
+        )
+
+    @staticmethod
+    def _build(literals: list[Rule], flags: int, key):
+        """Compile a lookahead alternation and its keyword -> candidates table.
+
+        Alternatives are ordered longest first, so at every position the
+        scanner reports the longest literal that matches there. Any other
+        literal matching at the same position is a prefix of it, so each
+        keyword maps to every entry whose literal matches its prefix.
+        """
+        if not literals:
+            return None, {}
+
+        keywords: dict[str, str] = {}
+        for r in literals:
+            keywords.setdefault(key(r.original), r.original)
+        ordered = sorted(keywords.values(), key=len, reverse=True)
+
+        candidates: dict[str, list[int]] = {}
+        for kw in ordered:
+            candidates[key(kw)] = [
+                r.index for r in literals if r.compiled.match(kw) is not None
+            ]
+
+        alternation = "|".join(re.escape(kw) for kw in ordered)
+        scanner = re.compile(f"(?=({alternation}))", flags)
+        return scanner, candidates
+
+    def candidates(self, text: str) -> set[int]:
+        """Return indices of entries that may match somewhere in text."""
+        found = set(self.regex_indices)
+        if self.cs_scanner is not None:
+            for hit in {m.group(1) for m in self.cs_scanner.finditer(text)}:
+                found.update(self.cs_candidates[hit])
+        if self.ci_scanner is not None:
+            for hit in {m.group(1).lower() for m in self.ci_scanner.finditer(text)}:
+                indices = self.ci_candidates.get(hit)
+                if indices is None:
+                    # Case folding outside str.lower() (e.g. Kelvin sign):
+                    # let every case-insensitive entry confirm itself.
+                    found.update(self.ci_fallback)
+                    break
+                found.update(indices)
+        return found
+
+
+class ExpansionIndex:
+    """Which context-aware expansions appear anywhere in a document.
+
+    Paragraphs are observed in document order and lowercased once each;
+    an expansion is only searched for until its first occurrence, after
+    which it costs nothing. Expansions never contain a newline, so checking
+    paragraph by paragraph is equivalent to searching the lowercased,
+    newline-joined document text, and every later lookup is a set
+    membership test.
+
+    (A single alternation regex over all expansions was measured and is
+    several times slower than per-expansion substring checks here.)
+    """
+
+    def __init__(self, expansions: Iterable[str]):
+        self.expansions = tuple(sorted({x.lower() for x in expansions}))
+        self._pending = set(self.expansions)
+        self._present: set[str] = set()
+
+    def find(self, text: str) -> list[str]:
+        """Return every expansion occurring in text, independent of earlier paragraphs."""
+        lowered = text.lower()
+        return [x for x in self.expansions if x in lowered]
+
+    def observe(self, text: str) -> None:
+        """Record the expansions not yet seen that occur in a paragraph."""
+        if self._pending:
+            lowered = text.lower()
+            found = {x for x in self._pending if x in lowered}
+            if found:
+                self.add(found)
+
+    def add(self, found: Iterable[str]) -> None:
+        """Mark expansions as present (e.g. found by find() or in another process)."""
+        found = set(found)
+        self._present |= found
+        self._pending -= found
+
+    @property
+    def present(self) -> set[str]:
+        return set(self._present)
+
+    def __contains__(self, expansion: str) -> bool:
+        return expansion.lower() in self._present
+
+    def has_key(self, key: str) -> bool:
+        """Like `in`, for an expansion that is already lowercased (Rule.expansion_key)."""
+        return key in self._present
+
+
+class TermMatcher:
+    """Finds all deterministic entries that match a paragraph in one scan.
+
+    Entries are validated, normalized and compiled into Rule objects once,
+    at build time; InvalidRuleError lists every entry that cannot be.
+    Entries that can never produce a suggestion (empty original, no-op
+    replacement, or a protected original) are dropped up front.
+    """
+
+    def __init__(self, entries: list[dict], protected_terms: list[str]):
+        protected = set(protected_terms)
+        self.entries: list[Rule] = []
+        problems = []
+
+        for entry in entries:
+            rule_id = entry.get("id", "UNKNOWN")
+            original = unicodedata.normalize("NFC", entry.get("original", ""))
+            replacement = unicodedata.normalize("NFC", entry.get("replacement", ""))
+
+            pattern_type = entry.get("pattern_type", "literal")
+            if pattern_type not in PATTERN_TYPES:
+                problems.append(f"{rule_id}: unknown pattern_type {pattern_type!r}")
+                continue
+            applies_in = entry.get("applies_in", ["prose"])
+            if isinstance(applies_in, str) or not set(applies_in) <= set(PARAGRAPH_TYPES):
+                problems.append(
+                    f"{rule_id}: applies_in must be a list of {', '.join(PARAGRAPH_TYPES)}"
+                    f" (got {applies_in!r})"
+                )
+                continue
+
+            case_sensitive = bool(entry.get("case_sensitive", True))
+            flags = 0 if case_sensitive else re.IGNORECASE
+            pattern = original if pattern_type == "regex" else re.escape(original)
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as e:
+                problems.append(f"{rule_id}: invalid regex {original!r}: {e}")
+                continue
+
+            if not original or replacement == original:
+                continue
+            if original in protected:
+                continue
+
+            self.entries.append(Rule(
+                index=len(self.entries),
+                id=rule_id,
+                original=original,
+                replacement=replacement,
+                rule=entry.get("rule", "Term bank substitution"),
+                case_sensitive=case_sensitive,
+                context_aware=bool(entry.get("context_aware", False)),
+                pattern_type=pattern_type,
+                applies_in=frozenset(applies_in),
+                flags=flags,
+                compiled=compiled,
+                expansion_key=replacement.lower(),
+            ))
+
+        if problems:
+            raise InvalidRuleError(problems)
+        self._buckets: dict[str, _Bucket] = {}
+
+    def expansion_index(self) -> ExpansionIndex:
+        """Return a fresh ExpansionIndex over the replacements of context_aware entries."""
+        return ExpansionIndex(r.replacement for r in self.entries if r.context_aware)
+
+    def prepare(self, para_types: Iterable[str]) -> None:
+        """Build the buckets for the given paragraph types ahead of first use."""
+        for para_type in para_types:
+            self._bucket(para_type)
+
+    def _bucket(self, para_type: str) -> _Bucket:
+        bucket = self._buckets.get(para_type)
+        if bucket is None:
+            bucket = self._buckets[para_type] = _Bucket(self.entries, para_type)
+        return bucket
+
+    def iter_matches(
+        self,
+        text: str,
+        para_type: str,
+        evaluations: Optional[Counter] = None,
+        hits: Optional[Counter] = None,
+        all_occurrences: bool = False,
+    ) -> Iterator[tuple[Rule, re.Match]]:
+        """Yield (rule, first match) for every rule matching text, in KB order.
+
+        With all_occurrences, yields (rule, match) for every non-overlapping
+        match of each rule instead, in text order per rule.
+
+        If given, evaluations and hits count the regex searches run and the
+        ones that matched, per entry index.
+        """
+        entries = self.entries
+        for idx in sorted(self._bucket(para_type).candidates(text)):
+            rule = entries[idx]
+            if all_occurrences:
+                matched = False
+                for match in rule.compiled.finditer(text):
+                    matched = True
+                    yield rule, match
+                if evaluations is not None:
+                    evaluations[idx] += 1
+                    if matched:
+                        hits[idx] += 1
+                continue
+            match: Optional[re.Match] = rule.compiled.search(text)
+            if evaluations is not None:
+                evaluations[idx] += 1
+                if match:
+                    hits[idx] += 1
+            if match:
+                yield rule, match
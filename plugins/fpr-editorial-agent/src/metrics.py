@@ -0,0 +1,121 @@
+"""
+Run metrics for the FPR Editorial Agent.
+
+Collects per-stage wall and CPU time, named counters, per-rule regex
+evaluation and hit counts, and peak resident set size, and writes them as
+JSON (--metrics) so that runs can be compared across releases.
+
+Components take an optional Metrics; stage(None, ...) is a no-op, so
+nothing is measured unless metrics were requested.
+"""
+
+import json
+import platform
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_VERSION = 1
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """Peak resident set size of this process (or of its finished children), if known."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def stage(metrics: Optional["Metrics"], name: str):
+    """Time a stage on metrics, or do nothing when metrics is None."""
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+class Metrics:
+    """Stage timers, counters and per-rule counts for one run."""
+
+    def __init__(self, **info):
+        self.info = dict(info)
+        self.stages: dict[str, dict] = {}
+        self.counters: Counter = Counter()
+        self.rule_evaluations: Counter = Counter()  # rule_id -> regex searches run
+        self.rule_hits: Counter = Counter()  # rule_id -> searches that matched
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Accumulate wall/CPU time of the block under name.
+
+        The peak RSS recorded for a stage is the process high-water mark
+        when the stage ended, so the first stage at which it jumps is the
+        one that allocated the memory.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_bytes": None}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += time.perf_counter() - wall
+            entry["cpu_seconds"] += time.process_time() - cpu
+            entry["peak_rss_bytes"] = peak_rss_bytes()
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def add_counters(self, prefix: str, counters: dict) -> None:
+        """Add a component's counters as prefix.name."""
+        for name, n in counters.items():
+            self.counters[f"{prefix}.{name}"] += n
+
+    def add_rule_counts(self, rules: list, evaluations: dict, hits: dict) -> None:
+        """Add per-rule regex counts (keyed by TermMatcher rule index) under rule ids."""
+        for idx, n in evaluations.items():
+            self.rule_evaluations[rules[idx].id] += n
+        for idx, n in hits.items():
+            self.rule_hits[rules[idx].id] += n
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        rules = {
+            rule_id: {"evaluations": n, "hits": self.rule_hits[rule_id]}
+            for rule_id, n in self.rule_evaluations.most_common()
+        }
+        return {
+            "version": METRICS_VERSION,
+            **self.info,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": sys.platform,
+            "wall_seconds": round(time.perf_counter() - self._started, 4),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "peak_rss_children_bytes": peak_rss_bytes(children=True),
+            "stages": {
+                name: {**s, "seconds": round(s["seconds"], 4), "cpu_seconds": round(s["cpu_seconds"], 4)}
+                for name, s in self.stages.items()
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "rules": rules,
+        }
+
+    def write(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
@@ -0,0 +1,227 @@
+"""
+Persistent per-paragraph result cache for the FPR Editorial Agent.
+
+Documents go through several revision rounds in which most paragraphs do
+not change. Results are stored per paragraph, keyed by a hash of the
+paragraph text and of the configuration that produced them, so a re-run
+only evaluates paragraphs whose text (or whose rules) changed. Three
+kinds of entries are kept:
+
+- "deterministic": term bank matches and context-aware expansions present
+- "deterministic_all": the same with every match per entry (--all-occurrences)
+- "heuristic": suggestions imported with --apply-heuristic
+
+Term bank matching depends only on the knowledge base, so the
+deterministic kinds are keyed by its snapshot hash and shared by every
+mode, audience and language. Heuristic entries are keyed by the whole
+scope: snapshot hash, mode, audience and language.
+
+The store is a SQLite file next to the knowledge base snapshots. Entries
+are evicted least-recently-used once the total size exceeds max_bytes.
+Like the KB snapshot, caching is best-effort: if the store cannot be
+opened or written, runs proceed uncached.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from src.knowledge_base import KnowledgeBase, cache_dir
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+KINDS = ("deterministic", "deterministic_all", "heuristic")
+# Kinds keyed by the knowledge base snapshot hash alone (the first scope field)
+KB_SCOPED_KINDS = ("deterministic", "deterministic_all")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+def default_cache_path() -> Path:
+    return cache_dir() / "paragraphs.sqlite3"
+
+
+class ParagraphCache:
+    """Content-addressed store of paragraph results for one (KB, mode, audience, language) scope.
+
+    Reads go straight to the database; writes and LRU timestamp updates
+    are buffered and committed in one transaction by flush()/close().
+    """
+
+    def __init__(
+        self,
+        scope: tuple[str, ...],
+        path: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.scope = tuple(scope)
+        self.path = Path(path) if path else default_cache_path()
+        self.max_bytes = max_bytes
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._prefixes = {
+            kind: "\x1f".join(self.scope[:1] if kind in KB_SCOPED_KINDS else self.scope) for kind in KINDS
+        }
+        self._pending: dict[str, str] = {}
+        self._touched: dict[str, float] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error):
+            self._db = None
+
+    @classmethod
+    def for_run(
+        cls,
+        kb: KnowledgeBase,
+        mode: str,
+        audience_id: Optional[str],
+        language: str,
+        **kwargs,
+    ) -> "ParagraphCache":
+        """Open the cache scoped to one knowledge base snapshot and run configuration."""
+        return cls((kb.snapshot_hash, mode, audience_id or "", language), **kwargs)
+
+    def spec(self) -> tuple:
+        """Picklable arguments to reopen this cache in another process."""
+        return self.scope, self.path, self.max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def __enter__(self) -> "ParagraphCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def _key(self, kind: str, text: str, detail: str) -> str:
+        data = "\x1f".join((self._prefixes[kind], kind, detail, text)).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+    def get(self, kind: str, text: str, detail: str = ""):
+        """Return the cached value for a paragraph text, or None."""
+        if self._db is None:
+            return None
+        key = self._key(kind, text, detail)
+        raw = self._pending.get(key)
+        if raw is None:
+            try:
+                row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                row = None
+            raw = row[0] if row else None
+        if raw is None:
+            self.misses[kind] += 1
+            return None
+        self.hits[kind] += 1
+        self._touched[key] = time.time()
+        return json.loads(raw)
+
+    def put(self, kind: str, text: str, value, detail: str = "") -> None:
+        """Store a JSON-serializable value for a paragraph text (written on flush)."""
+        if self._db is None:
+            return
+        self._pending[self._key(kind, text, detail)] = json.dumps(value, ensure_ascii=False)
+
+    def record(self, hits: dict, misses: dict) -> None:
+        """Add lookup counts gathered by another process (see spec())."""
+        self.hits.update(hits)
+        self.misses.update(misses)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def flush(self) -> None:
+        """Commit buffered entries and LRU timestamps."""
+        if self._db is None or not (self._pending or self._touched):
+            return
+        now = time.time()
+        try:
+            with self._db:
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(t, k) for k, t in self._touched.items() if k not in self._pending],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(k, v, len(k) + len(v.encode("utf-8")), now) for k, v in self._pending.items()],
+                )
+        except sqlite3.Error:
+            pass
+        self._pending.clear()
+        self._touched.clear()
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the store fits in max_bytes."""
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total <= self.max_bytes:
+                    return
+                doomed = []
+                for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((key,))
+                    total -= size
+                self._db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        self.flush()
+        self.evict()
+        self._db.close()
+        self._db = None
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Return {kind: {hits, misses, hit_rate}} for the kinds looked up so far."""
+        out = {}
+        for kind in KINDS:
+            hits, misses = self.hits[kind], self.misses[kind]
+            if hits or misses:
+                out[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3),
+                }
+        return out
+
+    def describe(self) -> str:
+        """One-line hit rate summary for CLI output."""
+        stats = self.stats()
+        if not stats:
+            return "no lookups"
+        return ", ".join(
+            f"{kind} {s['hits']}/{s['hits'] + s['misses']} hits ({s['hit_rate']:.0%})"
+            for kind, s in stats.items()
+        )
@@ -0,0 +1,68 @@
+"""
+Structural index of a WordprocessingML part for the FPR Editorial Agent.
+
+One preorder pass over a part's tree records every paragraph in document
+order together with its container (table cell or body), and every run
+that sits inside a tracked change (w:ins, w:del, w:moveFrom, w:moveTo).
+RuleEngine classifies paragraphs and DocxWriter builds offset maps from
+it, instead of walking getparent() up to the root for each paragraph and
+each run. DocxPackage.part_index() builds it once per part and shares it.
+
+The pass only stops at paragraphs, tables and tracked-change wrappers
+(lxml filters every other element out in C); the paragraphs of each
+outermost table and the runs of each wrapper are collected with one more
+C-level iteration of that subtree, so every element is looked at a
+bounded number of times whatever the nesting depth.
+"""
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{WORD_NS}}}"
+
+# Paragraph containers
+BODY = "body"
+TABLE = "table"
+
+# Revision wrappers whose runs belong to an existing tracked change
+TRACKED_CHANGE_TAGS = (f"{W}ins", f"{W}del", f"{W}moveFrom", f"{W}moveTo")
+
+
+class PartIndex:
+    """Paragraphs of one part in document order, with container and tracked-run tags.
+
+    paragraphs[i] is the paragraph RuleEngine and DocxWriter call paragraph
+    index i (the order of root.iter("w:p")), and containers[i] is TABLE if
+    it is anywhere inside a w:tbl, else BODY.
+    """
+
+    def __init__(self, root):
+        self.paragraphs: list = []
+        self.containers: list[str] = []
+        self._tracked_runs: set = set()
+
+        p_tag, tbl_tag, r_tag = f"{W}p", f"{W}tbl", f"{W}r"
+        table_paragraphs: set = set()
+        tables: set = set()
+        for elem in root.iter(p_tag, tbl_tag, *TRACKED_CHANGE_TAGS):
+            tag = elem.tag
+            if tag == p_tag:
+                self.paragraphs.append(elem)
+                self.containers.append(TABLE if elem in table_paragraphs else BODY)
+            elif tag == tbl_tag:
+                # Preorder: an outermost table is met before any of its paragraphs
+                if elem not in tables:
+                    tables.update(elem.iter(tbl_tag))
+                    table_paragraphs.update(elem.iter(p_tag))
+            else:
+                # Tracked-change wrapper (nested wrappers add the same runs again)
+                self._tracked_runs.update(elem.iter(r_tag))
+
+    def in_table(self, p_idx: int) -> bool:
+        return self.containers[p_idx] == TABLE
+
+    def is_tracked(self, run) -> bool:
+        """True if run is inside a tracked change."""
+        return run in self._tracked_runs
+
+    def mark_tracked(self, wrapper) -> None:
+        """Tag the runs of a tracked-change wrapper added to the tree after indexing."""
+        self._tracked_runs.update(wrapper.iter(f"{W}r"))
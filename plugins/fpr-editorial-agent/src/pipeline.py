@@ -0,0 +1,91 @@
+"""
+Shared steps of the heuristic round-trip for the FPR Editorial Agent.
+
+The CLI, batch mode and the server all export heuristic tasks, resume a
+document's run state and merge heuristic results into it. These helpers
+hold that logic once, independent of how progress is reported, so no
+front end imports another's internals.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from src.heuristic_io import paragraph_hash, write_tasks
+from src.run_state import RunState, document_hash, run_config
+
+
+def heuristic_header(engine, doc_path: Path) -> dict:
+    """The header shared by every heuristic task of a document (see heuristic_io)."""
+    return {"document": doc_path.name, **engine.heuristic_header()}
+
+
+def export_heuristic_tasks(tasks: list[dict], path: Path, header: dict, version: int = 2) -> None:
+    """Export heuristic tasks for external evaluation (v2: shared header; .jsonl for JSON Lines)."""
+    write_tasks(path, header, tasks, version=version)
+
+
+# ----------------------------------------------------------------------
+# Run state
+# ----------------------------------------------------------------------
+
+def resume_state(engine, doc_path: Path, state_path: Path) -> Optional[RunState]:
+    """Return the run state at state_path if it belongs to this document and configuration."""
+    state = RunState.load(state_path)
+    if state is None or not state.matches(document_hash(doc_path), run_config(engine)):
+        return None
+    return state
+
+
+def deterministic_suggestions(result) -> list:
+    return [
+        s
+        for lst in (result.high_confidence, result.low_confidence, result.skipped)
+        for s in lst
+        if s.source == "deterministic"
+    ]
+
+
+def create_state(engine, doc_path: Path, result, tasks: list[dict]) -> RunState:
+    """Start a run state from a fresh deterministic pass and the extracted heuristic tasks."""
+    return RunState.create(
+        doc_path, document_hash(doc_path), run_config(engine),
+        deterministic_suggestions(result), tasks, engine.cached_heuristic,
+    )
+
+
+def load_state(engine, package, doc_path: Path, state_path: Optional[Path]):
+    """Return (result, state, resumed): from the matching run state, or from a fresh pass."""
+    state = resume_state(engine, doc_path, state_path) if state_path is not None else None
+    if state is not None:
+        return engine.classify_all(state.deterministic_suggestions()), state, True
+    result = engine.run(package)
+    return result, create_state(engine, doc_path, result, engine.extract_heuristic_tasks(package)), False
+
+
+def split_stale(engine, package, state: RunState, records: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split heuristic result records into (current, stale).
+
+    v2 results carry the hash of the text they were produced for; records
+    whose paragraph has changed since the tasks were exported are stale.
+    """
+    if not any(r["hash"] for r in records):
+        return records, []
+    current = state.paragraph_hashes()
+    if any(r["hash"] and r["paragraph_index"] not in current for r in records):
+        current = {
+            **{p_idx: paragraph_hash(text) for p_idx, text in engine.heuristic_paragraphs(package)},
+            **current,
+        }
+    stale = [r for r in records if r["hash"] and current.get(r["paragraph_index"]) != r["hash"]]
+    return [r for r in records if r not in stale], stale
+
+
+def merge_heuristic(engine, package, result, state: RunState, records: list[dict],
+                    state_path: Optional[Path]) -> None:
+    """Merge result records into the run state and add every evaluated paragraph's suggestions to result."""
+    state.merge(records)
+    # This round's results are stored in the paragraph cache for later runs
+    engine.remember_heuristic_results(package, {r["paragraph_index"]: r["suggestions"] for r in records})
+    engine.add_heuristic_suggestions(result, state.done_suggestions(), package)
+    if state_path is not None:
+        state.save(state_path)
@@ -0,0 +1,83 @@
+"""
+Changelog and flags reports for the FPR Editorial Agent.
+
+Written next to the edited document by the CLI, batch mode, watch mode
+and the server.
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+from src.docx_package import DOCUMENT_PART
+
+
+def write_changelog(
+    path: Path,
+    result,
+    doc_name: str,
+    project: str,
+    mode: str,
+) -> None:
+    """Write markdown changelog of applied changes."""
+    lines = [
+        f"# FPR Editorial Agent — Changelog",
+        f"",
+        f"**Document:** {doc_name}",
+        f"**Project:** {project}",
+        f"**Mode:** {mode}",
+        f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        f"",
+        f"## Track Changes Applied ({len(result.high_confidence)})",
+        f"",
+    ]
+
+    for s in sorted(result.high_confidence, key=_document_order):
+        lines.append(f"- **[{s.rule_id}]** `{s.original}` → `{s.replacement}`{_part_note(s)}")
+        lines.append(f"  _{s.rationale}_")
+        lines.append(f"")
+
+    if result.low_confidence:
+        lines += [
+            f"## Comments Added ({len(result.low_confidence)})",
+            f"",
+        ]
+        for s in sorted(result.low_confidence, key=_document_order):
+            lines.append(
+                f"- **[{s.rule_id}]** `{s.original}` → `{s.replacement}`"
+                f" (confidence: {s.confidence:.0%}){_part_note(s)}"
+            )
+            lines.append(f"  _{s.rationale}_")
+            lines.append(f"")
+
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def _document_order(s) -> tuple:
+    """Sort key: body first, then other parts by name, then paragraph."""
+    return (s.part != DOCUMENT_PART, s.part, s.paragraph_index)
+
+
+def _part_note(s) -> str:
+    """Location suffix for suggestions outside the document body."""
+    return "" if s.part == DOCUMENT_PART else f" ({Path(s.part).name})"
+
+
+def write_flags(path: Path, result) -> None:
+    """Write flags file for human review items."""
+    lines = [
+        "# FPR Editorial Agent — Flags for Human Review",
+        "",
+        "Items below require editorial judgment before accepting.",
+        "",
+    ]
+
+    for s in result.low_confidence:
+        lines.append(f"## [{s.rule_id}] Paragraph {s.paragraph_index}{_part_note(s)}")
+        lines.append(f"")
+        lines.append(f"**Original:** `{s.original}`")
+        lines.append(f"**Suggested:** `{s.replacement}`")
+        lines.append(f"**Confidence:** {s.confidence:.0%}")
+        lines.append(f"**Rationale:** {s.rationale}")
+        lines.append(f"")
+
+    path.write_text("\n".join(lines), encoding="utf-8")
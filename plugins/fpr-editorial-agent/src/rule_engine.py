@@ -4,25 +4,129 @@ Rule engine for the FPR Editorial Agent.
 Implements two passes:
 1. Deterministic: regex-based term bank substitutions on <w:t> text content
 2. Heuristic: paragraphs + context exported for Claude Desktop/Code to evaluate externally
+
+Documents can be analyzed from the parsed tree (run / extract_heuristic_tasks)
+or in streaming mode (run_streaming), which walks each part with iterparse
+and runs both passes in one bounded-memory scan.
+
+The deterministic pass covers every text-bearing part (body, footnotes,
+endnotes, headers, footers); the heuristic pass covers body prose only.
 """
 
-import json
-import re
+import os
 import unicodedata
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 import lxml.etree
 
+from src.docx_package import DOCUMENT_PART, ENDNOTES_PART, FOOTNOTES_PART, DocxPackage
+from src.heuristic_io import paragraph_hash
 from src.knowledge_base import KnowledgeBase
+from src.metrics import Metrics, stage
+from src.paragraph_cache import ParagraphCache
+from src.part_index import TABLE, PartIndex
+from src.scorer import select_tasks
 
 WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{WORD_NS}}}"
+
+# Parts whose paragraphs are all note text
+NOTES_PARTS = (FOOTNOTES_PART, ENDNOTES_PART)
+
+# Secondary parts at least this large (uncompressed) are scanned in a worker
+# process alongside the body; smaller ones cost less to scan than to ship.
+PARALLEL_PART_MIN_BYTES = 2 * 1024 * 1024
+
+# With jobs > 1, paragraph texts are sent to the matching pool in chunks of
+# this many paragraphs; at most SHARDS_IN_FLIGHT chunks per job are pending.
+SHARD_PARAGRAPHS = 256
+SHARDS_IN_FLIGHT = 4
+
+LANG_INSTRUCTIONS = {
+    "es": "Responde ÚNICAMENTE en JSON. Evalúa el texto en español.",
+    "en": "Respond ONLY in JSON. Evaluate the text in English.",
+}
+
+# string.Template placeholders: $lang_instruction, $context, $text
+HEURISTIC_PROMPT_TEMPLATE = """$lang_instruction
+
+ACTIVE RULES CONTEXT:
+$context
+
+TEXT TO EVALUATE:
+$text
+
+TASK:
+Identify style violations. For each one, return EXACTLY this JSON format:
+{
+  "suggestions": [
+    {
+      "original": "exact minimum text to replace",
+      "replacement": "suggested replacement",
+      "rule_id": "rule ID applied",
+      "confidence": 0.0,
+      "rationale": "one-line explanation"
+    }
+  ]
+}
+
+CRITICAL CONSTRAINTS:
+- "original" must be the MINIMUM string containing the problem (never the whole sentence if the problem is one word)
+- confidence 0.60+ = auto track change with explanatory comment; below 0.60 = ignored
+- Do NOT suggest changes that violate preserve-first, certainty upgrades, or equity framing
+- Do NOT suggest changes to protected terms
+- If the paragraph has no problems, return {"suggestions": []}"""
+
+# Several paragraphs in one prompt (see evaluator.pack_tasks); placeholders:
+# $lang_instruction (one line per language present), $context, $paragraphs
+# ("[P<index>] text" blocks)
+HEURISTIC_BATCH_PROMPT_TEMPLATE = """$lang_instruction
+
+ACTIVE RULES CONTEXT:
+$context
+
+PARAGRAPHS TO EVALUATE (each one starts with its tag, e.g. [P12]):
+$paragraphs
+
+TASK:
+Identify style violations in each paragraph separately. Return EXACTLY this JSON format, with one entry per paragraph, using the number from its tag as paragraph_index:
+{
+  "paragraphs": [
+    {
+      "paragraph_index": 12,
+      "suggestions": [
+        {
+          "original": "exact minimum text to replace",
+          "replacement": "suggested replacement",
+          "rule_id": "rule ID applied",
+          "confidence": 0.0,
+          "rationale": "one-line explanation"
+        }
+      ]
+    }
+  ]
+}
+
+CRITICAL CONSTRAINTS:
+- Evaluate each paragraph in its own language
+- "original" must be copied exactly from the paragraph it belongs to, and be the MINIMUM string containing the problem (never the whole sentence if the problem is one word)
+- confidence 0.60+ = auto track change with explanatory comment; below 0.60 = ignored
+- Do NOT suggest changes that violate preserve-first, certainty upgrades, or equity framing
+- Do NOT suggest changes to protected terms
+- A paragraph with no problems gets "suggestions": []"""
 
 
 @dataclass
 class Suggestion:
-    """A single editorial suggestion."""
+    """A single editorial suggestion.
+
+    start and end are character offsets of original in the paragraph text
+    (every <w:t> of the paragraph, as read by the engine); DocxWriter edits
+    exactly that span. end defaults to start + len(original).
+    """
     original: str
     replacement: str
     rule_id: str
@@ -30,6 +134,18 @@ class Suggestion:
     rationale: str
     paragraph_index: int
     source: str  # "deterministic" or "heuristic"
+    start: Optional[int] = None  # character offset of the match in the paragraph text, if known
+    part: str = DOCUMENT_PART  # package part holding the paragraph (e.g. "word/footnotes.xml")
+    end: Optional[int] = None  # offset just past the match
+
+    def __post_init__(self):
+        if self.start is not None and self.end is None:
+            self.end = self.start + len(self.original)
+
+    @property
+    def paragraph_key(self) -> tuple[str, int]:
+        """(part, paragraph_index): stable for a session, since edits never add or remove paragraphs."""
+        return self.part, self.paragraph_index
 
 
 @dataclass
@@ -40,6 +156,234 @@ class EngineResult:
     skipped: list[Suggestion] = field(default_factory=list)           # below ignore threshold
 
 
+class _DeterministicScan:
+    """Incremental deterministic pass: feed paragraphs in document order, then finish().
+
+    Matching happens as paragraphs arrive. Only context_aware decisions are
+    deferred, because "is the expansion already anywhere in the document"
+    needs the whole document; for that, an ExpansionIndex records which
+    expansions have been seen instead of keeping the document text around,
+    and first-reference resolution is set lookups.
+
+    Matches are kept per part, so parts scanned elsewhere (a worker process)
+    can be merged in with absorb() before finish().
+
+    With a ParagraphCache, each paragraph's matches and expansions are
+    looked up by text (and paragraph type) before scanning.
+
+    With count_rules, the regex searches run and matched per entry are
+    counted for metrics (paragraphs served from the cache run none).
+
+    With all_occurrences, every match of an entry in a paragraph becomes a
+    suggestion, not only the first (context_aware entries still fire once
+    per document).
+    """
+
+    def __init__(
+        self,
+        kb: KnowledgeBase,
+        cache: Optional[ParagraphCache] = None,
+        count_rules: bool = False,
+        all_occurrences: bool = False,
+    ):
+        self.matcher = kb.get_term_matcher()
+        self.cache = cache if cache is not None and cache.enabled else None
+        self.all_occurrences = all_occurrences
+        # Cached results differ by mode, so each mode has its own cache entries
+        self.cache_kind = "deterministic_all" if all_occurrences else "deterministic"
+        self.expansions = self.matcher.expansion_index()
+        # part -> [(paragraph_index, entry_index, start, matched_text)]
+        self._matches: dict[str, list[tuple[int, int, int, str]]] = {}
+        self.paragraphs = 0
+        self.evaluations: Optional[Counter] = Counter() if count_rules else None
+        self.hits: Optional[Counter] = Counter() if count_rules else None
+
+    def feed(self, p_idx: int, para_type: str, para_text: str, part: str = DOCUMENT_PART) -> None:
+        if self.cache is not None:
+            self._feed_cached(p_idx, para_type, para_text, part)
+            return
+
+        self.paragraphs += 1
+        self.expansions.observe(para_text)
+
+        # One scan per paragraph finds every matching entry, in KB order
+        matches = self._matches.setdefault(part, [])
+        for rule, match in self.matcher.iter_matches(
+            para_text, para_type, self.evaluations, self.hits, self.all_occurrences
+        ):
+            # Use the actual matched text from the document (preserves case)
+            # so the docx_writer can find it with exact string match
+            matches.append((p_idx, rule.index, match.start(), match.group(0)))
+
+    def _feed_cached(self, p_idx: int, para_type: str, para_text: str, part: str) -> None:
+        result = self.cache.get(self.cache_kind, para_text, para_type)
+        if result is None:
+            result = self.scan_paragraph(para_type, para_text)
+            self.cache.put(self.cache_kind, para_text, result, para_type)
+        self.record(p_idx, part, result)
+
+    def scan_paragraph(self, para_type: str, para_text: str) -> dict:
+        """Match one paragraph on its own, as a cacheable / picklable result.
+
+        The result does not depend on earlier paragraphs: every expansion
+        is checked rather than only the ones not yet seen, and
+        context_aware matches are kept for finish() to resolve.
+        """
+        return {
+            "expansions": self.expansions.find(para_text),
+            "matches": [
+                [rule.index, match.start(), match.group(0)]
+                for rule, match in self.matcher.iter_matches(
+                    para_text, para_type, self.evaluations, self.hits, self.all_occurrences
+                )
+            ],
+        }
+
+    def record(self, p_idx: int, part: str, result: dict) -> None:
+        """Add a scan_paragraph() result; paragraphs must be recorded in document order."""
+        self.paragraphs += 1
+        self.expansions.add(result["expansions"])
+        self._matches.setdefault(part, []).extend(
+            (p_idx, entry_index, start, matched_text)
+            for entry_index, start, matched_text in result["matches"]
+        )
+
+    def export(self) -> tuple[dict, set[str]]:
+        """Return the raw (picklable) scan state for absorb() in another process."""
+        return self._matches, self.expansions.present
+
+    def counts(self) -> dict:
+        """Return the (picklable) paragraph and per-entry regex counts for absorb_counts()."""
+        return {
+            "paragraphs": self.paragraphs,
+            "evaluations": dict(self.evaluations or {}),
+            "hits": dict(self.hits or {}),
+        }
+
+    def absorb_counts(self, counts: dict) -> None:
+        self.paragraphs += counts["paragraphs"]
+        if self.evaluations is not None:
+            self.evaluations.update(counts["evaluations"])
+            self.hits.update(counts["hits"])
+
+    def absorb(self, matches: dict, present_expansions: set[str]) -> None:
+        """Merge the exported state of a scan over other parts."""
+        for part, part_matches in matches.items():
+            self._matches.setdefault(part, []).extend(part_matches)
+        self.expansions.add(present_expansions)
+
+    def finish(self, part_order: Optional[list[str]] = None) -> list[Suggestion]:
+        """Resolve context_aware rules and build suggestions, parts in part_order."""
+        suggestions = []
+        rules = self.matcher.entries
+
+        # Track which context_aware rules have already been applied (first-reference only)
+        applied_context_aware: set[str] = set()
+
+        matches = (
+            (part, *match)
+            for part in (part_order or list(self._matches))
+            for match in self._matches.get(part, ())
+        )
+        for part, p_idx, entry_index, start, matched_text in matches:
+            rule = rules[entry_index]
+            rule_id = rule.id
+            context_aware = rule.context_aware
+
+            if context_aware:
+                # Skip if this rule was already applied earlier in the document
+                if rule_id in applied_context_aware:
+                    continue
+                # Skip if the expanded form already exists anywhere in the document
+                if self.expansions.has_key(rule.expansion_key):
+                    continue
+
+            suggestions.append(Suggestion(
+                original=matched_text,
+                replacement=rule.replacement,
+                rule_id=rule_id,
+                confidence=1.0,
+                rationale=rule.rule,
+                paragraph_index=p_idx,
+                source="deterministic",
+                start=start,
+                end=start + len(matched_text),
+                part=part,
+            ))
+            # Mark context_aware rules as applied so they don't fire again
+            if context_aware:
+                applied_context_aware.add(rule_id)
+
+        return suggestions
+
+
+# Per-process engine for part scans, set by _init_part_worker()
+_PART_ENGINE: Optional["RuleEngine"] = None
+
+
+def _init_part_worker(
+    kb: KnowledgeBase,
+    streaming: bool,
+    cache_spec: Optional[tuple],
+    count_rules: bool = False,
+    all_occurrences: bool = False,
+) -> None:
+    global _PART_ENGINE
+    cache = ParagraphCache(*cache_spec) if cache_spec else None
+    _PART_ENGINE = RuleEngine(
+        kb=kb,
+        streaming=streaming,
+        parallel_parts=False,
+        cache=cache,
+        metrics=Metrics() if count_rules else None,
+        all_occurrences=all_occurrences,
+    )
+
+
+def _scan_part_worker(docx_path: str, part: str) -> tuple[dict, set[str], dict, dict, dict]:
+    """Scan one part of a .docx in a worker process and export the scan state.
+
+    Also returns the worker's cache hit/miss counts and scan counts for this part.
+    """
+    cache = _PART_ENGINE.cache
+    if cache is not None:
+        cache.hits.clear()
+        cache.misses.clear()
+    scan = _DeterministicScan(
+        _PART_ENGINE.kb, cache, _PART_ENGINE.metrics is not None, _PART_ENGINE.all_occurrences
+    )
+    with DocxPackage(docx_path) as package:
+        for p_idx, para_type, para_text in _PART_ENGINE._iter_part_paragraphs(package, part):
+            scan.feed(p_idx, para_type, para_text, part)
+    if cache is None:
+        return (*scan.export(), {}, {}, scan.counts())
+    cache.flush()
+    return (*scan.export(), dict(cache.hits), dict(cache.misses), scan.counts())
+
+
+_SHARD_SCAN: Optional["_DeterministicScan"] = None
+
+
+def _init_shard_worker(
+    kb: KnowledgeBase, count_rules: bool = False, all_occurrences: bool = False
+) -> None:
+    global _SHARD_SCAN
+    _SHARD_SCAN = _DeterministicScan(kb, count_rules=count_rules, all_occurrences=all_occurrences)
+
+
+def _scan_shard_worker(paragraphs: list[tuple[str, str]]) -> tuple[list[dict], dict]:
+    """Match a chunk of (para_type, text) paragraphs in a worker process.
+
+    Returns the per-paragraph results and the regex counts for the chunk.
+    """
+    scan = _SHARD_SCAN
+    if scan.evaluations is not None:
+        scan.evaluations.clear()
+        scan.hits.clear()
+    results = [scan.scan_paragraph(para_type, text) for para_type, text in paragraphs]
+    return results, scan.counts()
+
+
 class RuleEngine:
     """Two-pass editorial rule engine."""
 
@@ -49,26 +393,40 @@ class RuleEngine:
         mode: str = "light",
         audience_id: Optional[str] = None,
         language: str = "auto",
+        streaming: bool = False,
+        parallel_parts: bool = True,
+        cache: Optional[ParagraphCache] = None,
+        jobs: int = 1,
+        metrics: Optional[Metrics] = None,
+        all_occurrences: bool = False,
     ):
         self.kb = kb
         self.mode = mode
         self.audience_id = audience_id
         self.language = language
+        self.streaming = streaming
+        self.parallel_parts = parallel_parts
+        self.cache = cache
+        self.jobs = jobs
+        self.metrics = metrics
+        self.all_occurrences = all_occurrences
         self.thresholds = kb.get_confidence_thresholds()
+        # Heuristic results reused from the cache by the last task extraction,
+        # as suggestion dicts ready for add_heuristic_suggestions()
+        self.cached_heuristic: list[dict] = []
 
-    def run(self, unpacked_dir: Path) -> EngineResult:
+    def run(self, package: DocxPackage) -> EngineResult:
         """Run both passes and return classified suggestions."""
-        doc_xml = unpacked_dir / "word" / "document.xml"
-        if not doc_xml.exists():
-            raise FileNotFoundError(f"document.xml not found at {doc_xml}")
+        if self.streaming:
+            return self.run_streaming(package)[0]
 
-        tree = lxml.etree.parse(str(doc_xml))
-        root = tree.getroot()
+        if not package.has_part(DOCUMENT_PART):
+            raise FileNotFoundError(f"{DOCUMENT_PART} not found in {package.path}")
 
         result = EngineResult()
 
-        # Pass 1: deterministic term bank
-        det_suggestions = self._deterministic_pass(root)
+        # Pass 1: deterministic term bank, over every text-bearing part
+        det_suggestions = self._deterministic_pass(package)
         for s in det_suggestions:
             self._classify(s, result)
 
@@ -82,6 +440,48 @@ class RuleEngine:
 
         return result
 
+    def run_streaming(
+        self, package: DocxPackage, extract_heuristic: bool = False
+    ) -> tuple[EngineResult, list[dict]]:
+        """Run the deterministic pass (and optionally heuristic extraction) in one streaming scan.
+
+        Each part is read with iterparse and processed elements are cleared
+        as soon as their paragraph is classified, so peak memory is bounded by
+        the largest paragraph rather than the document size. Results are
+        identical to run() + extract_heuristic_tasks().
+        """
+        if not package.has_part(DOCUMENT_PART):
+            raise FileNotFoundError(f"{DOCUMENT_PART} not found in {package.path}")
+
+        tasks = []
+        self.cached_heuristic = []
+
+        def on_body_paragraph(p_idx: int, para_type: str, para_text: str) -> None:
+            task = self._heuristic_task(p_idx, para_type, para_text)
+            if task is not None:
+                tasks.append(task)
+
+        suggestions = self._deterministic_pass(
+            package, on_body_paragraph if extract_heuristic else None
+        )
+
+        result = EngineResult()
+        for s in suggestions:
+            self._classify(s, result)
+        for lst in (result.high_confidence, result.low_confidence):
+            lst.sort(key=lambda s: s.paragraph_index, reverse=True)
+
+        return result, tasks
+
+    def classify_all(self, suggestions: list[Suggestion]) -> EngineResult:
+        """Classify previously found suggestions (e.g. from a run state) into a new result."""
+        result = EngineResult()
+        for s in suggestions:
+            self._classify(s, result)
+        for lst in (result.high_confidence, result.low_confidence):
+            lst.sort(key=lambda s: s.paragraph_index, reverse=True)
+        return result
+
     def _classify(self, suggestion: Suggestion, result: EngineResult) -> None:
         high = self.thresholds.get("high_confidence_track_change", 0.85)
         low = self.thresholds.get("low_confidence_comment", 0.60)
@@ -98,88 +498,227 @@ class RuleEngine:
     # DETERMINISTIC PASS
     # ------------------------------------------------------------------
 
-    def _deterministic_pass(self, root) -> list[Suggestion]:
-        """Apply term bank substitutions to <w:t> text content."""
-        entries = self.kb.get_term_bank_entries() + self.kb.get_ai_humanizer_entries()
-        protected = set(self.kb.get_protected_terms())
-        suggestions = []
-
-        paragraphs = root.findall(f".//{{{WORD_NS}}}p")
-
-        # Track which context_aware rules have already been applied (first-reference only)
-        applied_context_aware: set[str] = set()
-
-        # Build full document text for checking if replacement already exists
-        all_para_texts = []
-        for para in paragraphs:
-            all_para_texts.append(self._get_para_text(para))
-        full_doc_text = "\n".join(all_para_texts)
-
-        for p_idx, para in enumerate(paragraphs):
-            para_type = self._get_paragraph_type(para)
-            para_text = all_para_texts[p_idx]
+    def _deterministic_pass(
+        self,
+        package: DocxPackage,
+        on_body_paragraph: Optional[Callable[[int, str, str], None]] = None,
+    ) -> list[Suggestion]:
+        """Apply term bank substitutions to <w:t> text content of every text part.
+
+        The body is scanned in this process (feeding on_body_paragraph, if
+        given); large secondary parts are scanned at the same time in worker
+        processes, one per part, and merged before context_aware resolution.
+        With jobs > 1, paragraphs of every part are sharded across a pool
+        instead (see _sharded_scan).
+        """
+        parts = package.text_parts()
+        with stage(self.metrics, "deterministic_pass"):
+            if self.jobs > 1:
+                scan = self._sharded_scan(package, parts, on_body_paragraph)
+            else:
+                scan = self._scan_parts(package, parts, on_body_paragraph)
+            suggestions = scan.finish(parts)
+
+        if self.metrics is not None:
+            self.metrics.count("paragraphs_scanned", scan.paragraphs)
+            self.metrics.count("deterministic_suggestions", len(suggestions))
+            self.metrics.add_rule_counts(self.kb.get_term_matcher().entries, scan.evaluations, scan.hits)
+        return suggestions
 
-            for entry in entries:
-                applies_in = entry.get("applies_in", ["prose"])
-                if para_type not in applies_in:
+    def _scan_parts(
+        self,
+        package: DocxPackage,
+        parts: list[str],
+        on_body_paragraph: Optional[Callable[[int, str, str], None]] = None,
+    ) -> _DeterministicScan:
+        """Scan the body here and large secondary parts in worker processes."""
+        offloaded = [
+            part for part in parts
+            if part != DOCUMENT_PART
+            and not package.is_modified(part)
+            and package.part_size(part) >= PARALLEL_PART_MIN_BYTES
+        ] if self.parallel_parts and (os.cpu_count() or 1) > 1 else []
+
+        count_rules = self.metrics is not None
+        scan = _DeterministicScan(self.kb, self.cache, count_rules, self.all_occurrences)
+        pool = None
+        futures = {}
+        if offloaded:
+            if self.cache is not None:
+                self.cache.flush()  # workers open their own connection
+            pool = ProcessPoolExecutor(
+                max_workers=len(offloaded),
+                initializer=_init_part_worker,
+                initargs=(
+                    self.kb, self.streaming, self.cache.spec() if scan.cache else None,
+                    count_rules, self.all_occurrences,
+                ),
+            )
+            futures = {
+                part: pool.submit(_scan_part_worker, str(package.path), part)
+                for part in offloaded
+            }
+
+        try:
+            for part in parts:
+                if part in futures:
                     continue
+                body = part == DOCUMENT_PART and on_body_paragraph is not None
+                for p_idx, para_type, para_text in self._iter_part_paragraphs(package, part):
+                    scan.feed(p_idx, para_type, para_text, part)
+                    if body:
+                        on_body_paragraph(p_idx, para_type, para_text)
+            for future in futures.values():
+                matches, present, hits, misses, counts = future.result()
+                scan.absorb(matches, present)
+                scan.absorb_counts(counts)
+                if self.cache is not None:
+                    self.cache.record(hits, misses)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return scan
+
+    def _sharded_scan(
+        self,
+        package: DocxPackage,
+        parts: list[str],
+        on_body_paragraph: Optional[Callable[[int, str, str], None]] = None,
+    ) -> _DeterministicScan:
+        """Scan every part with paragraph matching spread over self.jobs processes.
+
+        Paragraphs are read here (feeding on_body_paragraph, if given) and
+        their texts sent to the pool in chunks; cache hits never leave this
+        process. Chunk results are recorded strictly in submission order, so
+        first-reference resolution and suggestion order match the serial pass.
+        """
+        count_rules = self.metrics is not None
+        scan = _DeterministicScan(self.kb, self.cache, count_rules, self.all_occurrences)
+        pending: deque = deque()  # (future or None, rows) in document order
+        rows: list[tuple] = []  # (part, p_idx, para_type, text, cached result or None)
+
+        def submit() -> None:
+            misses = [(para_type, text) for _, _, para_type, text, result in rows if result is None]
+            future = pool.submit(_scan_shard_worker, misses) if misses else None
+            pending.append((future, rows.copy()))
+            rows.clear()
+
+        def drain(keep: int) -> None:
+            while len(pending) > keep:
+                future, chunk = pending.popleft()
+                computed = iter(())
+                if future is not None:
+                    results, counts = future.result()
+                    computed = iter(results)
+                    scan.absorb_counts(counts)
+                for part, p_idx, para_type, text, result in chunk:
+                    if result is None:
+                        result = next(computed)
+                        if scan.cache is not None:
+                            scan.cache.put(scan.cache_kind, text, result, para_type)
+                    scan.record(p_idx, part, result)
+
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_shard_worker,
+            initargs=(self.kb, count_rules, self.all_occurrences),
+        ) as pool:
+            for part in parts:
+                body = part == DOCUMENT_PART and on_body_paragraph is not None
+                for p_idx, para_type, para_text in self._iter_part_paragraphs(package, part):
+                    cached = (
+                        scan.cache.get(scan.cache_kind, para_text, para_type)
+                        if scan.cache is not None else None
+                    )
+                    rows.append((part, p_idx, para_type, para_text, cached))
+                    if body:
+                        on_body_paragraph(p_idx, para_type, para_text)
+                    if len(rows) >= SHARD_PARAGRAPHS:
+                        submit()
+                        drain(self.jobs * SHARDS_IN_FLIGHT)
+            if rows:
+                submit()
+            drain(0)
+
+        return scan
+
+    def _iter_part_paragraphs(self, package: DocxPackage, part: str) -> Iterator[tuple[int, str, str]]:
+        """Yield (paragraph_index, paragraph_type, text) for one part, streamed or parsed."""
+        if self.streaming:
+            with package.open_stream(part) as stream:
+                yield from self._iter_stream_paragraphs(stream, part)
+        else:
+            yield from self._iter_tree_paragraphs(package.part_index(part), part)
+
+    def _iter_tree_paragraphs(
+        self, index: PartIndex, part: str = DOCUMENT_PART
+    ) -> Iterator[tuple[int, str, str]]:
+        """Yield (paragraph_index, paragraph_type, text) from a parsed part's index."""
+        for p_idx, (para, container) in enumerate(zip(index.paragraphs, index.containers)):
+            para_type = self._get_paragraph_type(para, part, container == TABLE)
+            yield p_idx, para_type, self._get_para_text(para)
+
+    def _iter_stream_paragraphs(
+        self, stream, part: str = DOCUMENT_PART
+    ) -> Iterator[tuple[int, str, str]]:
+        """Yield (paragraph_index, paragraph_type, text) while streaming a part.
+
+        Indices follow document (pre-)order like findall(".//w:p"): a paragraph
+        gets its index on its start tag. Paragraphs nested inside another one
+        (text boxes) are held back until the outermost paragraph closes, so
+        output stays in index order and the outer text still includes them.
+        """
+        p_tag, tbl_tag, tr_tag = f"{W}p", f"{W}tbl", f"{W}tr"
+        next_index = 0
+        open_paras: list[int] = []
+        table_depth = 0
+        ready: list[tuple[int, str, str]] = []
+
+        for event, elem in lxml.etree.iterparse(
+            stream, events=("start", "end"), tag=(p_tag, tbl_tag, tr_tag)
+        ):
+            if event == "start":
+                if elem.tag == p_tag:
+                    open_paras.append(next_index)
+                    next_index += 1
+                elif elem.tag == tbl_tag:
+                    table_depth += 1
+                continue
 
-                original = unicodedata.normalize("NFC", entry.get("original", ""))
-                replacement = unicodedata.normalize("NFC", entry.get("replacement", ""))
-                if not original or replacement == original:
+            if elem.tag == p_tag:
+                p_idx = open_paras.pop()
+                para_type = self._get_paragraph_type(elem, part, table_depth > 0)
+                ready.append((p_idx, para_type, self._get_para_text(elem)))
+                if open_paras:
                     continue
-
-                # Skip if the original is a protected term
-                if original in protected:
+                ready.sort()
+                yield from ready
+                ready.clear()
+            elif elem.tag == tbl_tag:
+                table_depth -= 1
+                if open_paras:
                     continue
+            elif open_paras:
+                continue
 
-                case_sensitive = entry.get("case_sensitive", True)
-                context_aware = entry.get("context_aware", False)
-                rule_id = entry.get("id", "UNKNOWN")
-
-                if context_aware:
-                    # Skip if this rule was already applied earlier in the document
-                    if rule_id in applied_context_aware:
-                        continue
-                    # Skip if the expanded form already exists anywhere in the document
-                    if replacement.lower() in full_doc_text.lower():
-                        continue
-
-                # Match in paragraph text
-                flags = 0 if case_sensitive else re.IGNORECASE
-                pattern_type = entry.get("pattern_type", "literal")
-                if pattern_type == "regex":
-                    pattern = original
-                else:
-                    pattern = re.escape(original)
-                match = re.search(pattern, para_text, flags)
-                if match:
-                    # Use the actual matched text from the document (preserves case)
-                    # so the docx_writer can find it with exact string match
-                    matched_text = match.group(0)
-                    suggestions.append(Suggestion(
-                        original=matched_text,
-                        replacement=replacement,
-                        rule_id=rule_id,
-                        confidence=1.0,
-                        rationale=entry.get("rule", "Term bank substitution"),
-                        paragraph_index=p_idx,
-                        source="deterministic",
-                    ))
-                    # Mark context_aware rules as applied so they don't fire again
-                    if context_aware:
-                        applied_context_aware.add(rule_id)
+            # Free everything processed so far at this level
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
 
-        return suggestions
+    def _get_paragraph_type(self, para, part: str = DOCUMENT_PART, in_table: bool = False) -> str:
+        """Classify a paragraph as prose, heading, table, or footnote.
+
+        in_table comes from the caller's walk (PartIndex or the streaming
+        parser's table depth), so no ancestors are visited here.
+        """
+        if in_table:
+            return "tables"
 
-    def _get_paragraph_type(self, para) -> str:
-        """Classify a paragraph as prose, heading, table, or footnote."""
-        # Check if inside a table cell
-        parent = para.getparent()
-        while parent is not None:
-            if parent.tag == f"{{{WORD_NS}}}tbl":
-                return "tables"
-            parent = parent.getparent()
+        # Everything else in footnotes.xml / endnotes.xml is note text
+        if part in NOTES_PARTS:
+            return "footnotes"
 
         # Check paragraph style for headings
         pPr = para.find(f"{{{WORD_NS}}}pPr")
@@ -206,93 +745,129 @@ class RuleEngine:
     # HEURISTIC PASS — export/import for Claude Desktop/Code
     # ------------------------------------------------------------------
 
-    def extract_heuristic_tasks(self, unpacked_dir: Path) -> list[dict]:
-        """Extract prose paragraphs with context for external heuristic evaluation.
+    def extract_heuristic_tasks(self, package: DocxPackage) -> list[dict]:
+        """Extract prose paragraphs for external heuristic evaluation.
 
         Returns a list of dicts, each containing:
         - paragraph_index: int
         - text: str (paragraph text)
         - language: str (detected language)
-        - context: str (active rules context)
-        - prompt: str (ready-to-use evaluation prompt)
+        - hash: str (paragraph_hash of text)
 
-        Claude Desktop (via MCP) or Claude Code evaluates these and returns
-        suggestions via add_heuristic_suggestions().
+        The rules context and prompt template are shared by every task and
+        come from heuristic_header(). Claude Desktop (via MCP) or Claude Code
+        evaluates these and returns suggestions via add_heuristic_suggestions().
         """
-        doc_xml = unpacked_dir / "word" / "document.xml"
-        if not doc_xml.exists():
+        if not package.has_part(DOCUMENT_PART):
             return []
 
-        tree = lxml.etree.parse(str(doc_xml))
-        root = tree.getroot()
-        paragraphs = root.findall(f".//{{{WORD_NS}}}p")
+        index = package.part_index(DOCUMENT_PART)
+        self.cached_heuristic = []
 
-        context = self.kb.build_heuristic_context(
+        tasks = []
+        with stage(self.metrics, "heuristic_extract"):
+            for p_idx, para_type, para_text in self._iter_tree_paragraphs(index):
+                task = self._heuristic_task(p_idx, para_type, para_text)
+                if task is not None:
+                    tasks.append(task)
+
+        return tasks
+
+    def select_heuristic_tasks(
+        self,
+        tasks: list[dict],
+        budget: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> tuple[list[dict], list[dict]]:
+        """Return (selected, below_min_score): the tasks most likely to hold violations (see scorer.select_tasks)."""
+        with stage(self.metrics, "heuristic_prefilter"):
+            return select_tasks(self.kb.get_heuristic_scorer(), tasks, budget, min_score)
+
+    def heuristic_header(self) -> dict:
+        """Return the fields shared by every heuristic task (see heuristic_io)."""
+        return {
+            "project": self.kb.project_id,
+            "mode": self.mode,
+            "audience": self.audience_id,
+            "language": self.language,
+            "kb_snapshot": self.kb.snapshot_hash,
+            "context": self._heuristic_context(),
+            "prompt_template": HEURISTIC_PROMPT_TEMPLATE,
+            "lang_instructions": dict(LANG_INSTRUCTIONS),
+        }
+
+    def _heuristic_context(self) -> str:
+        return self.kb.build_heuristic_context(
             mode=self.mode,
             audience_id=self.audience_id,
             language=self.language,
         )
 
-        tasks = []
-        for p_idx, para in enumerate(paragraphs):
-            if self._get_paragraph_type(para) != "prose":
-                continue
+    def _heuristic_task(self, p_idx: int, para_type: str, para_text: str) -> Optional[dict]:
+        """Build the evaluation task for one paragraph, or None if it needs no evaluation.
 
-            para_text = self._get_para_text(para).strip()
-            if len(para_text) < 20:
+        Paragraphs whose results are already in the paragraph cache are not
+        exported; their cached suggestions are collected in cached_heuristic.
+        """
+        para_text = self._heuristic_text(para_type, para_text)
+        if para_text is None:
+            return None
+
+        if self.cache is not None:
+            cached = self.cache.get("heuristic", para_text)
+            if cached is not None:
+                self.cached_heuristic.extend(dict(s, paragraph_index=p_idx) for s in cached)
+                return None
+
+        para_lang = self._detect_language(para_text) if self.language == "auto" else self.language
+
+        return {
+            "paragraph_index": p_idx,
+            "text": para_text,
+            "language": para_lang,
+            "hash": paragraph_hash(para_text),
+        }
+
+    @staticmethod
+    def _heuristic_text(para_type: str, para_text: str) -> Optional[str]:
+        """Return the text to evaluate heuristically, or None if the paragraph is not eligible."""
+        if para_type != "prose":
+            return None
+        para_text = para_text.strip()
+        if len(para_text) < 20:
+            return None
+        return para_text
+
+    def heuristic_paragraphs(self, package: DocxPackage) -> Iterator[tuple[int, str]]:
+        """Yield (paragraph_index, text) for every body paragraph eligible for heuristic review."""
+        for p_idx, para_type, para_text in self._iter_part_paragraphs(package, DOCUMENT_PART):
+            text = self._heuristic_text(para_type, para_text)
+            if text is not None:
+                yield p_idx, text
+
+    def remember_heuristic_results(self, package: DocxPackage, evaluated: dict[int, list[dict]]) -> None:
+        """Store imported heuristic results in the paragraph cache, keyed by paragraph text.
+
+        evaluated maps paragraph_index to that paragraph's suggestions (an
+        empty list records "evaluated, nothing to change").
+        """
+        if self.cache is None or not evaluated:
+            return
+        for p_idx, text in self.heuristic_paragraphs(package):
+            if p_idx not in evaluated:
                 continue
-
-            para_lang = self._detect_language(para_text) if self.language == "auto" else self.language
-
-            lang_instruction = (
-                "Responde ÚNICAMENTE en JSON. Evalúa el texto en español."
-                if para_lang == "es"
-                else "Respond ONLY in JSON. Evaluate the text in English."
-            )
-
-            prompt = f"""{lang_instruction}
-
-ACTIVE RULES CONTEXT:
-{context}
-
-TEXT TO EVALUATE:
-{para_text}
-
-TASK:
-Identify style violations. For each one, return EXACTLY this JSON format:
-{{
-  "suggestions": [
-    {{
-      "original": "exact minimum text to replace",
-      "replacement": "suggested replacement",
-      "rule_id": "rule ID applied",
-      "confidence": 0.0,
-      "rationale": "one-line explanation"
-    }}
-  ]
-}}
-
-CRITICAL CONSTRAINTS:
-- "original" must be the MINIMUM string containing the problem (never the whole sentence if the problem is one word)
-- confidence 0.60+ = auto track change with explanatory comment; below 0.60 = ignored
-- Do NOT suggest changes that violate preserve-first, certainty upgrades, or equity framing
-- Do NOT suggest changes to protected terms
-- If the paragraph has no problems, return {{"suggestions": []}}"""
-
-            tasks.append({
-                "paragraph_index": p_idx,
-                "text": para_text,
-                "language": para_lang,
-                "context": context,
-                "prompt": prompt,
-            })
-
-        return tasks
+            stored = [
+                {k: v for k, v in s.items() if k not in ("paragraph_index", "part")}
+                for s in evaluated[p_idx]
+            ]
+            self.cache.put("heuristic", text, stored)
 
     def add_heuristic_suggestions(
         self,
         result: EngineResult,
         suggestions_data: list[dict],
+        package: Optional[DocxPackage] = None,
+        texts: Optional[dict[str, dict[int, str]]] = None,
     ) -> None:
         """Incorporate heuristic suggestions from Claude Desktop/Code.
 
@@ -300,13 +875,25 @@ CRITICAL CONSTRAINTS:
             result: The EngineResult to add suggestions to.
             suggestions_data: List of dicts with keys:
                 original, replacement, rule_id, confidence, rationale, paragraph_index
+                (and optionally part, defaulting to word/document.xml, and start)
+            package: The document the suggestions are for. Suggestions without
+                a start offset get the first occurrence of original in their
+                paragraph; without a package (or if original is not found there)
+                they keep no offset and DocxWriter rejects them.
+            texts: part -> {paragraph_index: text}, filled as parts are read;
+                pass the same dict to calls made one response at a time so
+                each part is read once.
         """
         heuristic_mode = self.kb.get_modes().get(self.mode, {})
         applies = heuristic_mode.get("applies", [])
         high_only = "heuristic_high_confidence_only" in applies and "heuristic_all" not in applies
 
+        # part -> {paragraph_index: paragraph text}, read once per part when needed
+        texts = {} if texts is None else texts
+
         for item in suggestions_data:
-            original = item.get("original", "").strip()
+            # Paragraph text is NFC-normalized, so offsets are found for the NFC form
+            original = unicodedata.normalize("NFC", item.get("original", "").strip())
             replacement = item.get("replacement", "").strip()
             confidence = float(item.get("confidence", 0.0))
 
@@ -317,14 +904,25 @@ CRITICAL CONSTRAINTS:
             if high_only and confidence < self.thresholds.get("high_confidence_track_change", 0.85):
                 continue
 
+            part = item.get("part", DOCUMENT_PART)
+            p_idx = item.get("paragraph_index", 0)
+            start = item.get("start")
+            if start is None and package is not None:
+                if part not in texts and package.has_part(part):
+                    texts[part] = {i: text for i, _, text in self._iter_part_paragraphs(package, part)}
+                found = texts.get(part, {}).get(p_idx, "").find(original)
+                start = found if found != -1 else None
+
             suggestion = Suggestion(
                 original=original,
                 replacement=replacement,
                 rule_id=item.get("rule_id", "HEURISTIC"),
                 confidence=confidence,
                 rationale=item.get("rationale", ""),
-                paragraph_index=item.get("paragraph_index", 0),
+                paragraph_index=p_idx,
                 source="heuristic",
+                start=start,
+                part=part,
             )
             self._classify(suggestion, result)
 
@@ -0,0 +1,217 @@
+"""
+Resumable heuristic run state for the FPR Editorial Agent.
+
+A deep or audit run exports heuristic tasks and exits, and the evaluator
+may return results for only part of them. The run state file records
+what the round-trip needs to continue from there instead of starting
+over:
+
+- the document hash (sha256 of the .docx) and the run configuration
+  (knowledge base snapshot hash, mode, audience, language, all_occurrences)
+- the deterministic suggestions, with their offsets
+- per-paragraph heuristic status: "pending" (with the text and language
+  of its task), "skipped" (like pending, but scored below the pre-filter
+  threshold of the last round) or "done" (with its suggestions)
+
+Each --apply-heuristic round merges its results file into the state.
+While the document and configuration match, the deterministic pass is
+not re-run and only the still-pending paragraphs are exported again; if
+either changed, the state is discarded and the run starts fresh.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from src.rule_engine import Suggestion
+
+STATE_FORMAT = "fpr-run-state"
+STATE_VERSION = 2  # 2: "skipped" status; version 1 files are read as they are
+
+PENDING = "pending"
+SKIPPED = "skipped"
+DONE = "done"
+
+
+def document_hash(path: Path) -> str:
+    """sha256 of the document file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_state_path(doc_path: Path) -> Path:
+    """One state file per document path, in the system temp folder."""
+    resolved = str(Path(doc_path).resolve())
+    key = hashlib.sha256(resolved.encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / "FPRStyleAI" / "state" / f"{Path(doc_path).stem}_{key}.json"
+
+
+def run_config(engine) -> dict:
+    """The engine settings a stored state is only valid for."""
+    return {
+        "kb_snapshot": engine.kb.snapshot_hash,
+        "mode": engine.mode,
+        "audience": engine.audience_id,
+        "language": engine.language,
+        "all_occurrences": engine.all_occurrences,
+    }
+
+
+@dataclass
+class RunState:
+    """Deterministic results and per-paragraph heuristic status for one document."""
+
+    document: str
+    document_hash: str
+    config: dict
+    deterministic: list[dict] = field(default_factory=list)  # Suggestion fields
+    paragraphs: dict[int, dict] = field(default_factory=dict)  # paragraph_index -> status entry
+
+    @classmethod
+    def create(
+        cls,
+        doc_path: Path,
+        doc_hash: str,
+        config: dict,
+        deterministic: list[Suggestion],
+        tasks: list[dict],
+        cached: list[dict],
+    ) -> "RunState":
+        """Start a state from a fresh deterministic pass and task extraction.
+
+        tasks become pending paragraphs; cached holds heuristic suggestions
+        reused from the paragraph cache, whose paragraphs are done already.
+        """
+        state = cls(
+            document=Path(doc_path).name,
+            document_hash=doc_hash,
+            config=config,
+            deterministic=[asdict(s) for s in deterministic],
+        )
+        for s in cached:
+            entry = state.paragraphs.setdefault(
+                s["paragraph_index"], {"status": DONE, "hash": None, "suggestions": []}
+            )
+            entry["suggestions"].append(s)
+        for task in tasks:
+            state.paragraphs[task["paragraph_index"]] = {
+                "status": PENDING,
+                "hash": task["hash"],
+                "text": task["text"],
+                "language": task["language"],
+            }
+        return state
+
+    def matches(self, doc_hash: str, config: dict) -> bool:
+        return self.document_hash == doc_hash and self.config == config
+
+    # ------------------------------------------------------------------
+    # Heuristic status
+    # ------------------------------------------------------------------
+
+    def deterministic_suggestions(self) -> list[Suggestion]:
+        return [Suggestion(**s) for s in self.deterministic]
+
+    def paragraph_hashes(self) -> dict[int, str]:
+        return {p_idx: e["hash"] for p_idx, e in self.paragraphs.items() if e["hash"]}
+
+    def pending_tasks(self) -> list[dict]:
+        """Heuristic tasks of the paragraphs still waiting for a result, in document order."""
+        return self._tasks((PENDING,))
+
+    def open_tasks(self) -> list[dict]:
+        """Heuristic tasks of every paragraph not evaluated yet, skipped ones included, in document order."""
+        return self._tasks((PENDING, SKIPPED))
+
+    def _tasks(self, statuses: tuple) -> list[dict]:
+        return [
+            {"paragraph_index": p_idx, "text": e["text"], "language": e["language"], "hash": e["hash"]}
+            for p_idx, e in sorted(self.paragraphs.items())
+            if e["status"] in statuses
+        ]
+
+    def skip(self, tasks: list[dict]) -> None:
+        """Mark the paragraphs of tasks skipped and every other open paragraph pending.
+
+        Called with the pre-filter's below-threshold tasks each round, so a
+        round with a lower threshold (or none) makes them pending again.
+        """
+        skipped = {task["paragraph_index"] for task in tasks}
+        for p_idx, e in self.paragraphs.items():
+            if e["status"] in (PENDING, SKIPPED):
+                e["status"] = SKIPPED if p_idx in skipped else PENDING
+
+    def done_suggestions(self) -> list[dict]:
+        """Heuristic suggestions of every evaluated paragraph, in document order."""
+        return [
+            s
+            for _, e in sorted(self.paragraphs.items())
+            if e["status"] == DONE
+            for s in e["suggestions"]
+        ]
+
+    def merge(self, records: list[dict]) -> None:
+        """Mark the paragraphs of read_results() records done with their suggestions.
+
+        A later result for a paragraph replaces the earlier one.
+        """
+        for r in records:
+            p_idx = r["paragraph_index"]
+            previous = self.paragraphs.get(p_idx, {})
+            self.paragraphs[p_idx] = {
+                "status": DONE,
+                "hash": r["hash"] or previous.get("hash"),
+                "suggestions": list(r["suggestions"]),
+            }
+
+    def counts(self) -> dict:
+        statuses = Counter(e["status"] for e in self.paragraphs.values())
+        return {"done": statuses[DONE], "pending": statuses[PENDING], "skipped": statuses[SKIPPED]}
+
+    # ------------------------------------------------------------------
+    # File
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Write the state, replacing the previous file only once the new one is complete."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format": STATE_FORMAT,
+            "version": STATE_VERSION,
+            "document": self.document,
+            "document_hash": self.document_hash,
+            "config": self.config,
+            "deterministic": self.deterministic,
+            "paragraphs": {str(p_idx): e for p_idx, e in sorted(self.paragraphs.items())},
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RunState"]:
+        """Read a state file, or None if it is missing, unreadable or of another version."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("format") != STATE_FORMAT:
+            return None
+        if data.get("version") not in (1, STATE_VERSION):
+            return None
+        return cls(
+            document=data["document"],
+            document_hash=data["document_hash"],
+            config=data["config"],
+            deterministic=data["deterministic"],
+            paragraphs={int(p_idx): e for p_idx, e in data["paragraphs"].items()},
+        )
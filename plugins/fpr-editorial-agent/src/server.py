@@ -0,0 +1,540 @@
+"""
+Server mode for the FPR Editorial Agent.
+
+Every CLI call starts a new Python process that imports lxml, yaml and
+click, loads the knowledge base and builds the engine before it opens the
+document. The server keeps one KnowledgeBase per project in memory, with
+its compiled matcher and heuristic scorer. It answers JSON requests over
+local HTTP or a Unix socket, so a request only pays for its document:
+
+    POST /analyze           deterministic pass; suggestions and heuristic progress
+    POST /export-heuristic  pending heuristic tasks, inline or written to a file
+    POST /apply-heuristic   merge heuristic results into the run state
+    POST /write             write the edited document, changelog and flags
+    GET  /status            loaded projects and request counters
+
+A request names a document and the same settings as the CLI (see
+REQUEST_FIELDS). Every field is checked once, when the request is
+parsed. Operations share the CLI's run state file for the document.
+Analyze, export, apply and write rounds therefore resume one another,
+and the CLI and the server can work on the same document.
+
+Only local clients that hold the server's token are served. Every
+request needs the token as a bearer token, a Host header naming
+localhost, and a JSON body (Content-Type: application/json), so a web
+page cannot reach the server through CSRF or DNS rebinding. Paths in a
+request are resolved against the document's folder, and outputs, run
+states and results files must stay inside that folder or the server's
+output root.
+
+A knowledge base is reloaded when the modification time of one of its
+YAML files changes. Requests run on a pool of worker threads. Requests on
+the same document are serialized.
+"""
+
+import hmac
+import json
+import math
+import os
+import secrets
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+# Imported up front so that the first request does not pay for them
+import src.docx_writer  # noqa: F401
+from src.batch import output_paths, write_outputs
+from src.docx_package import DocxPackage
+from src.heuristic_io import check_suggestion, parse_results, read_results, tasks_document
+from src.knowledge_base import REPO_ROOT, KnowledgeBases
+from src.matcher import InvalidRuleError
+from src.paragraph_cache import ParagraphCache
+from src.pipeline import export_heuristic_tasks, heuristic_header, load_state, merge_heuristic, split_stale
+from src.rule_engine import RuleEngine
+from src.run_state import default_state_path
+from src.scorer import LIGHT_MIN_SCORE
+
+DEFAULT_PORT = 8765
+ALLOWED_HOSTS = ("localhost", "127.0.0.1")
+MAX_BODY_BYTES = 64 << 20  # inline results of a large document fit easily
+
+MODES = ("light", "deep", "audit")
+LANGUAGES = ("es", "en", "auto")
+
+
+def _is_text(value) -> bool:
+    return isinstance(value, str) and value.strip() != ""
+
+
+def _is_project(value) -> bool:
+    # A bare folder name under projects/: no separators, "..", or glob characters
+    return (
+        _is_text(value) and Path(value).name == value and value != ".."
+        and not any(c in value for c in "*?[]") and (REPO_ROOT / "projects" / value).is_dir()
+    )
+
+
+def _is_bool(value) -> bool:
+    return isinstance(value, bool)
+
+
+def _is_integer(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+# Request fields: name -> (default, check, what the value must be). A
+# field sent as null takes its default; unknown fields are rejected.
+REQUEST_FIELDS = {
+    "document": (None, _is_text, "a path to a .docx file"),
+    "project": (None, _is_project, "the name of a folder under projects/"),  # default: the server's --project
+    "mode": ("light", lambda v: v in MODES, f"one of {', '.join(MODES)}"),
+    "audience": (None, _is_text, "an audience profile ID"),
+    "lang": ("auto", lambda v: v in LANGUAGES, f"one of {', '.join(LANGUAGES)}"),
+    "all_occurrences": (False, _is_bool, "true or false"),
+    "paragraph_cache": (True, _is_bool, "true or false"),
+    "run_state": (None, _is_text, "a path"),  # default: default_state_path(document)
+}
+OPERATION_FIELDS = {
+    "analyze": {},
+    "export-heuristic": {
+        "heuristic_budget": (None, lambda v: _is_integer(v) and v >= 1, "an integer of at least 1"),
+        "heuristic_min_score": (None, lambda v: _is_number(v) and v >= 0, "a number of at least 0"),
+        "output": (None, _is_text, "a path"),
+        "format": (2, lambda v: _is_integer(v) and v in (1, 2), "1 or 2"),
+    },
+    "apply-heuristic": {
+        "results": (None, lambda v: isinstance(v, (list, dict)), "a heuristic results object or list"),
+        "results_path": (None, _is_text, "a path"),
+    },
+    "write": {
+        "output": (None, _is_text, "a path"),
+        "output_dir": (None, _is_text, "a path"),
+        "author": ("FPR Editorial Agent", _is_text, "a non-empty string"),
+        "no_changelog": (False, _is_bool, "true or false"),
+    },
+}
+# Fields resolved against the document's folder and kept inside the allowed roots
+PATH_FIELDS = ("run_state", "output", "output_dir", "results_path")
+
+
+class RequestError(Exception):
+    """A request the server cannot serve; reported with its HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_request(operation: str, body: dict) -> dict:
+    """Check a request's fields against REQUEST_FIELDS and the operation's; return them with defaults filled in."""
+    fields = {**REQUEST_FIELDS, **OPERATION_FIELDS[operation]}
+    unknown = sorted(set(body) - set(fields))
+    if unknown:
+        raise RequestError(f"Unknown field for {operation}: {', '.join(unknown)}")
+    request = {}
+    for name, (default, check, expected) in fields.items():
+        value = body.get(name)
+        if value is None:
+            request[name] = default
+        elif check(value):
+            request[name] = value
+        else:
+            raise RequestError(f"{name} must be {expected}")
+    if request["document"] is None:
+        raise RequestError("document is required")
+    return request
+
+
+def _check_results(read: Callable[[], list[dict]], name: str) -> list[dict]:
+    """Return read()'s heuristic result records, checked like evaluator responses; a RequestError if invalid."""
+    try:
+        records = read()
+        for r in records:
+            index = r["paragraph_index"]
+            if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+                raise ValueError(f'"paragraph_index" must be a non-negative integer, got {index!r}')
+            r["suggestions"] = [check_suggestion(s) for s in r["suggestions"]]
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise RequestError(f"{name} are not valid heuristic results: {e}") from e
+    return records
+
+
+def make_token() -> str:
+    """The server's bearer token: FPR_SERVER_TOKEN if set, otherwise a new random one."""
+    return os.environ.get("FPR_SERVER_TOKEN") or secrets.token_urlsafe(32)
+
+
+class EditorialServer:
+    """Serves editorial operations on warm knowledge bases with a pool of worker threads."""
+
+    def __init__(self, default_project: str, workers: Optional[int] = None, on_request: Optional[Callable] = None,
+                 output_root: Optional[Path] = None):
+        self.default_project = default_project
+        self.output_root = Path(output_root).resolve() if output_root is not None else None
+        self.kbs = KnowledgeBases()
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fpr-worker")
+        self.on_request = on_request
+        self.started = time.time()
+        self.requests = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._document_locks: dict[Path, threading.Lock] = {}
+        self.operations = {
+            "analyze": self.analyze,
+            "export-heuristic": self.export_heuristic,
+            "apply-heuristic": self.apply_heuristic,
+            "write": self.write,
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def handle(self, operation: str, request: dict) -> tuple[int, dict]:
+        """Run one operation on the worker pool and return (HTTP status, response)."""
+        started = time.perf_counter()
+        status, response = self.pool.submit(self._run, operation, request).result()
+        with self._lock:
+            self.requests += 1
+            if status != 200:
+                self.failed += 1
+        if self.on_request is not None:
+            self.on_request(operation, request, status, response, time.perf_counter() - started)
+        return status, response
+
+    def _run(self, operation: str, request: dict) -> tuple[int, dict]:
+        try:
+            return 200, self.operations[operation](parse_request(operation, request))
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except FileNotFoundError as e:
+            return 404, {"error": str(e)}
+        except InvalidRuleError as e:
+            return 500, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def status(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "requests": self.requests,
+            "failed": self.failed,
+            "kb_reloads": self.kbs.reloads,
+            "projects": self.kbs.status(),
+        }
+
+    def _document_lock(self, doc_path: Path) -> threading.Lock:
+        with self._lock:
+            return self._document_locks.setdefault(doc_path.resolve(), threading.Lock())
+
+    def _document(self, request: dict) -> Path:
+        doc_path = Path(request["document"])
+        if doc_path.suffix.lower() != ".docx":
+            raise RequestError("document must be a .docx file")
+        if not doc_path.is_file():
+            raise RequestError(f"Document not found: {doc_path}", 404)
+        return doc_path
+
+    def _paths(self, request: dict, doc_path: Path) -> dict[str, Path]:
+        """Resolve the request's PATH_FIELDS against the document's folder.
+
+        Each must stay inside that folder or output_root (symlinks resolved).
+        """
+        roots = [doc_path.parent.resolve()] + ([self.output_root] if self.output_root else [])
+        paths = {}
+        for name in PATH_FIELDS:
+            if request.get(name) is None:
+                continue
+            path = (doc_path.parent / request[name]).resolve()
+            if not any(path.is_relative_to(root) for root in roots):
+                allowed = " or ".join(str(root) for root in roots)
+                raise RequestError(f"{name} must be inside {allowed}", 403)
+            paths[name] = path
+        return paths
+
+    def _open(self, request: dict, doc_path: Path, paths: dict[str, Path]):
+        """Return the session (settings, engine, state path) for a request, with its document locked."""
+        settings = {**request, "project": request["project"] or self.default_project}
+        kb = self.kbs.get(settings["project"])
+        cache = None
+        if settings["paragraph_cache"]:
+            cache = ParagraphCache.for_run(kb, settings["mode"], settings["audience"], settings["lang"])
+        engine = RuleEngine(
+            kb=kb,
+            mode=settings["mode"],
+            audience_id=settings["audience"],
+            language=settings["lang"],
+            parallel_parts=False,  # the worker pool already keeps every core busy
+            cache=cache,
+            all_occurrences=settings["all_occurrences"],
+        )
+        state_path = paths.get("run_state") or default_state_path(doc_path)
+        return _Session(settings, engine, doc_path, state_path, self._document_lock(doc_path))
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def analyze(self, request: dict) -> dict:
+        """Deterministic suggestions (plus heuristic ones evaluated so far) and heuristic progress."""
+        doc_path = self._document(request)
+        with self._open(request, doc_path, self._paths(request, doc_path)) as session:
+            result, state, resumed = session.load()
+            state.save(session.state_path)
+            return {
+                **session.describe(result, resumed),
+                "heuristic": state.counts(),
+                "suggestions": [asdict(s) for s in result.high_confidence + result.low_confidence],
+            }
+
+    def export_heuristic(self, request: dict) -> dict:
+        """Pending heuristic tasks after the pre-filter; written to "output" if given, inline otherwise."""
+        budget, min_score = request["heuristic_budget"], request["heuristic_min_score"]
+        doc_path = self._document(request)
+        paths = self._paths(request, doc_path)
+        with self._open(request, doc_path, paths) as session:
+            if min_score is None and session.engine.mode == "light":
+                min_score = LIGHT_MIN_SCORE
+            _, state, _ = session.load()
+            selected, below = session.engine.select_heuristic_tasks(state.open_tasks(), budget, min_score)
+            state.skip(below)
+            state.save(session.state_path)
+            header = heuristic_header(session.engine, session.doc_path)
+            response = {"document": str(session.doc_path), **state.counts(), "selected": len(selected)}
+            if "output" in paths:
+                export_heuristic_tasks(selected, paths["output"], header, request["format"])
+                response["path"] = str(paths["output"])
+            else:
+                response["tasks"] = tasks_document(header, selected)
+            return response
+
+    def apply_heuristic(self, request: dict) -> dict:
+        """Merge heuristic results ("results" inline, or a "results_path" file) into the run state."""
+        doc_path = self._document(request)
+        paths = self._paths(request, doc_path)
+        if request["results"] is not None:
+            records = _check_results(lambda: parse_results(request["results"], "request"), "results")
+        elif "results_path" in paths:
+            records = _check_results(lambda: read_results(paths["results_path"]), "results_path")
+        else:
+            raise RequestError("results or results_path is required")
+        with self._open(request, doc_path, paths) as session:
+            result, state, resumed = session.load(add_done=False)
+            records, stale = split_stale(session.engine, session.package, state, records)
+            merge_heuristic(session.engine, session.package, result, state, records, session.state_path)
+            return {
+                **session.describe(result, resumed),
+                "applied": len(records),
+                "stale": len(stale),
+                "heuristic": state.counts(),
+            }
+
+    def write(self, request: dict) -> dict:
+        """Write the edited document (flags only in audit mode), changelog and flags."""
+        doc_path = self._document(request)
+        paths = self._paths(request, doc_path)
+        with self._open(request, doc_path, paths) as session:
+            result, state, resumed = session.load()
+            state.save(session.state_path)
+            outputs = output_paths(session.doc_path, paths.get("output_dir"))
+            if "output" in paths:
+                outputs["output"] = paths["output"]
+            options = {
+                "mode": session.engine.mode,
+                "project": session.settings["project"],
+                "author": request["author"],
+                "no_changelog": request["no_changelog"],
+            }
+            written, stats = write_outputs(session.package, session.doc_path, result, outputs, options)
+            return {**session.describe(result, resumed), "outputs": written, **stats}
+
+
+class _Session:
+    """One request's engine and open document, holding the document's lock."""
+
+    def __init__(self, settings: dict, engine: RuleEngine, doc_path: Path, state_path: Path, lock: threading.Lock):
+        self.settings = settings
+        self.engine = engine
+        self.doc_path = doc_path
+        self.state_path = state_path
+        self._lock = lock
+        self.package: Optional[DocxPackage] = None
+
+    def __enter__(self) -> "_Session":
+        self._lock.acquire()
+        try:
+            self.package = DocxPackage(self.doc_path).__enter__()
+        except BaseException:
+            self._close()
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            self.package.__exit__(*exc)
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        if self.engine.cache is not None:
+            self.engine.cache.close()
+        self._lock.release()
+
+    def load(self, add_done: bool = True):
+        """Return (result, state, resumed); result includes the heuristic suggestions evaluated so far."""
+        result, state, resumed = load_state(self.engine, self.package, self.doc_path, self.state_path)
+        done = state.done_suggestions()
+        if add_done and done:
+            self.engine.add_heuristic_suggestions(result, done, self.package)
+        return result, state, resumed
+
+    def describe(self, result, resumed: bool) -> dict:
+        return {
+            "document": str(self.doc_path),
+            "project": self.settings["project"],
+            "mode": self.engine.mode,
+            "resumed": resumed,
+            "high_confidence": len(result.high_confidence),
+            "low_confidence": len(result.low_confidence),
+            "skipped": len(result.skipped),
+        }
+
+
+# ----------------------------------------------------------------------
+# HTTP transport
+# ----------------------------------------------------------------------
+
+
+def _host_name(host: str) -> str:
+    """The name part of a Host header ("localhost:8765" -> "localhost")."""
+    name, _, port = host.strip().rpartition(":")
+    return (name if name and port.isdigit() else host.strip()).lower()
+
+
+def _make_handler(app: EditorialServer, token: str):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "FPREditorialAgent"
+        protocol_version = "HTTP/1.1"  # keep-alive between requests of one client
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.rstrip("/") != "/status":
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+                return
+            self._send(200, app.status())
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            operation = self.path.strip("/")
+            if operation not in app.operations:
+                self._refuse(404, f"Unknown operation: {operation}")
+                return
+            if self.headers.get_content_type() != "application/json":
+                self._refuse(415, "Content-Type must be application/json")
+                return
+            length = self.headers.get("Content-Length", "")
+            if not length.isdigit():
+                self._refuse(411, "Content-Length is required")
+                return
+            if int(length) > MAX_BODY_BYTES:
+                self._refuse(413, f"Request body is larger than {MAX_BODY_BYTES >> 20} MiB")
+                return
+            body = self.rfile.read(int(length))
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError as e:
+                self._send(400, {"error": f"Request body is not valid JSON: {e}"})
+                return
+            if not isinstance(request, dict):
+                self._send(400, {"error": "Request body must be a JSON object"})
+                return
+            self._send(*app.handle(operation, request))
+
+        def _authorized(self) -> bool:
+            # A page in a browser can send requests here (DNS rebinding) but
+            # not with a localhost Host header or the token
+            if _host_name(self.headers.get("Host", "")) not in ALLOWED_HOSTS:
+                self._refuse(403, f"Host must be one of {', '.join(ALLOWED_HOSTS)}")
+                return False
+            supplied = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+                self._refuse(401, "Missing or invalid bearer token")
+                return False
+            return True
+
+        def _refuse(self, status: int, error: str) -> None:
+            # The body was not read, so the connection cannot be reused
+            self.close_connection = True
+            self._send(status, {"error": error})
+
+        def _send(self, status: int, response: dict) -> None:
+            body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # requests are reported through EditorialServer.on_request
+
+    return Handler
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(app: EditorialServer, token: str, port: int = DEFAULT_PORT, socket_path: Optional[Path] = None,
+          on_ready: Optional[Callable[[str], None]] = None) -> None:
+    """Serve app on 127.0.0.1:port, or on a Unix socket, until interrupted.
+
+    Every request must send token as a bearer token (see make_token()).
+    The Unix socket is created readable and writable by its owner only.
+    """
+    handler = _make_handler(app, token)
+    if socket_path is not None:
+        if socket_path.exists() and socket_path.is_socket():
+            socket_path.unlink()  # left behind by a server that did not shut down
+        umask = os.umask(0o177)
+        try:
+            httpd = _UnixHTTPServer(str(socket_path), handler)
+        finally:
+            os.umask(umask)
+        address = f"unix:{socket_path}"
+    else:
+        httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        address = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    if threading.current_thread() is threading.main_thread():
+        # Stop on SIGTERM as on Ctrl+C, so the socket and pool are cleaned up
+        signal.signal(signal.SIGTERM, _interrupt)
+    if on_ready is not None:
+        on_ready(address)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        app.pool.shutdown(wait=True)
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
@@ -0,0 +1,288 @@
+"""
+Watch mode for the FPR Editorial Agent.
+
+Editors keep a draft open and save it repeatedly while they fix flagged
+issues. --watch polls a document (or a folder / glob of documents) and
+re-analyzes each one when it is saved, refreshing its flags and changelog.
+
+Work per save is proportional to what changed. Each document keeps a
+ParagraphSnapshot: the previous save's deterministic results keyed by
+paragraph hash, plugged into the engine in place of the paragraph cache.
+Paragraphs whose hash is in the snapshot reuse their results. Only new or
+edited paragraphs are matched again. First-reference (context_aware)
+resolution still runs over the whole document, so results are the same
+as a full run.
+
+The knowledge base stays loaded between saves and is reloaded (clearing
+every snapshot) when one of its YAML files is modified. Polling uses
+modification times and sizes only, with no OS-specific notification API.
+"""
+
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.batch import collect_documents, output_paths
+from src.docx_package import DocxPackage
+from src.heuristic_io import paragraph_hash
+from src.knowledge_base import KnowledgeBases
+from src.matcher import InvalidRuleError
+from src.paragraph_cache import ParagraphCache
+from src.reports import write_changelog, write_flags
+from src.rule_engine import RuleEngine
+
+DEFAULT_INTERVAL = 0.5
+
+
+class ParagraphSnapshot:
+    """One document's per-paragraph results from its previous save, keyed by paragraph hash.
+
+    Used as the engine's cache. Entries not looked up during a round are
+    dropped when it ends, so the snapshot always describes the last
+    version analyzed. With a store (the persistent ParagraphCache),
+    paragraphs missing from the snapshot are looked up there before being
+    matched, and new results are written through to it.
+    """
+
+    enabled = True
+
+    def __init__(self, store: Optional[ParagraphCache] = None):
+        self.store = store if store is not None and store.enabled else None
+        self.hits: Counter = Counter()  # paragraphs unchanged since the previous round
+        self.misses: Counter = Counter()  # paragraphs new or edited since the previous round
+        self.removed: Counter = Counter()  # distinct paragraph texts gone since the previous round
+        self._previous: dict[tuple, object] = {}
+        self._current: dict[tuple, object] = {}
+
+    def get(self, kind: str, text: str, detail: str = ""):
+        key = (kind, detail, paragraph_hash(text))
+        value = self._current.get(key)
+        if value is None:
+            value = self._previous.get(key)
+            if value is not None:
+                self.hits[kind] += 1
+            else:
+                self.misses[kind] += 1
+                if self.store is not None:
+                    value = self.store.get(kind, text, detail)
+            if value is not None:
+                self._current[key] = value
+        else:
+            self.hits[kind] += 1  # repeated text within the document
+        return value
+
+    def put(self, kind: str, text: str, value, detail: str = "") -> None:
+        self._current[(kind, detail, paragraph_hash(text))] = value
+        if self.store is not None:
+            self.store.put(kind, text, value, detail)
+
+    def flush(self) -> None:
+        if self.store is not None:
+            self.store.flush()
+
+    def record(self, hits: dict, misses: dict) -> None:
+        self.hits.update(hits)
+        self.misses.update(misses)
+
+    def start_round(self) -> None:
+        self.hits.clear()
+        self.misses.clear()
+        self._current = {}
+
+    def end_round(self) -> None:
+        """Make this round's results the snapshot for the next one."""
+        self.removed = Counter(key[0] for key in self._previous if key not in self._current)
+        self._previous = self._current
+        self._current = {}
+        self.flush()
+
+    def abandon_round(self) -> None:
+        """Keep the previous snapshot after a round that failed."""
+        self._current = {}
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+
+def report_paths(doc_path: Path, output_dir: Optional[Path]) -> dict:
+    """Return the changelog and flags paths: as the CLI writes them, or batch-named in output_dir."""
+    if output_dir is not None:
+        paths = output_paths(doc_path, output_dir)
+        return {"changelog": paths["changelog"], "flags": paths["flags"]}
+    folder = Path(tempfile.gettempdir()) / "FPRStyleAI" / f"{doc_path.stem}_{date.today().isoformat()}"
+    return {"changelog": folder / "changelog.md", "flags": folder / "flags.md"}
+
+
+class Watcher:
+    """Polls documents and refreshes their flags and changelog when they are saved."""
+
+    def __init__(
+        self,
+        target: str,
+        project: str,
+        mode: str,
+        audience: Optional[str] = None,
+        lang: str = "auto",
+        all_occurrences: bool = False,
+        paragraph_cache: bool = True,
+        output_dir: Optional[Path] = None,
+        no_changelog: bool = False,
+        on_round: Optional[Callable[[dict], None]] = None,
+    ):
+        self.target = target
+        self.project = project
+        self.mode = mode
+        self.audience = audience
+        self.lang = lang
+        self.all_occurrences = all_occurrences
+        self.paragraph_cache = paragraph_cache
+        self.output_dir = output_dir
+        self.no_changelog = no_changelog
+        self.on_round = on_round
+        self.kbs = KnowledgeBases()
+        self.kb = self.kbs.get(project)
+        self.engine = self._engine()
+        self._signatures: dict[Path, tuple[int, int]] = {}
+        self._snapshots: dict[Path, ParagraphSnapshot] = {}
+        self._errors: dict[str, str] = {}  # last error reported per source, "kb" or "documents"
+
+    def _engine(self) -> RuleEngine:
+        return RuleEngine(
+            kb=self.kb,
+            mode=self.mode,
+            audience_id=self.audience,
+            language=self.lang,
+            parallel_parts=False,  # documents are re-analyzed from the snapshot in one process
+            all_occurrences=self.all_occurrences,
+        )
+
+    def documents(self) -> list[Path]:
+        path = Path(self.target)
+        if path.is_file():
+            return [path]
+        return collect_documents(self.target)
+
+    def poll(self) -> list[dict]:
+        """Re-analyze every document saved since the last poll; return one record per document."""
+        try:
+            kb = self.kbs.get(self.project)
+            self._errors.pop("kb", None)
+        except (FileNotFoundError, InvalidRuleError) as e:
+            # Usually a YAML edit in progress: keep the last valid rules
+            kb = self.kb
+            self._report("kb", f"knowledge base not reloaded: {e}")
+        except Exception as e:
+            # Invalid YAML (yaml.YAMLError) or a file that cannot be read
+            kb = self.kb
+            self._report("kb", f"knowledge base not reloaded: {type(e).__name__}: {e}")
+        if kb is not self.kb:
+            # Rules changed: every result in the snapshots is out of date
+            self.kb = kb
+            self.engine = self._engine()
+            for snapshot in self._snapshots.values():
+                snapshot.close()
+            self._snapshots.clear()
+            self._signatures.clear()
+
+        records = []
+        try:
+            documents = self.documents()
+            self._errors.pop("documents", None)
+        except OSError as e:
+            # A folder on a share that went away, for example: keep every
+            # snapshot and list again on the next poll
+            self._report("documents", f"documents not listed: {type(e).__name__}: {e}")
+            return records
+        for doc_path in documents:
+            try:
+                stat = doc_path.stat()
+            except OSError:
+                continue  # removed between listing and stat
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._signatures.get(doc_path) == signature:
+                continue
+            record = self.analyze(doc_path, first=doc_path not in self._signatures)
+            # A failed read (usually a save still in progress) is retried
+            # once the file changes again
+            self._signatures[doc_path] = signature
+            records.append(record)
+            if self.on_round is not None:
+                self.on_round(record)
+
+        for gone in set(self._snapshots) - set(documents):
+            self._snapshots.pop(gone).close()
+            self._signatures.pop(gone, None)
+        return records
+
+    def _report(self, source: str, error: str) -> None:
+        """Report an error of the knowledge base or document listing once, until it changes or clears."""
+        if self._errors.get(source) == error:
+            return
+        self._errors[source] = error
+        if self.on_round is not None:
+            self.on_round({"document": self.target, "status": "failed", "first": False, "error": error})
+
+    def analyze(self, doc_path: Path, first: bool = False) -> dict:
+        """Analyze one document against its snapshot and rewrite its flags and changelog."""
+        started = time.perf_counter()
+        snapshot = self._snapshots.get(doc_path)
+        if snapshot is None:
+            store = None
+            if self.paragraph_cache:
+                store = ParagraphCache.for_run(self.kb, self.mode, self.audience, self.lang)
+            snapshot = self._snapshots[doc_path] = ParagraphSnapshot(store)
+
+        record = {"document": str(doc_path), "status": "ok", "error": None, "first": first}
+        snapshot.start_round()
+        self.engine.cache = snapshot
+        try:
+            with DocxPackage(doc_path) as package:
+                result = self.engine.run(package)
+        except Exception as e:
+            snapshot.abandon_round()
+            record.update(status="failed", error=f"{type(e).__name__}: {e}")
+            return record
+        finally:
+            self.engine.cache = None
+        snapshot.end_round()
+
+        paths = report_paths(doc_path, self.output_dir)
+        outputs = {"flags": str(paths["flags"])}
+        try:
+            paths["flags"].parent.mkdir(parents=True, exist_ok=True)
+            # Rewritten even when empty, so flags fixed since the last save disappear
+            write_flags(paths["flags"], result)
+            if not self.no_changelog:
+                write_changelog(paths["changelog"], result, doc_path.name, self.project, self.mode)
+                outputs["changelog"] = str(paths["changelog"])
+        except OSError as e:
+            record.update(status="failed", error=f"reports not written: {type(e).__name__}: {e}")
+            return record
+
+        kind = "deterministic_all" if self.all_occurrences else "deterministic"
+        record.update(
+            paragraphs=snapshot.hits[kind] + snapshot.misses[kind],
+            changed=snapshot.misses[kind],
+            removed=snapshot.removed[kind],
+            high_confidence=len(result.high_confidence),
+            low_confidence=len(result.low_confidence),
+            outputs=outputs,
+            seconds=round(time.perf_counter() - started, 3),
+        )
+        return record
+
+    def run(self, interval: float = DEFAULT_INTERVAL) -> None:
+        """Poll until interrupted. Errors are reported through on_round and polling goes on."""
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for snapshot in self._snapshots.values():
+                snapshot.close()
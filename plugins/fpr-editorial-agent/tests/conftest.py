@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Plugin root on sys.path (src.*), as the scripts do
+PLUGIN_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+# benchmarks/ for docgen, the synthetic document generator
+sys.path.insert(0, str(PLUGIN_ROOT / "benchmarks"))
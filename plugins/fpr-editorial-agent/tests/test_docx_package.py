@@ -0,0 +1,86 @@
+"""
+Tests for DocxPackage.save(): untouched parts are copied in their
+original compressed form, whatever the source zip's local headers look
+like (data descriptors, ZIP64 extra fields), and the result is a valid
+zip holding the same bytes.
+"""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from docgen import DocSpec, build_docx
+from src.docx_package import DOCUMENT_PART, DocxPackage
+from src.rule_engine import WORD_NS
+
+MEDIA = os.urandom(50_000)
+
+
+class _Unseekable(io.RawIOBase):
+    """A write-only stream: zipfile then writes a data descriptor after every member."""
+
+    def __init__(self, buffer: io.BytesIO):
+        self.buffer = buffer
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.buffer.write(data)
+
+
+def repack(source, target, streamed: bool, zip64: bool) -> None:
+    """Rewrite source with extra media parts, streamed (data descriptors) and/or with ZIP64 headers."""
+    with zipfile.ZipFile(source) as zf:
+        parts = [(info, zf.read(info)) for info in zf.infolist()]
+    parts += [
+        (zipfile.ZipInfo("word/media/image1.png", (2024, 1, 1, 0, 0, 0)), MEDIA),
+        (zipfile.ZipInfo("word/media/notes.txt", (2024, 1, 1, 0, 0, 0)), b"notes " * 5000),
+    ]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(_Unseekable(buffer) if streamed else buffer, "w") as out:
+        for info, data in parts:
+            info.compress_type = zipfile.ZIP_STORED if info.filename.endswith(".png") else zipfile.ZIP_DEFLATED
+            with out.open(info, "w", force_zip64=zip64) as member:
+                member.write(data)
+    target.write_bytes(buffer.getvalue())
+
+
+@pytest.mark.parametrize("streamed, zip64", [(False, False), (True, False), (False, True), (True, True)],
+                         ids=["plain", "data-descriptor", "zip64", "data-descriptor-zip64"])
+def test_save_copies_untouched_parts(tmp_path, streamed, zip64):
+    generated = tmp_path / "generated.docx"
+    build_docx(generated, DocSpec(paragraphs=30))
+    source = tmp_path / "source.docx"
+    repack(generated, source, streamed, zip64)
+    with zipfile.ZipFile(source) as zf:
+        assert all(bool(info.flag_bits & 0x08) == streamed for info in zf.infolist())
+
+    with DocxPackage(source) as package:
+        text = package.xml(DOCUMENT_PART).find(f".//{{{WORD_NS}}}t")
+        text.text = "Edited"
+        package.mark_modified(DOCUMENT_PART)
+        package.save(tmp_path / "saved.docx")
+        untouched = len(package.names()) - 1
+        assert package.counters["parts_rewritten"] == 1
+        assert package.counters["parts_copied_raw"] == untouched
+
+    with zipfile.ZipFile(source) as original, zipfile.ZipFile(tmp_path / "saved.docx") as saved:
+        assert saved.testzip() is None
+        assert saved.namelist() == original.namelist()
+        for info in original.infolist():
+            if info.filename == DOCUMENT_PART:
+                assert b"Edited" in saved.read(DOCUMENT_PART)
+                continue
+            copy = saved.getinfo(info.filename)
+            assert saved.read(copy) == original.read(info)
+            assert (copy.compress_type, copy.compress_size, copy.CRC) == (
+                info.compress_type, info.compress_size, info.CRC)
+            assert not copy.flag_bits & 0x08
+
+    # The saved package opens and saves again unchanged
+    with DocxPackage(tmp_path / "saved.docx") as package:
+        package.save(tmp_path / "again.docx")
+    assert (tmp_path / "again.docx").read_bytes() == (tmp_path / "saved.docx").read_bytes()
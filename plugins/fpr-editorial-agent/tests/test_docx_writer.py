@@ -0,0 +1,263 @@
+"""
+Tests for DocxWriter on small hand-built documents: suggestions applied
+at engine offsets in one right-to-left sweep per paragraph, and the
+spans it must refuse to edit. Comments are gathered and written to
+comments.xml once per apply().
+"""
+
+import zipfile
+
+from src.docx_package import COMMENTS_PART, CONTENT_TYPES_PART, DOCUMENT_PART, DOCUMENT_RELS_PART, DocxPackage
+from src.docx_writer import COMMENTS_REL_TYPE, CONTENT_TYPES_NS, PKG_REL_NS, W, WORD_NS, DocxWriter
+from src.rule_engine import EngineResult, Suggestion
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"></Relationships>'
+)
+
+TEXT = "the program supports the municipal planning office"
+
+
+def runs(*texts: str) -> str:
+    return "".join(f'<w:r><w:t xml:space="preserve">{t}</w:t></w:r>' for t in texts)
+
+
+def make_docx(path, paragraphs: list[str], extra_parts: dict = None):
+    """Write a minimal .docx whose body holds the given <w:p> contents."""
+    body = "".join(f"<w:p>{p}</w:p>" for p in paragraphs)
+    parts = {
+        "[Content_Types].xml": CONTENT_TYPES,
+        "_rels/.rels": PACKAGE_RELS,
+        "word/_rels/document.xml.rels": DOCUMENT_RELS,
+        DOCUMENT_PART: (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:document xmlns:w="{WORD_NS}"><w:body>{body}</w:body></w:document>'
+        ),
+        **(extra_parts or {}),
+    }
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    return path
+
+
+def suggestion(original: str, replacement: str, p_idx: int = 0, start: int = None, confidence: float = 1.0,
+               rationale: str = "Term bank substitution") -> Suggestion:
+    if start is None:
+        start = TEXT.index(original)
+    return Suggestion(original, replacement, "TB-001", confidence, rationale, p_idx, "deterministic", start)
+
+
+def apply(path, high=(), low=()) -> tuple[dict, DocxPackage, DocxWriter]:
+    package = DocxPackage(path)
+    writer = DocxWriter(package, path)
+    stats = writer.apply(EngineResult(high_confidence=list(high), low_confidence=list(low)))
+    return stats, package, writer
+
+
+def accepted_text(para) -> str:
+    """The paragraph as it reads with every change accepted."""
+    return "".join(t.text or "" for t in para.iter(f"{W}t"))
+
+
+def rejected_text(para) -> str:
+    """The paragraph as it reads with every change rejected."""
+    return "".join(
+        t.text or ""
+        for t in para.iter(f"{W}t", f"{W}delText")
+        if t.tag == f"{W}delText" or not any(a.tag == f"{W}ins" for a in t.iterancestors())
+    )
+
+
+def paragraph(package: DocxPackage, p_idx: int = 0):
+    return package.xml(DOCUMENT_PART).getroot().findall(f".//{W}p")[p_idx]
+
+
+# ----------------------------------------------------------------------
+# Right-to-left sweep
+# ----------------------------------------------------------------------
+
+
+def test_several_suggestions_in_one_paragraph(tmp_path):
+    """Applied from the right, so every offset still points at its original text."""
+    path = make_docx(tmp_path / "doc.docx", [runs("the prog", "ram supports the mun", "icipal planning office")])
+    high = [
+        suggestion("program", "programme"),
+        suggestion("the", "The"),
+        suggestion("municipal", "city"),
+        suggestion("office", "bureau"),
+    ]
+    stats, package, _ = apply(path, high)
+    assert stats == {"track_changes_applied": 4, "comments_applied": 4, "failed": 0, "overlapping": 0}
+
+    para = paragraph(package)
+    assert accepted_text(para) == "The programme supports the city planning bureau"
+    assert rejected_text(para) == TEXT
+    deleted = [t.text for t in para.iter(f"{W}delText")]
+    assert deleted == ["the", "program", "municipal", "office"]
+
+    ids = [int(e.get(f"{W}id")) for e in para.iter(f"{W}ins", f"{W}del")]
+    assert len(set(ids)) == len(ids) == 8
+
+    package.save(tmp_path / "out.docx")
+    with DocxPackage(tmp_path / "out.docx") as saved:
+        assert accepted_text(paragraph(saved)) == "The programme supports the city planning bureau"
+
+
+def test_overlapping_suggestions_apply_once(tmp_path):
+    path = make_docx(tmp_path / "doc.docx", [runs(TEXT)])
+    high = [
+        suggestion("municipal planning", "city planning"),
+        suggestion("planning office", "planning bureau"),
+    ]
+    stats, package, _ = apply(path, high)
+    # The right-hand one is applied first; the other overlaps it
+    assert stats["track_changes_applied"] == 1 and stats["overlapping"] == 1 and stats["failed"] == 0
+    para = paragraph(package)
+    assert accepted_text(para) == "the program supports the municipal planning bureau"
+    assert rejected_text(para) == TEXT
+
+
+# ----------------------------------------------------------------------
+# Rejected spans
+# ----------------------------------------------------------------------
+
+
+def test_offset_mismatch_is_rejected(tmp_path):
+    """A suggestion whose offsets no longer hold its text is never searched for elsewhere."""
+    path = make_docx(tmp_path / "doc.docx", [runs(TEXT)])
+    high = [suggestion("program", "programme", start=TEXT.index("program") + 1)]
+    low = [suggestion("municipal", "city", start=0, confidence=0.7)]
+    stats, package, writer = apply(path, high, low)
+    assert stats == {"track_changes_applied": 0, "comments_applied": 0, "failed": 2, "overlapping": 0}
+    assert writer.counters["offset_mismatches"] == 2
+    para = paragraph(package)
+    assert accepted_text(para) == TEXT and para.find(f".//{W}del") is None
+    assert para.find(f".//{W}commentRangeStart") is None
+    assert not package.is_modified(DOCUMENT_PART)
+
+
+def test_span_inside_tracked_change_is_rejected(tmp_path):
+    """Text inside an existing w:ins is part of the offsets but is never edited again."""
+    inserted = (
+        '<w:ins w:id="7" w:author="Editor" w:date="2024-01-01T00:00:00Z">'
+        f"{runs('municipal ')}</w:ins>"
+    )
+    path = make_docx(tmp_path / "doc.docx", [runs("the program supports the ") + inserted + runs("planning office")])
+    high = [
+        suggestion("municipal planning", "city planning"),  # ends in a plain run
+        suggestion("program", "programme"),
+    ]
+    stats, package, _ = apply(path, high)
+    assert stats["track_changes_applied"] == 1 and stats["failed"] == 1
+
+    para = paragraph(package)
+    assert accepted_text(para) == "the programme supports the municipal planning office"
+    assert [t.text for t in para.iter(f"{W}delText")] == ["program"]
+    # New change IDs do not reuse the existing one
+    ids = [int(e.get(f"{W}id")) for e in para.iter(f"{W}ins", f"{W}del")]
+    assert sorted(ids)[0] == 7 and len(set(ids)) == len(ids)
+
+
+# ----------------------------------------------------------------------
+# Comments
+# ----------------------------------------------------------------------
+
+EXISTING_COMMENTS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:comments xmlns:w="{WORD_NS}">'
+    '<w:comment w:id="5" w:author="Reviewer" w:date="2024-01-01T00:00:00Z" w:initials="R">'
+    "<w:p><w:r><w:t>Check this figure.</w:t></w:r></w:p></w:comment></w:comments>"
+)
+
+
+def comments_setup(package: DocxPackage) -> tuple[list, list, list]:
+    """Return (comment elements, comments relationships, comments content-type overrides)."""
+    comments = package.xml(COMMENTS_PART).getroot().findall(f"{W}comment")
+    rels = [
+        rel for rel in package.xml(DOCUMENT_RELS_PART).getroot().findall(f"{{{PKG_REL_NS}}}Relationship")
+        if rel.get("Type") == COMMENTS_REL_TYPE
+    ]
+    overrides = [
+        o for o in package.xml(CONTENT_TYPES_PART).getroot().findall(f"{{{CONTENT_TYPES_NS}}}Override")
+        if o.get("PartName") == f"/{COMMENTS_PART}"
+    ]
+    return comments, rels, overrides
+
+
+def comment_paragraphs(comment) -> list[str]:
+    return ["".join(t.text for t in p.iter(f"{W}t")) for p in comment.findall(f"{W}p")]
+
+
+def test_comments_part_is_created_once(tmp_path):
+    path = make_docx(tmp_path / "doc.docx", [runs(TEXT)] * 3)
+    low = [suggestion("program", "programme", p_idx=i, confidence=0.7) for i in range(3)]
+    stats, package, writer = apply(path, [suggestion("office", "bureau", p_idx=1)], low)
+    assert stats["comments_applied"] == 4 and stats["failed"] == 0
+
+    # A second round on the same package appends to the same part
+    writer.apply(EngineResult(low_confidence=[suggestion("municipal", "city", p_idx=2, confidence=0.7)]))
+    package.save(tmp_path / "out.docx")
+
+    with DocxPackage(tmp_path / "out.docx") as saved:
+        comments, rels, overrides = comments_setup(saved)
+        assert len(comments) == 5 and len(rels) == 1 and len(overrides) == 1
+        ids = [c.get(f"{W}id") for c in comments]
+        assert ids == sorted(ids, key=int) and len(set(ids)) == 5
+        references = [r.get(f"{W}id") for r in saved.xml(DOCUMENT_PART).getroot().iter(f"{W}commentReference")]
+        assert sorted(references) == sorted(ids)
+
+
+def test_multi_paragraph_comment_body(tmp_path):
+    path = make_docx(tmp_path / "doc.docx", [runs(TEXT)])
+    low = [suggestion("program", "programme", confidence=0.7, rationale="Use British spelling.\nSee the style guide.")]
+    _, package, _ = apply(path, low=low)
+
+    (comment,), _, _ = comments_setup(package)
+    assert comment_paragraphs(comment) == [
+        "Use British spelling.", "See the style guide.", "Suggested: 'programme'", "Confidence: 70%",
+    ]
+    # Word's comment mark opens the first paragraph only
+    assert [len(p.findall(f".//{W}annotationRef")) for p in comment.findall(f"{W}p")] == [1, 0, 0, 0]
+
+
+def test_existing_comments_are_kept(tmp_path):
+    rels = DOCUMENT_RELS.replace(
+        "></Relationships>",
+        f'><Relationship Id="rId9" Type="{COMMENTS_REL_TYPE}" Target="comments.xml"/></Relationships>',
+    )
+    content_types = CONTENT_TYPES.replace(
+        "</Types>",
+        '<Override PartName="/word/comments.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"/></Types>',
+    )
+    path = make_docx(tmp_path / "doc.docx", [runs(TEXT)], {
+        COMMENTS_PART: EXISTING_COMMENTS,
+        "word/_rels/document.xml.rels": rels,
+        "[Content_Types].xml": content_types,
+    })
+    low = [suggestion("program", "programme", confidence=0.7), suggestion("office", "bureau", confidence=0.7)]
+    stats, package, _ = apply(path, low=low)
+    assert stats["comments_applied"] == 2
+    assert not package.is_modified(DOCUMENT_RELS_PART) and not package.is_modified(CONTENT_TYPES_PART)
+
+    comments, rels, overrides = comments_setup(package)
+    assert len(rels) == 1 and len(overrides) == 1
+    assert comment_paragraphs(comments[0]) == ["Check this figure."]
+    assert [int(c.get(f"{W}id")) for c in comments] == [5, 6, 7]
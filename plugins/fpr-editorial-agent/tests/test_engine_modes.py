@@ -0,0 +1,64 @@
+"""
+Equivalence of the engine's execution modes on generated documents.
+
+The in-memory, serial tree pass is the baseline: every other mode must find the
+same deterministic suggestions, in the same order, and export the same
+heuristic tasks. Documents come from benchmarks/docgen.py, with runs
+split mid-word, tables, headings, hyperlinks and footnotes.
+"""
+
+from dataclasses import asdict
+
+import pytest
+
+import src.rule_engine
+from docgen import DocSpec, build_docx
+from src.docx_package import DocxPackage
+from src.knowledge_base import KnowledgeBase
+from src.rule_engine import RuleEngine
+
+# Mode name -> RuleEngine options
+MODES = {
+    "stream": {"streaming": True},
+    "jobs3": {"jobs": 3},
+    "stream-jobs3": {"streaming": True, "jobs": 3},
+}
+
+
+@pytest.fixture(scope="module", params=["ERSV", "WCRP"])
+def document(request, tmp_path_factory):
+    project = request.param
+    kb = KnowledgeBase(project)
+    path = tmp_path_factory.mktemp("docs") / f"{project}.docx"
+    build_docx(path, DocSpec(paragraphs=600, project=project, seed=7), kb)
+    return kb, path
+
+
+def outputs(kb: KnowledgeBase, path, all_occurrences: bool, **options) -> tuple[dict, list[dict]]:
+    """Run the deterministic pass and heuristic extraction; return (suggestions by class, tasks)."""
+    engine = RuleEngine(kb=kb, mode="deep", all_occurrences=all_occurrences, **options)
+    with DocxPackage(path) as package:
+        if engine.streaming:
+            result, tasks = engine.run_streaming(package, extract_heuristic=True)
+        else:
+            result = engine.run(package)
+            tasks = engine.extract_heuristic_tasks(package)
+    suggestions = {
+        name: [asdict(s) for s in getattr(result, name)]
+        for name in ("high_confidence", "low_confidence", "skipped")
+    }
+    return suggestions, tasks
+
+
+@pytest.mark.parametrize("all_occurrences", [False, True], ids=["first", "all"])
+@pytest.mark.parametrize("mode", list(MODES))
+def test_mode_matches_tree_pass(document, mode, all_occurrences, monkeypatch):
+    kb, path = document
+    # Small shards, so that --jobs keeps several chunks per worker in flight
+    monkeypatch.setattr(src.rule_engine, "SHARD_PARAGRAPHS", 32)
+    expected_suggestions, expected_tasks = outputs(kb, path, all_occurrences)
+    assert sum(map(len, expected_suggestions.values())) > 50 and len(expected_tasks) > 50
+
+    suggestions, tasks = outputs(kb, path, all_occurrences, **MODES[mode])
+    assert suggestions == expected_suggestions
+    assert tasks == expected_tasks
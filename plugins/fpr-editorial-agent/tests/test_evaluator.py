@@ -0,0 +1,253 @@
+"""
+Tests for the heuristic evaluation driver (--evaluate): the built-in stub
+backend, and the HTTP backend against a local stand-in server that fails
+some requests on purpose.
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.evaluator import (
+    EvaluationError,
+    EvaluationSettings,
+    HttpBackend,
+    StubBackend,
+    evaluate_tasks,
+    parse_response,
+    split_batch_response,
+)
+from src.heuristic_io import paragraph_hash
+from src.knowledge_base import KnowledgeBase
+from src.rule_engine import RuleEngine
+
+TEXTS = [
+    "The program supports supports municipal planning across the island.",
+    "La comunidad participa en el proceso de de recuperación con datos del censo.",
+    "Housing and infrastructure data inform the recovery process.",
+    "The the census data on housing is published every year by the agency.",
+    "El programa apoya los esfuerzos de planificación municipal en toda la isla.",
+]
+# Answered well by the stand-in server below
+MORE_TEXTS = [
+    "The recovery plan plan covers housing, roads and water systems.",
+    "Los datos del censo se publican cada año.",
+]
+
+
+def make_tasks(texts=TEXTS) -> list[dict]:
+    return [
+        {"paragraph_index": i * 2, "text": text, "language": "es" if text.startswith(("La", "El")) else "en",
+         "hash": paragraph_hash(text)}
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture(scope="module")
+def header() -> dict:
+    return RuleEngine(kb=KnowledgeBase("ERSV"), mode="deep").heuristic_header()
+
+
+def expected(tasks: list[dict]) -> dict[int, list[dict]]:
+    return {t["paragraph_index"]: StubBackend.suggest(t["text"]) for t in tasks}
+
+
+def run(backend, header, tasks, **settings) -> tuple[dict, dict, dict]:
+    """Evaluate tasks; return (stats, suggestions per paragraph, error per failed paragraph)."""
+    results, errors = {}, {}
+
+    def on_result(record):
+        results[record["paragraph_index"]] = [
+            {k: v for k, v in s.items() if k != "paragraph_index"} for s in record["suggestions"]
+        ]
+
+    stats = evaluate_tasks(
+        backend, header, tasks, on_result,
+        EvaluationSettings(backoff=0.01, **settings),
+        lambda task, error: errors.__setitem__(task["paragraph_index"], str(error)),
+    )
+    return stats, results, errors
+
+
+# ----------------------------------------------------------------------
+# Stub backend
+# ----------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("batch_chars", [0, 160, 10_000])
+def test_stub_backend(header, batch_chars):
+    tasks = make_tasks()
+    stats, results, errors = run(StubBackend(), header, tasks, batch_chars=batch_chars)
+    assert results == expected(tasks)
+    assert not errors
+    assert stats["evaluated"] == len(tasks)
+    assert stats["suggestions"] == 3
+    if batch_chars == 0:
+        assert stats["requests"] == len(tasks)
+    elif batch_chars == 10_000:
+        assert stats["requests"] == 1
+
+
+# ----------------------------------------------------------------------
+# Response parsing
+# ----------------------------------------------------------------------
+
+
+def test_parse_response_accepts_prose_around_json():
+    text = 'Here you go:\n```json\n{"suggestions": [{"original": "a", "replacement": "b", "confidence": 1}]}\n```'
+    assert parse_response(text) == [{"original": "a", "replacement": "b", "confidence": 1}]
+
+
+def test_parse_response_drops_null_optional_fields():
+    text = '{"suggestions": [{"original": "a", "replacement": "b", "rule_id": null, "confidence": 0.7}]}'
+    assert parse_response(text) == [{"original": "a", "replacement": "b", "confidence": 0.7}]
+
+
+@pytest.mark.parametrize("suggestion, field", [
+    ({"original": None, "replacement": "b"}, "original"),
+    ({"original": 12, "replacement": "b"}, "original"),
+    ({"original": "a"}, "replacement"),
+    ({"original": "a", "replacement": "b", "confidence": "high"}, "confidence"),
+    ({"original": "a", "replacement": "b", "confidence": True}, "confidence"),
+    ({"original": "a", "replacement": "b", "confidence": 90}, "confidence"),
+    ({"original": "a", "replacement": "b", "rule_id": 7}, "rule_id"),
+    ({"original": "a", "replacement": "b", "start": -1}, "start"),
+])
+def test_parse_response_rejects_bad_fields(suggestion, field):
+    with pytest.raises(EvaluationError, match=f'"{field}"'):
+        parse_response(json.dumps({"suggestions": [suggestion]}))
+    with pytest.raises(EvaluationError, match=f'"{field}"'):
+        split_batch_response(json.dumps({"paragraphs": [{"paragraph_index": 0, "suggestions": [suggestion]}]}),
+                             make_tasks()[:2])
+
+
+def test_split_batch_response_assigns_untagged_suggestions():
+    tasks = make_tasks()[:2]
+    text = json.dumps({"suggestions": [
+        {"paragraph_index": "P2", "original": "de de", "replacement": "de", "confidence": 0.9},
+        {"original": "supports supports", "replacement": "supports", "confidence": 0.9},
+        {"original": "not in the batch", "replacement": "x", "confidence": 0.9},
+    ]})
+    split = split_batch_response(text, tasks)
+    assert [s["original"] for s in split[0]] == ["supports supports"]
+    assert [s["original"] for s in split[2]] == ["de de"]
+
+
+# ----------------------------------------------------------------------
+# HTTP backend against a local stand-in server
+# ----------------------------------------------------------------------
+
+# How the stand-in answers the request for one paragraph, by paragraph index
+BAD_RESPONSES = {
+    2: b'{"suggestions": [{"original": null, "replacement": "x", "confidence": 0.9}]}',
+    4: b'{"suggestions": [{"original": "a", "replacement": "b", "confidence": "very"}]}',
+    6: b'{"suggestions": [], "note": "\xff\xfe"}',
+}
+TRUNCATED = 8  # Content-Length larger than the body: IncompleteRead
+FLAKY = 0  # HTTP 503 on the first request, then a good response
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers like the stub evaluator, except for the paragraphs above.
+
+    With spoil_batches, a batch holding one of them gets that paragraph's
+    bad response as the answer for the whole batch.
+    """
+
+    tasks: dict = {}
+    seen: set = set()
+    spoil_batches = False
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        indices = request["paragraph_indices"]
+        with self.lock:
+            first = tuple(indices) not in self.seen
+            self.seen.add(tuple(indices))
+        if indices == [FLAKY] and first:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if indices == [TRUNCATED]:
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b'{"suggestions": [')
+            return
+        bad = [p for p in indices if p in BAD_RESPONSES]
+        if bad and (len(indices) == 1 or self.spoil_batches):
+            body = BAD_RESPONSES[bad[0]]
+        else:
+            batch = [self.tasks[p] for p in indices]
+            body = asyncio.run(StubBackend().evaluate(request["prompt"], batch, 0)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(request):
+    tasks = make_tasks(TEXTS + MORE_TEXTS)
+    handler = type("Handler", (StandIn,), {
+        "tasks": {t["paragraph_index"]: t for t in tasks},
+        "seen": set(),
+        "spoil_batches": getattr(request, "param", False),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/evaluate", tasks
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_backend_fails_only_bad_paragraphs(header, stand_in):
+    url, tasks = stand_in
+    stats, results, errors = run(HttpBackend(url), header, tasks, concurrency=4, retries=1)
+
+    good = {p: s for p, s in expected(tasks).items() if p not in BAD_RESPONSES and p != TRUNCATED}
+    assert results == good
+    assert set(errors) == {*BAD_RESPONSES, TRUNCATED}
+    assert '"original"' in errors[2]
+    assert '"confidence"' in errors[4]
+    assert "UTF-8" in errors[6]
+    assert "IncompleteRead" in errors[TRUNCATED]
+    assert stats["evaluated"] == len(good)
+    assert stats["failed"] == len(errors)
+    # The 503 is retried once; every bad paragraph is retried once before failing
+    assert stats["retries"] == 1 + len(errors)
+
+
+def test_http_backend_batches(header, stand_in):
+    # One request for every paragraph, which the stand-in answers like the stub
+    url, tasks = stand_in
+    stats, results, errors = run(HttpBackend(url), header, tasks, batch_chars=10_000)
+    assert results == expected(tasks)
+    assert not errors
+    assert stats["requests"] == 1
+
+
+@pytest.mark.parametrize("stand_in", [True], indirect=True)
+def test_http_backend_splits_spoiled_batch(header, stand_in):
+    # The batch response is unusable, so each paragraph is asked again on its own
+    url, tasks = stand_in
+    stats, results, errors = run(HttpBackend(url), header, tasks, batch_chars=10_000, retries=1)
+
+    good = {p: s for p, s in expected(tasks).items() if p not in BAD_RESPONSES and p != TRUNCATED}
+    assert results == good
+    assert set(errors) == {*BAD_RESPONSES, TRUNCATED}
+    assert '"original"' in errors[2]
+    # The batch and its retry, then one request per paragraph, plus a retry
+    # for the 503 and for every bad paragraph
+    assert stats["requests"] == 2 + len(tasks) + 1 + len(errors)
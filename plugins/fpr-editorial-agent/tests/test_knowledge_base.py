@@ -0,0 +1,72 @@
+"""
+Tests for the compiled knowledge base snapshot: it is reused while the
+source YAMLs are unchanged, and rebuilt from YAML after an edit or when
+the pickle cannot be used.
+"""
+
+import pickle
+import shutil
+
+import pytest
+
+import src.knowledge_base
+from src.knowledge_base import REPO_ROOT, KnowledgeBase
+
+
+@pytest.fixture
+def kb_root(tmp_path, monkeypatch):
+    """A copy of the ERSV knowledge base, with its own snapshot cache."""
+    root = tmp_path / "kb"
+    shutil.copytree(REPO_ROOT / "core", root / "core")
+    shutil.copytree(REPO_ROOT / "projects" / "ERSV", root / "projects" / "ERSV")
+    monkeypatch.setattr(src.knowledge_base, "REPO_ROOT", root)
+    monkeypatch.setenv("FPR_CACHE_DIR", str(tmp_path / "cache"))
+    return root
+
+
+def matches(kb: KnowledgeBase) -> list[tuple]:
+    text = " ".join(e["original"] for e in kb.get_term_bank_entries()[:50])
+    return [(rule.id, match.start()) for rule, match in kb.get_term_matcher().iter_matches(text, "prose")]
+
+
+def test_snapshot_is_reused(kb_root):
+    built = KnowledgeBase("ERSV")
+    assert not built.loaded_from_cache and built._snapshot_path().exists()
+    cached = KnowledgeBase("ERSV")
+    assert cached.loaded_from_cache
+    assert matches(built) and matches(cached) == matches(built)
+
+
+def test_yaml_edit_invalidates_snapshot(kb_root):
+    old = KnowledgeBase("ERSV")
+    term_bank = kb_root / "projects" / "ERSV" / "term-bank.yaml"
+    first = old.get_term_bank_entries()[0]
+    term_bank.write_text(
+        term_bank.read_text(encoding="utf-8").replace(
+            f"replacement: \"{first['replacement']}\"", 'replacement: "Edited replacement"', 1),
+        encoding="utf-8",
+    )
+
+    new = KnowledgeBase("ERSV")
+    assert not new.loaded_from_cache and new.snapshot_hash != old.snapshot_hash
+    assert new.get_term_bank_entries()[0]["replacement"] == "Edited replacement"
+    # The snapshot of the old sources is dropped
+    assert [p.name for p in new._snapshot_path().parent.glob("kb-ERSV-*.pickle")] == [new._snapshot_path().name]
+    assert KnowledgeBase("ERSV").loaded_from_cache
+
+
+@pytest.mark.parametrize("content", [
+    b"not a pickle",
+    b"",
+    pickle.dumps({"_snapshot_hash": "another hash"}),
+    pickle.dumps(["not", "a", "dict"]),
+], ids=["garbage", "empty", "other-hash", "not-a-dict"])
+def test_unusable_snapshot_is_rebuilt(kb_root, content):
+    built = KnowledgeBase("ERSV")
+    path = built._snapshot_path()
+    path.write_bytes(content)
+
+    rebuilt = KnowledgeBase("ERSV")
+    assert not rebuilt.loaded_from_cache
+    assert matches(rebuilt) == matches(built)
+    assert KnowledgeBase("ERSV").loaded_from_cache
@@ -0,0 +1,141 @@
+"""
+Differential test: TermMatcher against the original per-entry loop.
+
+reference_pass() is RuleEngine._deterministic_pass as it was before the
+compiled matcher: every entry NFC-normalized, escaped and searched with
+re.search for every paragraph. With all_occurrences, re.finditer takes
+the place of re.search. The engine's scan over the same paragraphs must
+produce the same suggestions, in the same order.
+"""
+
+import random
+import re
+import unicodedata
+
+import lxml.etree
+import pytest
+
+from src.docx_package import DOCUMENT_PART
+from src.knowledge_base import KnowledgeBase
+from src.rule_engine import WORD_NS, RuleEngine, _DeterministicScan
+
+W = f"{{{WORD_NS}}}"
+FILLER = (
+    "the program supports municipal planning across the island and its regions while "
+    "la comunidad participa en el proceso de recuperación con datos del censo y vivienda"
+).split()
+
+
+def reference_pass(kb: KnowledgeBase, paragraphs: list[tuple[int, str, str]], all_occurrences: bool) -> list[tuple]:
+    entries = kb.get_term_bank_entries() + kb.get_ai_humanizer_entries()
+    protected = set(kb.get_protected_terms())
+    full_doc_text = "\n".join(text for _, _, text in paragraphs)
+    applied_context_aware: set[str] = set()
+    suggestions = []
+
+    for p_idx, para_type, para_text in paragraphs:
+        for entry in entries:
+            if para_type not in entry.get("applies_in", ["prose"]):
+                continue
+            original = unicodedata.normalize("NFC", entry.get("original", ""))
+            replacement = unicodedata.normalize("NFC", entry.get("replacement", ""))
+            if not original or replacement == original or original in protected:
+                continue
+            rule_id = entry.get("id", "UNKNOWN")
+            context_aware = entry.get("context_aware", False)
+
+            flags = 0 if entry.get("case_sensitive", True) else re.IGNORECASE
+            pattern = original if entry.get("pattern_type", "literal") == "regex" else re.escape(original)
+            if all_occurrences:
+                matches = list(re.finditer(pattern, para_text, flags))
+            else:
+                match = re.search(pattern, para_text, flags)
+                matches = [match] if match else []
+
+            for match in matches:
+                if context_aware:
+                    if rule_id in applied_context_aware:
+                        continue
+                    if replacement.lower() in full_doc_text.lower():
+                        continue
+                suggestions.append((p_idx, rule_id, match.start(), match.group(0), replacement))
+                if context_aware:
+                    applied_context_aware.add(rule_id)
+    return suggestions
+
+
+def matcher_pass(kb: KnowledgeBase, paragraphs: list[tuple[int, str, str]], all_occurrences: bool) -> list[tuple]:
+    scan = _DeterministicScan(kb, all_occurrences=all_occurrences)
+    for p_idx, para_type, para_text in paragraphs:
+        scan.feed(p_idx, para_type, para_text)
+    return [
+        (s.paragraph_index, s.rule_id, s.start, s.original, s.replacement)
+        for s in scan.finish([DOCUMENT_PART])
+    ]
+
+
+def build_root(paragraphs: list[tuple[str, str]], rng: random.Random):
+    """A w:document of (kind, text) paragraphs, each text split across up to four runs."""
+    root = lxml.etree.Element(f"{W}document", nsmap={"w": WORD_NS})
+    body = lxml.etree.SubElement(root, f"{W}body")
+    for kind, text in paragraphs:
+        parent = body
+        if kind == "table":
+            parent = lxml.etree.SubElement(lxml.etree.SubElement(
+                lxml.etree.SubElement(body, f"{W}tbl"), f"{W}tr"), f"{W}tc")
+        p = lxml.etree.SubElement(parent, f"{W}p")
+        if kind == "heading":
+            p_pr = lxml.etree.SubElement(p, f"{W}pPr")
+            lxml.etree.SubElement(p_pr, f"{W}pStyle").set(f"{W}val", "Heading2")
+        cuts = sorted(rng.sample(range(1, len(text)), min(3, len(text) - 1)))
+        for start, end in zip([0] + cuts, cuts + [len(text)]):
+            t = lxml.etree.SubElement(lxml.etree.SubElement(p, f"{W}r"), f"{W}t")
+            t.text = text[start:end]
+    return root
+
+
+def paragraphs_of(engine: RuleEngine, root) -> list[tuple[int, str, str]]:
+    return [
+        (p_idx, engine._get_paragraph_type(para), engine._get_para_text(para))
+        for p_idx, para in enumerate(root.findall(f".//{W}p"))
+    ]
+
+
+def literals(kb: KnowledgeBase) -> list[str]:
+    return [
+        e["original"]
+        for e in kb.get_term_bank_entries() + kb.get_ai_humanizer_entries()
+        if e.get("original") and e.get("pattern_type", "literal") == "literal"
+    ]
+
+
+@pytest.mark.parametrize("all_occurrences", [False, True], ids=["first", "all"])
+@pytest.mark.parametrize("project", ["ERSV", "WCRP"])
+def test_matcher_matches_reference_loop(project, all_occurrences):
+    """Filler prose, headings and table cells with term bank literals in any case."""
+    kb = KnowledgeBase(project)
+    rng = random.Random(project)
+    terms = literals(kb)
+    paragraphs = []
+    for _ in range(400):
+        words = rng.choices(FILLER, k=12)
+        for _ in range(rng.randint(0, 3)):
+            term = rng.choice(terms)
+            words.insert(rng.randrange(len(words) + 1), rng.choice([term, term.lower(), term.upper()]))
+        paragraphs.append((rng.choice(["prose"] * 6 + ["heading", "table"]), " ".join(words)))
+
+    paragraphs = paragraphs_of(RuleEngine(kb=kb, mode="light"), build_root(paragraphs, rng))
+    expected = reference_pass(kb, paragraphs, all_occurrences)
+    assert expected, "the synthetic document should hold term bank matches"
+    assert matcher_pass(kb, paragraphs, all_occurrences) == expected
+
+
+def test_matcher_edge_cases():
+    """Overlapping literals, case folding and context_aware entries on hand-written text."""
+    kb = KnowledgeBase("ERSV")
+    texts = []
+    for original in literals(kb)[:60]:
+        texts += [original, original.upper(), f"({original.lower()}), {original}; {original}"]
+    paragraphs = [(i, "prose", text) for i, text in enumerate(texts)]
+    for all_occurrences in (False, True):
+        assert matcher_pass(kb, paragraphs, all_occurrences) == reference_pass(kb, paragraphs, all_occurrences)
@@ -0,0 +1,96 @@
+"""
+Tests for the persistent paragraph cache: lookups, the scope each kind
+of entry is keyed by, buffered writes and least-recently-used eviction.
+"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import src.paragraph_cache
+from src.paragraph_cache import ParagraphCache
+
+SCOPE = ("kb-hash", "deep", "general", "es")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake time.time() for the cache: one second later on every call."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(src.paragraph_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_hit_and_miss(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    with ParagraphCache(SCOPE, path) as cache:
+        assert cache.get("deterministic", "text", "prose") is None
+        cache.put("deterministic", "text", {"matches": [1, 2]}, "prose")
+
+    cache = ParagraphCache(SCOPE, path)
+    assert cache.get("deterministic", "text", "prose") == {"matches": [1, 2]}
+    # Another text, paragraph type or kind is another entry
+    assert cache.get("deterministic", "other text", "prose") is None
+    assert cache.get("deterministic", "text", "table") is None
+    assert cache.get("deterministic_all", "text", "prose") is None
+    assert cache.stats() == {
+        "deterministic": {"hits": 1, "misses": 2, "hit_rate": 0.333},
+        "deterministic_all": {"hits": 0, "misses": 1, "hit_rate": 0.0},
+    }
+    cache.close()
+
+
+@pytest.mark.parametrize("kind, shared", [("deterministic", True), ("deterministic_all", True), ("heuristic", False)])
+def test_kind_scope(tmp_path, kind, shared):
+    """Deterministic entries are shared by every run configuration of a KB; heuristic ones are not."""
+    path = tmp_path / "cache.sqlite3"
+    with ParagraphCache(SCOPE, path) as cache:
+        cache.put(kind, "text", ["value"])
+
+    for scope in [("kb-hash", "light", "general", "es"), ("kb-hash", "deep", "", "es"), ("kb-hash", "deep", "general", "en")]:
+        with ParagraphCache(scope, path) as cache:
+            assert (cache.get(kind, "text") == ["value"]) is shared
+    with ParagraphCache(("other-kb-hash",) + SCOPE[1:], path) as cache:
+        assert cache.get(kind, "text") is None
+
+
+def test_writes_are_buffered_until_flush(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    writer = ParagraphCache(SCOPE, path)
+    reader = ParagraphCache(SCOPE, path)
+    writer.put("heuristic", "text", [])
+    # Pending entries are visible to the writer only
+    assert writer.get("heuristic", "text") == []
+    assert reader.get("heuristic", "text") is None
+    writer.flush()
+    assert reader.get("heuristic", "text") == []
+    writer.close()
+    reader.close()
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    path = tmp_path / "cache.sqlite3"
+    texts = [f"paragraph {i}" for i in range(4)]
+    with ParagraphCache(SCOPE, path) as cache:
+        for text in texts:
+            cache.put("deterministic", text, "x" * 100)
+            cache.flush()  # one timestamp per entry
+        entry_size = cache._db.execute("SELECT MAX(size) FROM entries").fetchone()[0]
+
+    # Reading the oldest entry makes it the most recently used
+    cache = ParagraphCache(SCOPE, path, max_bytes=2 * entry_size)
+    assert cache.get("deterministic", texts[0]) is not None
+    cache.close()
+
+    with ParagraphCache(SCOPE, path) as cache:
+        kept = [text for text in texts if cache.get("deterministic", text) is not None]
+    assert kept == [texts[0], texts[3]]
+
+
+def test_unusable_store_runs_uncached(tmp_path):
+    (tmp_path / "cache.sqlite3").mkdir()
+    with ParagraphCache(SCOPE, tmp_path / "cache.sqlite3") as cache:
+        assert not cache.enabled
+        cache.put("deterministic", "text", [])
+        assert cache.get("deterministic", "text") is None
+        assert cache.stats() == {}
@@ -0,0 +1,119 @@
+"""
+Tests for PartIndex against the per-element ancestor walk it replaces:
+paragraph order, table containment and tracked-change runs, on a
+hand-written part with nested tables, text boxes and nested revision
+wrappers, and on random trees.
+"""
+
+import io
+import random
+
+import lxml.etree
+import pytest
+
+from src.docx_package import DOCUMENT_PART
+from src.knowledge_base import KnowledgeBase
+from src.part_index import BODY, TABLE, TRACKED_CHANGE_TAGS, WORD_NS, PartIndex, W
+from src.rule_engine import RuleEngine
+
+NESTED = f"""<w:document xmlns:w="{WORD_NS}"><w:body>
+<w:p><w:r><w:t>intro</w:t></w:r>
+  <w:ins w:id="1"><w:r><w:t>added</w:t></w:r><w:del w:id="2"><w:r><w:delText>gone</w:delText></w:r></w:del></w:ins>
+</w:p>
+<w:tbl><w:tr><w:tc>
+  <w:p><w:r><w:t>cell</w:t></w:r></w:p>
+  <w:tbl><w:tr><w:tc><w:p><w:moveTo w:id="3"><w:r><w:t>inner cell</w:t></w:r></w:moveTo></w:p></w:tc></w:tr></w:tbl>
+  <w:p><w:r><w:t>cell after inner table</w:t></w:r></w:p>
+</w:tc></w:tr></w:tbl>
+<w:p><w:r><w:t>box holder</w:t><w:pict><w:txbxContent>
+  <w:p><w:r><w:t>in text box</w:t></w:r></w:p>
+  <w:tbl><w:tr><w:tc><w:p><w:r><w:t>table in text box</w:t></w:r></w:p></w:tc></w:tr></w:tbl>
+</w:txbxContent></w:pict></w:r></w:p>
+<w:p><w:moveFrom w:id="4"><w:r><w:t>moved</w:t></w:r></w:moveFrom><w:r><w:t>outro</w:t></w:r></w:p>
+</w:body></w:document>"""
+
+
+def reference(root) -> tuple[list, list[str], set]:
+    """Paragraphs, containers and tracked runs by walking each element's ancestors."""
+    paragraphs = list(root.iter(f"{W}p"))
+    containers = [
+        TABLE if any(a.tag == f"{W}tbl" for a in p.iterancestors()) else BODY for p in paragraphs
+    ]
+    tracked = {r for r in root.iter(f"{W}r") if any(a.tag in TRACKED_CHANGE_TAGS for a in r.iterancestors())}
+    return paragraphs, containers, tracked
+
+
+def check(root) -> PartIndex:
+    index = PartIndex(root)
+    paragraphs, containers, tracked = reference(root)
+    assert index.paragraphs == paragraphs
+    assert index.containers == containers
+    assert {r for r in root.iter(f"{W}r") if index.is_tracked(r)} == tracked
+    return index
+
+
+def test_nested_structures():
+    root = lxml.etree.fromstring(NESTED)
+    index = check(root)
+    assert index.containers == [BODY, TABLE, TABLE, TABLE, BODY, BODY, TABLE, BODY]
+    assert [index.in_table(i) for i in range(len(index.paragraphs))] == [c == TABLE for c in index.containers]
+
+
+def test_mark_tracked():
+    root = lxml.etree.fromstring(NESTED)
+    index = PartIndex(root)
+    wrapper = lxml.etree.SubElement(index.paragraphs[0], f"{W}ins")
+    run = lxml.etree.SubElement(wrapper, f"{W}r")
+    assert not index.is_tracked(run)
+    index.mark_tracked(wrapper)
+    assert index.is_tracked(run)
+
+
+def random_tree(rng: random.Random, blocks: int = 10):
+    """A random w:body of paragraphs, tables, text boxes and revision wrappers."""
+
+    def block(parent, depth):
+        for _ in range(rng.randint(1, 4)):
+            if depth < 4 and rng.random() < 0.25:
+                cell = lxml.etree.SubElement(lxml.etree.SubElement(
+                    lxml.etree.SubElement(parent, f"{W}tbl"), f"{W}tr"), f"{W}tc")
+                block(cell, depth + 1)
+            else:
+                paragraph(parent, depth)
+
+    def paragraph(parent, depth):
+        p = lxml.etree.SubElement(parent, f"{W}p")
+        if rng.random() < 0.2:
+            lxml.etree.SubElement(lxml.etree.SubElement(p, f"{W}pPr"), f"{W}pStyle").set(f"{W}val", "Heading1")
+        for _ in range(rng.randint(1, 3)):
+            holder = p
+            for _ in range(rng.choice([0, 0, 1, 2])):
+                holder = lxml.etree.SubElement(holder, rng.choice(TRACKED_CHANGE_TAGS))
+            run = lxml.etree.SubElement(holder, f"{W}r")
+            lxml.etree.SubElement(run, f"{W}t").text = rng.choice(["alpha ", "beta ", "gamma "])
+            if depth < 4 and rng.random() < 0.1:
+                box = lxml.etree.SubElement(lxml.etree.SubElement(run, f"{W}pict"), f"{W}txbxContent")
+                block(box, depth + 1)
+
+    root = lxml.etree.Element(f"{W}document", nsmap={"w": WORD_NS})
+    body = lxml.etree.SubElement(root, f"{W}body")
+    for _ in range(blocks):
+        block(body, 0)
+    return root
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_trees(seed):
+    check(random_tree(random.Random(seed)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tree_and_stream_classify_alike(seed):
+    """The engine's tree walk (PartIndex) and streaming parser give the same paragraphs and types."""
+    root = random_tree(random.Random(seed))
+    kb = KnowledgeBase("ERSV")
+    tree = list(RuleEngine(kb=kb)._iter_tree_paragraphs(PartIndex(root), DOCUMENT_PART))
+    stream = RuleEngine(kb=kb, streaming=True)._iter_stream_paragraphs(
+        io.BytesIO(lxml.etree.tostring(root)), DOCUMENT_PART)
+    assert list(stream) == tree
+    assert {para_type for _, para_type, _ in tree} == {"prose", "headings", "tables"}
@@ -0,0 +1,53 @@
+"""
+Tests for the heuristic pre-filter's effect on the run state: paragraphs
+below the min score are skipped, not left pending, and a later round
+with a lower threshold makes them pending again.
+"""
+
+from src.heuristic_io import paragraph_hash
+from src.knowledge_base import KnowledgeBase
+from src.run_state import RunState
+from src.scorer import LIGHT_MIN_SCORE, select_tasks
+
+TEXTS = [
+    "El programa apoya los esfuerzos de planificación municipal.",
+    "In order to utilise the data, the report was written by the team and was reviewed by the agency.",
+    "La comunidad participa en el proceso de recuperación.",
+    "It is worth noting that the findings are arguably crucial in order to leverage the robust framework.",
+]
+
+
+def make_tasks() -> list[dict]:
+    return [
+        {"paragraph_index": i, "text": text, "language": "en" if i % 2 else "es", "hash": paragraph_hash(text)}
+        for i, text in enumerate(TEXTS)
+    ]
+
+
+def test_select_tasks_reports_below_threshold():
+    scorer = KnowledgeBase("ERSV").get_heuristic_scorer()
+    tasks = make_tasks()
+    selected, below = select_tasks(scorer, tasks, min_score=LIGHT_MIN_SCORE)
+    assert [t["paragraph_index"] for t in selected] == [1, 3]
+    assert [t["paragraph_index"] for t in below] == [0, 2]
+
+    # Over the budget is neither selected nor below the threshold
+    selected, below = select_tasks(scorer, tasks, budget=1, min_score=LIGHT_MIN_SCORE)
+    assert len(selected) == 1 and [t["paragraph_index"] for t in below] == [0, 2]
+    assert select_tasks(scorer, tasks) == (tasks, [])
+
+
+def test_skipped_paragraphs_are_not_pending(tmp_path):
+    tasks = make_tasks()
+    state = RunState.create(tmp_path / "doc.docx", "hash", {}, [], tasks, [])
+    state.skip([tasks[0], tasks[2]])
+    state.save(tmp_path / "state.json")
+
+    state = RunState.load(tmp_path / "state.json")
+    assert state.counts() == {"done": 0, "pending": 2, "skipped": 2}
+    assert [t["paragraph_index"] for t in state.pending_tasks()] == [1, 3]
+    assert state.open_tasks() == tasks
+
+    state.merge([{"paragraph_index": 1, "hash": tasks[1]["hash"], "suggestions": []}])
+    state.skip([])  # a round without a threshold
+    assert state.counts() == {"done": 1, "pending": 3, "skipped": 0}
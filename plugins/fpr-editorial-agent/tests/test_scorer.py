@@ -0,0 +1,108 @@
+"""
+Tests for the heuristic pre-filter: ParagraphScorer signals, the budget
+and min-score cuts of select_tasks, and the light-mode default threshold.
+"""
+
+import pytest
+from click.testing import CliRunner
+
+from docgen import DocSpec, build_docx
+from src.fpr_edit import main
+from src.heuristic_io import read_tasks
+from src.knowledge_base import KnowledgeBase
+from src.matcher import InvalidRuleError
+from src.scorer import LIGHT_MIN_SCORE, LONG_SENTENCE_WORDS, PASSIVE_WEIGHT, ParagraphScorer, select_tasks
+
+RULES = [
+    {"id": "H-WORDS", "language": "en", "signals": {"terms": ["crucial", "robust"]}},
+    {"id": "H-HEDGE", "language": "both", "signals": {"patterns": [r"\barguably\b"], "min_count": 2}},
+    {"id": "H-SE", "language": "es", "signals": {"terms": ["se"], "min_count": 2, "per_sentence": True, "weight": 0.5}},
+]
+SUBSTITUTIONS = [{"original": "in order to", "replacement": "to"}]
+
+
+@pytest.fixture
+def scorer():
+    return ParagraphScorer(RULES, SUBSTITUTIONS)
+
+
+def make_tasks(scores: list[int]) -> list[dict]:
+    """Tasks whose text scores exactly as given (one "crucial" per point)."""
+    return [
+        {"paragraph_index": i, "text": " ".join(["Crucial"] * score + ["plain words."]), "language": "en"}
+        for i, score in enumerate(scores)
+    ]
+
+
+def test_scorer_signals(scorer):
+    assert scorer.score("The team met on Monday.", "en") == 0
+    assert scorer.score("A crucial and robust plan, in order to help.", "en") == 3
+    # Language-specific signals only count for their language
+    assert scorer.score("A crucial plan.", "es") == 0
+    # min_count: one hedge is not a violation, two are
+    assert scorer.score("This is arguably fine.", "en") == 0
+    assert scorer.score("This is arguably, arguably fine.", "es") == 2
+    # per_sentence: one weighted violation per sentence reaching min_count
+    assert scorer.score("Se dice que se hace. Se sabe. Se ve y se nota.", "es") == 1.0
+
+
+def test_scorer_sentence_length_and_passive(scorer):
+    long_sentence = " ".join(["word"] * (LONG_SENTENCE_WORDS + 1)) + "."
+    assert scorer.score(long_sentence, "es") == 1
+    uniform = " ".join([" ".join(["word"] * 18) + "."] * 3)
+    assert scorer.score(uniform, "es") == 1
+    assert scorer.score("The report was written and is widely reviewed.", "en") == 2 * PASSIVE_WEIGHT
+
+
+def test_scorer_invalid_signals():
+    with pytest.raises(InvalidRuleError, match="H-BAD"):
+        ParagraphScorer([{"id": "H-BAD", "signals": {"patterns": ["("]}}], [])
+    with pytest.raises(InvalidRuleError, match="H-EMPTY"):
+        ParagraphScorer([{"id": "H-EMPTY", "signals": {"weight": 2}}], [])
+
+
+def test_select_tasks_budget(scorer):
+    tasks = make_tasks([1, 3, 0, 3, 2, 1])
+    selected, below = select_tasks(scorer, tasks, budget=3)
+    # The three best, ties to the earlier paragraph, back in document order
+    assert [t["paragraph_index"] for t in selected] == [1, 3, 4]
+    assert below == []
+    selected, _ = select_tasks(scorer, tasks, budget=4)
+    assert [t["paragraph_index"] for t in selected] == [0, 1, 3, 4]
+    assert select_tasks(scorer, tasks, budget=10) == (tasks, [])
+    assert select_tasks(scorer, tasks, budget=0) == ([], [])
+
+
+def test_select_tasks_min_score(scorer):
+    tasks = make_tasks([1, 3, 0, 3, 2, 1])
+    selected, below = select_tasks(scorer, tasks, min_score=2)
+    assert [t["paragraph_index"] for t in selected] == [1, 3, 4]
+    assert [t["paragraph_index"] for t in below] == [0, 2, 5]
+
+    # The budget cuts within the threshold; the rest is in neither list
+    selected, below = select_tasks(scorer, tasks, budget=1, min_score=2)
+    assert [t["paragraph_index"] for t in selected] == [1]
+    assert [t["paragraph_index"] for t in below] == [0, 2, 5]
+
+
+def test_light_mode_default_min_score(tmp_path):
+    """Light mode exports only paragraphs at LIGHT_MIN_SCORE unless told otherwise."""
+    doc = tmp_path / "doc.docx"
+    build_docx(doc, DocSpec(paragraphs=120, seed=3))
+    runner = CliRunner()
+
+    def export(name: str, *options: str) -> list[dict]:
+        path = tmp_path / f"{name}.json"
+        args = [str(doc), "--project", "ERSV", "--mode", "light", "--export-heuristic", str(path),
+                "--output", str(tmp_path / f"{name}.docx"), "--run-state", str(tmp_path / f"{name}.state"),
+                "--no-paragraph-cache", *options]
+        result = runner.invoke(main, args)
+        assert result.exit_code == 0, result.output
+        return read_tasks(path)[1]
+
+    everything = export("all", "--heuristic-min-score", "0")
+    light = export("light")
+    expected, below = select_tasks(KnowledgeBase("ERSV").get_heuristic_scorer(), everything,
+                                   min_score=LIGHT_MIN_SCORE)
+    assert expected and below
+    assert [t["paragraph_index"] for t in light] == [t["paragraph_index"] for t in expected]
@@ -0,0 +1,133 @@
+"""
+Tests for server mode's request checks: field validation when a request
+is parsed, paths kept inside the document's folder or the output root,
+and the token, Host and Content-Type checks of the HTTP transport.
+"""
+
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from docgen import DocSpec, build_docx
+from src.knowledge_base import KnowledgeBase
+from src.server import EditorialServer, RequestError, _make_handler, parse_request
+
+TOKEN = "test-token"
+
+
+@pytest.fixture(scope="module")
+def document(tmp_path_factory):
+    path = tmp_path_factory.mktemp("docs") / "doc.docx"
+    build_docx(path, DocSpec(paragraphs=20, project="ERSV"), KnowledgeBase("ERSV"))
+    return path
+
+
+@pytest.fixture
+def server(tmp_path):
+    app = EditorialServer("ERSV", workers=2, output_root=tmp_path / "out")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(app, TOKEN))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        yield httpd.server_address[1]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        app.pool.shutdown()
+
+
+def post(port: int, operation: str, body: dict, **headers) -> tuple[int, dict]:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json", **headers}
+    connection.request("POST", f"/{operation}", body=json.dumps(body), headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+# ----------------------------------------------------------------------
+# Request fields
+# ----------------------------------------------------------------------
+
+
+def test_parse_request_fills_defaults():
+    request = parse_request("export-heuristic", {"document": "doc.docx", "heuristic_budget": 5, "mode": None})
+    assert request["heuristic_budget"] == 5
+    assert request["mode"] == "light" and request["format"] == 2 and request["all_occurrences"] is False
+
+
+@pytest.mark.parametrize("operation, field, value", [
+    ("export-heuristic", "heuristic_budget", "5"),
+    ("export-heuristic", "heuristic_budget", 0),
+    ("export-heuristic", "heuristic_budget", True),
+    ("export-heuristic", "heuristic_min_score", -1),
+    ("export-heuristic", "heuristic_min_score", float("nan")),
+    ("export-heuristic", "format", 3),
+    ("analyze", "all_occurrences", "yes"),
+    ("analyze", "paragraph_cache", 1),
+    ("analyze", "mode", "fast"),
+    ("analyze", "lang", "fr"),
+    ("write", "author", ""),
+    ("apply-heuristic", "results", "[]"),
+])
+def test_parse_request_names_bad_field(operation, field, value):
+    with pytest.raises(RequestError, match=f"^{field} must be") as error:
+        parse_request(operation, {"document": "doc.docx", field: value})
+    assert error.value.status == 400
+
+
+@pytest.mark.parametrize("project", ["../ERSV", "ERSV/../WCRP", "/etc", "..", ".", "ERS?", "E*", "[EW]RSV", "NOPE"])
+def test_parse_request_rejects_project_outside_projects(project):
+    with pytest.raises(RequestError, match="^project must be the name of a folder under projects/"):
+        parse_request("analyze", {"document": "doc.docx", "project": project})
+    assert parse_request("analyze", {"document": "doc.docx", "project": "WCRP"})["project"] == "WCRP"
+
+
+def test_parse_request_rejects_unknown_fields():
+    with pytest.raises(RequestError, match="output_dir"):
+        parse_request("export-heuristic", {"document": "doc.docx", "output_dir": "out"})
+    with pytest.raises(RequestError, match="document is required"):
+        parse_request("analyze", {})
+
+
+# ----------------------------------------------------------------------
+# HTTP transport
+# ----------------------------------------------------------------------
+
+
+def test_requests_need_token_host_and_json(server, document):
+    body = {"document": str(document)}
+    assert post(server, "analyze", body, Authorization="")[0] == 401
+    assert post(server, "analyze", body, Authorization="Bearer wrong")[0] == 401
+    assert post(server, "analyze", body, Host="attacker.example:8765")[0] == 403
+    assert post(server, "analyze", body, **{"Content-Type": "text/plain"})[0] == 415
+    assert post(server, "analyze", body, Host="localhost:8765")[0] == 200
+
+
+def test_bad_fields_return_400(server, document):
+    status, response = post(server, "export-heuristic", {"document": str(document), "heuristic_budget": "5"})
+    assert status == 400 and response["error"].startswith("heuristic_budget")
+    status, response = post(server, "apply-heuristic", {"document": str(document), "results": [
+        {"paragraph_index": 1, "suggestions": [{"original": "a", "replacement": "b", "confidence": "high"}]},
+    ]})
+    assert status == 400 and '"confidence"' in response["error"]
+
+
+def test_paths_stay_in_allowed_folders(server, document, tmp_path):
+    body = {"document": str(document)}
+    for field, value in [
+        ("output", str(tmp_path / "elsewhere.docx")),
+        ("output", "../escape.docx"),
+        ("output_dir", "/tmp"),
+        ("run_state", str(tmp_path / "state.json")),
+    ]:
+        status, response = post(server, "write", {**body, field: value})
+        assert status == 403 and response["error"].startswith(field)
+    assert not (tmp_path / "elsewhere.docx").exists()
+
+    status, response = post(server, "write", {**body, "output": "edited/doc.docx",
+                                              "output_dir": str(tmp_path / "out" / "reports")})
+    assert status == 200
+    assert response["outputs"]["output"] == str(document.parent / "edited" / "doc.docx")
+    assert (tmp_path / "out" / "reports").is_dir()
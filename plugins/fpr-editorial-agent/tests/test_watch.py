@@ -0,0 +1,85 @@
+"""
+Tests for watch mode's polling loop: a save is analyzed again, and an
+invalid knowledge base edit or a failed document listing is reported
+once while polling goes on with the last valid rules.
+"""
+
+import os
+import shutil
+
+import pytest
+
+import src.knowledge_base
+import src.watch
+from docgen import DocSpec, build_docx
+from src.knowledge_base import REPO_ROOT
+from src.watch import Watcher
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    """A folder holding one document, watched against a copy of the ERSV knowledge base."""
+    root = tmp_path / "kb"
+    shutil.copytree(REPO_ROOT / "core", root / "core")
+    shutil.copytree(REPO_ROOT / "projects" / "ERSV", root / "projects" / "ERSV")
+    monkeypatch.setattr(src.knowledge_base, "REPO_ROOT", root)
+    monkeypatch.setenv("FPR_CACHE_DIR", str(tmp_path / "cache"))
+
+    folder = tmp_path / "drafts"
+    build_docx(folder / "doc.docx", DocSpec(paragraphs=20, project="ERSV"))
+    records = []
+    watcher = Watcher(str(folder), "ERSV", "light", None, "auto", paragraph_cache=False,
+                      output_dir=tmp_path / "reports", on_round=records.append)
+    return watcher, root, folder, records
+
+
+def touch(path, step: int = 1):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 10**9))
+
+
+def test_watch_analyzes_saved_documents(watched):
+    watcher, _, folder, records = watched
+    assert [r["status"] for r in watcher.poll()] == ["ok"]
+    assert watcher.poll() == []
+    touch(folder / "doc.docx")
+    (record,) = watcher.poll()
+    assert record["status"] == "ok" and record["changed"] == 0 and not record["first"]
+
+
+def test_watch_keeps_polling_after_invalid_yaml(watched):
+    watcher, root, folder, records = watched
+    watcher.poll()
+    kb = watcher.kb
+    term_bank = root / "projects" / "ERSV" / "term-bank.yaml"
+    term_bank.write_text("entries: [unclosed\n", encoding="utf-8")
+    touch(term_bank)
+    touch(folder / "doc.docx")
+
+    (record,) = watcher.poll()
+    assert watcher.kb is kb and record["status"] == "ok"
+    errors = [r for r in records if r["status"] == "failed"]
+    assert len(errors) == 1 and "knowledge base not reloaded: ParserError" in errors[0]["error"]
+
+    # Reported once while the error stays the same
+    touch(folder / "doc.docx", 2)
+    watcher.poll()
+    assert len([r for r in records if r["status"] == "failed"]) == 1
+
+
+def test_watch_keeps_polling_after_listing_error(watched, monkeypatch):
+    watcher, _, folder, records = watched
+    watcher.poll()
+
+    def unreachable(target):
+        raise OSError(5, "Input/output error", target)
+
+    monkeypatch.setattr(src.watch, "collect_documents", unreachable)
+    assert watcher.poll() == [] and watcher.poll() == []
+    errors = [r for r in records if r["status"] == "failed"]
+    assert len(errors) == 1 and "documents not listed: OSError" in errors[0]["error"]
+
+    monkeypatch.undo()
+    touch(folder / "doc.docx")
+    (record,) = watcher.poll()
+    assert record["status"] == "ok" and record["changed"] == 0